@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+REST API Load Benchmark
+Compares requests per second with DB calls inline on the event loop (before)
+against the dedicated DB thread pool used by create_fastapi_app (after)
+
+Usage:
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --clients 64 --requests 2000 --db-latency-ms 2
+
+--db-latency-ms adds a sleep to every SQL statement to model a networked
+database (PostgreSQL) where each query spends time waiting on I/O. With a
+local SQLite file every query is CPU-bound under the GIL, so the pool mostly
+buys fairness (no request stalls the loop) rather than raw throughput.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Benchmark against a throwaway database, configured before src is imported
+_tmp_dir = tempfile.mkdtemp(prefix="arca-bench-")
+os.environ.setdefault("ARCA_DATABASE_URL", f"sqlite:///{_tmp_dir}/bench.db")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, HTTPException  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from src.integration.java_interface import JavaModInterface, create_fastapi_app  # noqa: E402
+from src.models.base import engine, init_db  # noqa: E402
+
+PLAYER_COUNT = 50
+
+
+class TradeReportRequest(BaseModel):
+    minecraft_uuid: str
+    trade_type: str
+    item_name: str
+    item_quantity: int
+    carat_amount: float
+
+
+def create_inline_app() -> FastAPI:
+    """The previous behaviour: blocking interface calls inside async handlers"""
+    app = FastAPI()
+    interface = JavaModInterface()
+
+    @app.get("/api/balance/{minecraft_uuid}")
+    async def get_balance(minecraft_uuid: str):
+        result = interface.get_balance_by_uuid(minecraft_uuid)
+        if not result["success"]:
+            raise HTTPException(status_code=404, detail=result["error"])
+        return result
+
+    @app.get("/api/market")
+    async def get_market():
+        return interface.get_market_price()
+
+    @app.post("/api/trade/report")
+    async def report_trade(request: TradeReportRequest):
+        result = interface.report_trade(**request.model_dump())
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return result
+
+    return app
+
+
+def seed_players() -> list:
+    """Register benchmark players and return their UUIDs"""
+    init_db()
+    interface = JavaModInterface()
+    uuids = [f"00000000-0000-0000-0000-{i:012d}" for i in range(PLAYER_COUNT)]
+    for i, uuid in enumerate(uuids):
+        interface.register_player(uuid, f"BenchPlayer{i}")
+    return uuids
+
+
+def build_request(i: int, uuids: list):
+    """Mixed workload: mostly polling, some trade reports"""
+    uuid = uuids[i % len(uuids)]
+    kind = i % 10
+    if kind < 5:
+        return "GET", f"/api/balance/{uuid}", None
+    if kind < 9:
+        return "GET", "/api/market", None
+    return (
+        "POST",
+        "/api/trade/report",
+        {
+            "minecraft_uuid": uuid,
+            "trade_type": "BUY",
+            "item_name": "Diamond Sword",
+            "item_quantity": 1,
+            "carat_amount": 10.0,
+        },
+    )
+
+
+async def run_load(app: FastAPI, uuids: list, clients: int, total: int) -> dict:
+    """Fire `total` requests from `clients` concurrent workers"""
+    transport = httpx.ASGITransport(app=app)
+    counter = iter(range(total))
+    errors = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                method, url, body = build_request(i, uuids)
+                response = await client.request(method, url, json=body)
+                if response.status_code >= 500:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {"elapsed": elapsed, "rps": total / elapsed, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arca Bank REST API load benchmark")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per run")
+    parser.add_argument("--pool-size", type=int, default=None, help="DB thread pool size")
+    parser.add_argument(
+        "--db-latency-ms", type=float, default=0.0, help="Simulated I/O latency per SQL statement"
+    )
+    args = parser.parse_args()
+
+    if args.db_latency_ms > 0:
+        delay = args.db_latency_ms / 1000
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def simulate_latency(conn, cursor, statement, parameters, context, executemany):
+            time.sleep(delay)
+
+    uuids = seed_players()
+
+    print(
+        f"Clients: {args.clients}  Requests: {args.requests}  "
+        f"DB latency: {args.db_latency_ms}ms"
+    )
+    print("-" * 50)
+
+    results = {}
+    for label, factory in (
+        ("before (inline)", create_inline_app),
+        ("after (thread pool)", lambda: create_fastapi_app(db_pool_size=args.pool_size)),
+    ):
+        app = factory()
+        # Warm up connections and lazy imports
+        asyncio.run(run_load(app, uuids, clients=4, total=40))
+        results[label] = asyncio.run(run_load(app, uuids, args.clients, args.requests))
+        stats = results[label]
+        print(
+            f"{label:<22} {stats['rps']:>9.1f} req/s  "
+            f"({stats['elapsed']:.2f}s, {stats['errors']} errors)"
+        )
+
+        executor = getattr(app.state, "db_executor", None)
+        if executor:
+            executor.shutdown()
+
+    before, after = results.values()
+    print("-" * 50)
+    print(f"Speedup: {after['rps'] / before['rps']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Group Commit Benchmark
+Compares sustained transfers per second with one commit per ArcaBank call
+(before) against batched commits through the group-commit writer (after)
+
+Usage:
+    python benchmarks/bench_group_commit.py
+    python benchmarks/bench_group_commit.py --threads 32 --transfers 100 --max-batch 128
+
+Each transfer is a small write, so with one commit per call most of its time
+goes to the commit's fsync. Run against a file on the disk you care about:
+tmpfs or a RAM-backed /tmp hides most of the difference.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Benchmark against a throwaway database, configured before src is imported
+_tmp_dir = tempfile.mkdtemp(prefix="arca-bench-")
+os.environ.setdefault("ARCA_DATABASE_URL", f"sqlite:///{_tmp_dir}/bench.db")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.api.bank_api import ArcaBank  # noqa: E402
+from src.models.base import get_db  # noqa: E402
+from src.models.currency import CurrencyType  # noqa: E402
+from src.models.group_commit import get_group_commit_writer  # noqa: E402
+from src.services.currency_service import CurrencyService  # noqa: E402
+from src.services.user_service import UserService  # noqa: E402
+
+ACCOUNT_COUNT = 32
+
+
+def seed_accounts(bank: ArcaBank) -> list:
+    """Register funded accounts and return their Discord ids"""
+    discord_ids = [f"bench{i}" for i in range(ACCOUNT_COUNT)]
+    for discord_id in discord_ids:
+        bank.register_user(discord_id, discord_id)
+    with get_db() as db:
+        service = CurrencyService(db)
+        for discord_id in discord_ids:
+            user = UserService(db).get_by_discord_id(discord_id)
+            service.add_balance(user, CurrencyType.CARAT, Decimal("1000000"))
+    return discord_ids
+
+
+def run(bank: ArcaBank, discord_ids: list, threads: int, per_thread: int) -> dict:
+    barrier = threading.Barrier(threads)
+    failures = 0
+    lock = threading.Lock()
+
+    def worker(n: int):
+        nonlocal failures
+        barrier.wait()
+        for i in range(per_thread):
+            sender = discord_ids[(n + i) % len(discord_ids)]
+            recipient = discord_ids[(n + i + 1) % len(discord_ids)]
+            if not bank.transfer(sender, recipient, 1, "carat").success:
+                with lock:
+                    failures += 1
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {"elapsed": elapsed, "tps": threads * per_thread / elapsed, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arca Bank group commit benchmark")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent callers")
+    parser.add_argument("--transfers", type=int, default=50, help="Transfers per caller")
+    parser.add_argument("--max-batch", type=int, default=64, help="Operations per commit")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Longest batch wait")
+    args = parser.parse_args()
+
+    bank = ArcaBank(group_commit=False)
+    discord_ids = seed_accounts(bank)
+
+    print(f"Threads: {args.threads}  Transfers: {args.transfers}  Max batch: {args.max_batch}")
+    print("-" * 60)
+
+    batched = ArcaBank(group_commit=True)
+    writer = get_group_commit_writer()
+    writer.max_batch = args.max_batch
+    writer.max_wait = args.max_wait_ms / 1000
+
+    results = {}
+    for label, target in (("before (commit per call)", bank), ("after (group commit)", batched)):
+        results[label] = stats = run(target, discord_ids, args.threads, args.transfers)
+        print(
+            f"{label:<26} {stats['tps']:>9.1f} transfers/s  "
+            f"({stats['elapsed']:.2f}s, {stats['failures']} failures)"
+        )
+    writer.stop()
+
+    before, after = results.values()
+    print("-" * 60)
+    print(f"Average batch: {writer.get_stats()['avg_batch_size']:.1f} operations")
+    print(f"Speedup: {after['tps'] / before['tps']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
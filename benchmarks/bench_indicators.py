@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Technical Indicator Benchmark
+Compares the previous pure-Python ChartService indicator loops (before)
+against the vectorized NumPy versions in src.services.indicators (after)
+
+Usage:
+    python benchmarks/bench_indicators.py
+    python benchmarks/bench_indicators.py --points 100000 --window 20
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services import indicators  # noqa: E402
+
+# ==================== PREVIOUS IMPLEMENTATIONS ====================
+
+
+def legacy_moving_average(data, window):
+    result = []
+    for i in range(len(data)):
+        if i < window - 1:
+            result.append(None)
+        else:
+            result.append(sum(data[i - window + 1 : i + 1]) / window)
+    return result
+
+
+def legacy_bollinger_bands(data, window=20, num_std=2.0):
+    middle = legacy_moving_average(data, window)
+    upper = []
+    lower = []
+    for i in range(len(data)):
+        if i < window - 1:
+            upper.append(None)
+            lower.append(None)
+        else:
+            window_data = data[i - window + 1 : i + 1]
+            mean = sum(window_data) / window
+            std = math.sqrt(sum((x - mean) ** 2 for x in window_data) / window)
+            upper.append(mean + num_std * std)
+            lower.append(mean - num_std * std)
+    return middle, upper, lower
+
+
+def legacy_rsi(data, period=14):
+    if len(data) < period + 1:
+        return [None] * len(data)
+    result = [None] * period
+    changes = [data[i] - data[i - 1] for i in range(1, len(data))]
+    avg_gain = sum(max(0, c) for c in changes[:period]) / period
+    avg_loss = sum(abs(min(0, c)) for c in changes[:period]) / period
+    for change in changes[period:]:
+        avg_gain = (avg_gain * (period - 1) + max(0, change)) / period
+        avg_loss = (avg_loss * (period - 1) + abs(min(0, change))) / period
+        result.append(100 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss)))
+    return result
+
+
+# ==================== HARNESS ====================
+
+
+def best_of(repeat, func, *args):
+    """Fastest of `repeat` runs in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def to_array(values):
+    return np.array([np.nan if v is None else v for v in values])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arca Bank indicator benchmark")
+    parser.add_argument("--points", type=int, default=100_000, help="Series length")
+    parser.add_argument("--window", type=int, default=20, help="SMA/Bollinger window")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    prices = 1.0 + np.cumsum(rng.normal(0, 0.001, args.points))
+    price_list = prices.tolist()
+    window = args.window
+
+    cases = (
+        (
+            f"SMA({window})",
+            lambda: legacy_moving_average(price_list, window),
+            lambda: indicators.sma(prices, window),
+        ),
+        (
+            f"Bollinger({window})",
+            lambda: legacy_bollinger_bands(price_list, window)[1],
+            lambda: indicators.bollinger_bands(prices, window)[1],
+        ),
+        ("RSI(14)", lambda: legacy_rsi(price_list), lambda: indicators.rsi(prices)),
+    )
+
+    print(f"Points: {args.points}  Window: {window}")
+    print("-" * 62)
+    print(f"{'indicator':<16} {'before':>12} {'after':>12} {'speedup':>9} {'max diff':>9}")
+
+    for label, before, after in cases:
+        before_time = best_of(args.repeat, before)
+        after_time = best_of(args.repeat, after)
+
+        expected = to_array(before())
+        actual = after()
+        if label.startswith("RSI"):
+            # The old loop emitted one value fewer, shifted one step early
+            actual = actual[1:]
+            expected = expected[: len(actual)]
+        both = ~np.isnan(expected) & ~np.isnan(actual)
+        diff = np.abs(expected[both] - actual[both]).max() if both.any() else 0.0
+
+        print(
+            f"{label:<16} {before_time * 1000:>10.1f}ms {after_time * 1000:>10.2f}ms "
+            f"{before_time / after_time:>8.0f}x {diff:>9.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
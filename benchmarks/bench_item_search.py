@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Item Search Benchmark
+Measures ItemSearchIndex build time and per-query latency over a large
+synthetic catalogue of item names
+
+Usage:
+    python benchmarks/bench_item_search.py
+    python benchmarks/bench_item_search.py --items 50000 --repeat 200
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.item_index import ItemSearchIndex  # noqa: E402
+
+MATERIALS = [
+    "oak", "spruce", "birch", "diamond", "iron", "gold", "netherite", "stone", "cobbled",
+    "deepslate", "copper", "quartz", "prismarine", "acacia", "mangrove", "cherry", "bamboo",
+    "crimson", "warped", "blackstone",
+]  # fmt: skip
+ITEMS = [
+    "log", "planks", "sword", "pickaxe", "helmet", "boots", "chestplate", "leggings", "block",
+    "slab", "stairs", "wall", "door", "fence", "trapdoor", "button", "ore", "ingot", "nugget",
+    "axe",
+]  # fmt: skip
+QUERIES = ["diamnd sword", "diam", "netherite pickaxe", "sw", "oak log", "cherry tr", "xyzzy"]
+
+
+def build_names(count: int) -> list:
+    """Distinct names like 'Diamond Sword Of Qwerty' (material, item, suffix)"""
+    rng = random.Random(1)
+    names = set()
+    while len(names) < count:
+        suffix = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+        names.add(f"{rng.choice(MATERIALS)} {rng.choice(ITEMS)} of {suffix}".title())
+    return list(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arca Bank item search benchmark")
+    parser.add_argument("--items", type=int, default=30_000, help="Catalogue size")
+    parser.add_argument("--repeat", type=int, default=100, help="Runs per query")
+    args = parser.parse_args()
+
+    names = build_names(args.items)
+    index = ItemSearchIndex(refresh_seconds=300)
+
+    started = time.perf_counter()
+    for name in names:
+        index.add(name)
+    print(f"Indexed {len(index)} names in {time.perf_counter() - started:.2f}s")
+    print("-" * 60)
+
+    for query in QUERIES:
+        index.search(query)  # warm posting arrays
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            results = index.search(query)
+        elapsed = (time.perf_counter() - started) / args.repeat
+        best = results[0][0] if results else "-"
+        print(f"{query!r:<22} {elapsed * 1000:>7.3f}ms  {best}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+SQLite Profile Benchmark
+Compares mixed read/write throughput on SQLite's default settings (before)
+against the tuned profile applied by create_db_engine (after)
+
+Usage:
+    python benchmarks/bench_sqlite_profile.py
+    python benchmarks/bench_sqlite_profile.py --readers 8 --writers 4 --seconds 10
+
+Readers poll balances and the leaderboard while writers move carats between
+accounts, as the bot, scheduler and API processes do against one file. With
+the rollback journal every commit locks readers out; WAL lets them read the
+last committed state meanwhile.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.models.base import Base, create_db_engine  # noqa: E402
+from src.models.currency import CurrencyType  # noqa: E402
+from src.models.user import User  # noqa: E402
+from src.services.currency_service import CurrencyService  # noqa: E402
+
+ACCOUNT_COUNT = 200
+
+
+def seed(factory: sessionmaker) -> list:
+    """Create funded accounts and return their user ids"""
+    with factory() as db:
+        users = [
+            User(discord_id=f"bench{i}", discord_username=f"Bench{i}") for i in range(ACCOUNT_COUNT)
+        ]
+        db.add_all(users)
+        db.flush()
+        service = CurrencyService(db)
+        for user in users:
+            service.add_balance(user, CurrencyType.CARAT, Decimal("1000"))
+        db.commit()
+        return [user.id for user in users]
+
+
+def run(profile: str, readers: int, writers: int, seconds: float) -> dict:
+    path = Path(tempfile.mkdtemp(prefix="arca-bench-")) / "bench.db"
+    engine = create_db_engine(f"sqlite:///{path}", sqlite_profile=profile)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    user_ids = seed(factory)
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def count(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def reader(seed_value: int):
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            try:
+                with factory() as db:
+                    service = CurrencyService(db)
+                    service.get_user_balances(db.get(User, rng.choice(user_ids)))
+                    service.get_leaderboard(limit=10)
+                count("reads")
+            except Exception:
+                count("errors")
+
+    def writer(seed_value: int):
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            sender_id, recipient_id = rng.sample(user_ids, 2)
+            try:
+                with factory() as db:
+                    CurrencyService(db).transfer(
+                        db.get(User, sender_id),
+                        db.get(User, recipient_id),
+                        CurrencyType.CARAT,
+                        Decimal("1"),
+                        apply_fee=False,
+                    )
+                    db.commit()
+                count("writes")
+            except ValueError:
+                count("writes")
+            except Exception:
+                count("errors")
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {key: value / seconds for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arca Bank SQLite profile benchmark")
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads")
+    parser.add_argument("--writers", type=int, default=2, help="Writer threads")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration per profile")
+    args = parser.parse_args()
+
+    print(f"Readers: {args.readers}  Writers: {args.writers}  Duration: {args.seconds}s")
+    print("-" * 60)
+
+    results = {}
+    for label, profile in (("before (default)", "default"), ("after (tuned)", "tuned")):
+        results[label] = stats = run(profile, args.readers, args.writers, args.seconds)
+        print(
+            f"{label:<18} {stats['reads']:>9.1f} reads/s  {stats['writes']:>9.1f} writes/s  "
+            f"{stats['errors']:.1f} errors/s"
+        )
+
+    before, after = results.values()
+    print("-" * 60)
+    print(
+        f"Speedup: reads {after['reads'] / max(before['reads'], 1e-9):.2f}x, "
+        f"writes {after['writes'] / max(before['writes'], 1e-9):.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Concurrent Transfer Benchmark
+Compares the previous read-check-write balance updates (before) against the
+conditional UPDATE used by CurrencyService (after) under contention
+
+Usage:
+    python benchmarks/bench_transfers.py
+    python benchmarks/bench_transfers.py --threads 16 --transfers 200 --accounts 4
+
+Every thread moves 1 carat at a time between a few shared accounts, so most
+transfers touch a row another thread is updating. "Lost" counts carats
+created or destroyed by overwritten updates; the conditional UPDATE should
+always report 0.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+# Benchmark against a throwaway database, configured before src is imported
+_tmp_dir = tempfile.mkdtemp(prefix="arca-bench-")
+os.environ.setdefault("ARCA_DATABASE_URL", f"sqlite:///{_tmp_dir}/bench.db")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func  # noqa: E402
+
+from src.models.base import get_db, init_db  # noqa: E402
+from src.models.currency import CurrencyBalance, CurrencyType  # noqa: E402
+from src.models.user import User  # noqa: E402
+from src.services.currency_service import CurrencyService  # noqa: E402
+
+STARTING_BALANCE = Decimal("50")
+
+# ==================== PREVIOUS IMPLEMENTATION ====================
+
+
+def legacy_transfer(service: CurrencyService, sender: User, recipient: User, amount: Decimal):
+    """Balances read into Python, checked, and written back as absolute values"""
+    source = service.get_or_create_balance(sender, CurrencyType.CARAT)
+    if Decimal(source.balance) < amount:
+        raise ValueError("Insufficient carat balance")
+    source.balance = Decimal(source.balance) - amount
+    source.updated_at = datetime.utcnow()
+
+    target = service.get_or_create_balance(recipient, CurrencyType.CARAT)
+    target.balance = Decimal(target.balance) + amount
+    target.updated_at = datetime.utcnow()
+
+
+def current_transfer(service: CurrencyService, sender: User, recipient: User, amount: Decimal):
+    service.transfer(sender, recipient, CurrencyType.CARAT, amount, apply_fee=False)
+
+
+# ==================== HARNESS ====================
+
+
+def seed_accounts(count: int) -> list:
+    """Reset balances for `count` accounts and return their user ids"""
+    with get_db() as db:
+        db.query(CurrencyBalance).delete()
+        db.query(User).delete()
+        users = [User(discord_id=f"bench{i}", discord_username=f"Bench{i}") for i in range(count)]
+        db.add_all(users)
+        db.flush()
+        service = CurrencyService(db)
+        for user in users:
+            service.add_balance(user, CurrencyType.CARAT, STARTING_BALANCE)
+        return [user.id for user in users]
+
+
+def run(transfer, user_ids: list, threads: int, per_thread: int) -> dict:
+    barrier = threading.Barrier(threads)
+    counts = {"ok": 0, "insufficient": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        barrier.wait()
+        for _ in range(per_thread):
+            sender_id, recipient_id = rng.sample(user_ids, 2)
+            try:
+                with get_db() as db:
+                    sender, recipient = db.get(User, sender_id), db.get(User, recipient_id)
+                    transfer(CurrencyService(db), sender, recipient, Decimal(1))
+                outcome = "ok"
+            except ValueError:
+                outcome = "insufficient"
+            except Exception:
+                outcome = "errors"
+            with lock:
+                counts[outcome] += 1
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with get_db() as db:
+        total = db.query(func.sum(CurrencyBalance.balance)).scalar()
+    expected = STARTING_BALANCE * len(user_ids)
+
+    return {
+        **counts,
+        "elapsed": elapsed,
+        "tps": (threads * per_thread) / elapsed,
+        "lost": expected - Decimal(str(total)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arca Bank concurrent transfer benchmark")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent workers")
+    parser.add_argument("--transfers", type=int, default=100, help="Transfers per worker")
+    parser.add_argument("--accounts", type=int, default=4, help="Shared accounts")
+    args = parser.parse_args()
+
+    init_db()
+
+    print(f"Threads: {args.threads}  Transfers: {args.transfers}  Accounts: {args.accounts}")
+    print("-" * 70)
+
+    for label, transfer in (
+        ("before (read-check-write)", legacy_transfer),
+        ("after (conditional UPDATE)", current_transfer),
+    ):
+        user_ids = seed_accounts(args.accounts)
+        stats = run(transfer, user_ids, args.threads, args.transfers)
+        print(
+            f"{label:<28} {stats['tps']:>8.1f} transfers/s  "
+            f"ok={stats['ok']} insufficient={stats['insufficient']} "
+            f"errors={stats['errors']} lost={stats['lost']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
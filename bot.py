@@ -6,14 +6,15 @@ A comprehensive economy management bot for Minecraft servers
 import io
 import os
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 import discord
 from discord import app_commands, ui
 from discord.ext import commands
 
-from src.api import ArcaBank, MarketScheduler
-from src.api.scheduler import start_scheduler
+from src.api import AsyncArcaBank, MarketScheduler
+from src.api.scheduler import start_scheduler, stop_scheduler
+from src.models.group_commit import stop_group_commit_writer
 
 # ==================== CONSTANTS & STYLING ====================
 
@@ -107,7 +108,7 @@ def success_embed(title: str, description: str = None) -> discord.Embed:
 class ResignConfirmView(ui.View):
     """Confirmation view for banker resignation"""
 
-    def __init__(self, bank: ArcaBank, discord_id: str):
+    def __init__(self, bank: AsyncArcaBank, discord_id: str):
         super().__init__(timeout=60)
         self.bank = bank
         self.discord_id = discord_id
@@ -122,7 +123,7 @@ class ResignConfirmView(ui.View):
             )
             return
 
-        result = self.bank.resign_as_banker(self.discord_id)
+        result = await self.bank.resign_as_banker(self.discord_id)
 
         if result.success:
             self.confirmed = True
@@ -163,13 +164,14 @@ class ArcaBankBot(commands.Bot):
 
         super().__init__(command_prefix="!", intents=intents)
 
-        self.bank = ArcaBank()
+        # Bank calls run on worker threads so slow queries never block the gateway
+        self.bank = AsyncArcaBank()
         self.scheduler: Optional[MarketScheduler] = None
 
     async def setup_hook(self):
         """Called when bot is ready"""
-        # Start market scheduler
-        self.scheduler = start_scheduler()
+        # Start market scheduler as a task on the bot's event loop
+        self.scheduler = start_scheduler(mode="asyncio")
 
         # Add event callbacks
         self.scheduler.add_callback("on_price_freeze", self._on_price_freeze)
@@ -179,6 +181,13 @@ class ArcaBankBot(commands.Bot):
         await self.tree.sync()
         print("Arca Bank Bot ready!")
 
+    async def close(self):
+        """Shut down the scheduler and bank workers along with the bot"""
+        stop_scheduler()
+        self.bank.shutdown(wait=False)
+        stop_group_commit_writer()
+        await super().close()
+
     def _on_price_freeze(self, data):
         """Called when price is frozen"""
         # You can send alerts to a specific channel here
@@ -198,7 +207,7 @@ bot = ArcaBankBot()
 @bot.tree.command(name="balance", description="Check your Arca Bank balance")
 async def balance(interaction: discord.Interaction):
     """Check user balance"""
-    result = bot.bank.get_balance(str(interaction.user.id))
+    result = await bot.bank.get_balance(str(interaction.user.id))
 
     if result.success:
         embed = create_embed(title=f"{Emoji.BANK} Your Balance", color=Colors.GOLD)
@@ -230,7 +239,7 @@ async def balance(interaction: discord.Interaction):
 @app_commands.describe(minecraft_username="Your Minecraft username (optional)")
 async def register(interaction: discord.Interaction, minecraft_username: Optional[str] = None):
     """Register a new user"""
-    result = bot.bank.register_user(
+    result = await bot.bank.register_user(
         str(interaction.user.id), interaction.user.name, minecraft_username=minecraft_username
     )
 
@@ -261,7 +270,7 @@ async def register(interaction: discord.Interaction, minecraft_username: Optiona
 )
 async def link(interaction: discord.Interaction, minecraft_uuid: str, minecraft_username: str):
     """Link Minecraft account"""
-    result = bot.bank.link_minecraft(str(interaction.user.id), minecraft_uuid, minecraft_username)
+    result = await bot.bank.link_minecraft(str(interaction.user.id), minecraft_uuid, minecraft_username)
 
     if result.success:
         embed = success_embed(
@@ -291,7 +300,7 @@ async def transfer(
     currency: str = "carat",
 ):
     """Transfer currency"""
-    result = bot.bank.transfer(str(interaction.user.id), str(recipient.id), amount, currency)
+    result = await bot.bank.transfer(str(interaction.user.id), str(recipient.id), amount, currency)
 
     if result.success:
         currency_emoji = Emoji.GOLDEN_CARAT if currency == "golden_carat" else Emoji.CARAT
@@ -343,7 +352,7 @@ async def exchange(
     interaction: discord.Interaction, amount: float, from_currency: str, to_currency: str
 ):
     """Exchange currency"""
-    result = bot.bank.exchange_currency(
+    result = await bot.bank.exchange_currency(
         str(interaction.user.id), amount, from_currency, to_currency
     )
 
@@ -374,7 +383,7 @@ async def exchange(
 @bot.tree.command(name="treasury", description="View treasury status")
 async def treasury(interaction: discord.Interaction):
     """View treasury status"""
-    result = bot.bank.get_treasury_status()
+    result = await bot.bank.get_treasury_status()
 
     if result.success:
         # Determine reserve health color
@@ -441,7 +450,7 @@ async def treasury(interaction: discord.Interaction):
 @app_commands.describe(days="Number of days to look back")
 async def history(interaction: discord.Interaction, days: int = 30):
     """View treasury history"""
-    result = bot.bank.get_treasury_history(days=days)
+    result = await bot.bank.get_treasury_history(days=days)
 
     if result.success:
         summary = result.data["summary"]
@@ -500,7 +509,7 @@ async def history(interaction: discord.Interaction, days: int = 30):
 @bot.tree.command(name="market", description="View current market status")
 async def market(interaction: discord.Interaction):
     """View market status"""
-    result = bot.bank.get_market_status()
+    result = await bot.bank.get_market_status()
 
     if result.success:
         # Determine status color
@@ -581,7 +590,7 @@ async def chart(interaction: discord.Interaction, days: int = 7):
     """View market chart"""
     await interaction.response.defer()  # Chart generation takes time
 
-    chart_data = bot.bank.get_market_chart(days=days)
+    chart_data = await bot.bank.get_market_chart(days=days)
 
     if isinstance(chart_data, bytes):
         file = discord.File(io.BytesIO(chart_data), filename="market_chart.png")
@@ -596,7 +605,7 @@ async def treasurychart(interaction: discord.Interaction, days: int = 30):
     """View treasury chart"""
     await interaction.response.defer()
 
-    chart_data = bot.bank.get_treasury_chart(days=days)
+    chart_data = await bot.bank.get_treasury_chart(days=days)
 
     if isinstance(chart_data, bytes):
         file = discord.File(io.BytesIO(chart_data), filename="treasury_chart.png")
@@ -626,7 +635,7 @@ async def advancedchart(
     """
     await interaction.response.defer()
 
-    chart_data = bot.bank.get_advanced_chart(days=days, chart_type=chart_type)
+    chart_data = await bot.bank.get_advanced_chart(days=days, chart_type=chart_type)
 
     if isinstance(chart_data, bytes):
         file = discord.File(io.BytesIO(chart_data), filename="advanced_chart.png")
@@ -653,7 +662,7 @@ async def marketoverview(interaction: discord.Interaction):
     """
     await interaction.response.defer()
 
-    chart_data = bot.bank.get_multi_timeframe_chart()
+    chart_data = await bot.bank.get_multi_timeframe_chart()
 
     if isinstance(chart_data, bytes):
         file = discord.File(io.BytesIO(chart_data), filename="market_overview.png")
@@ -681,7 +690,7 @@ async def deposit(
     interaction: discord.Interaction, user: discord.Member, diamonds: float, carats: float
 ):
     """Banker deposit command"""
-    result = bot.bank.deposit(
+    result = await bot.bank.deposit(
         str(interaction.user.id),
         str(user.id),
         diamonds,
@@ -720,7 +729,7 @@ async def deposit(
 @app_commands.describe(books="Number of books received (90 diamonds each)")
 async def atmprofit(interaction: discord.Interaction, books: int):
     """Record ATM profit"""
-    result = bot.bank.record_atm_profit(
+    result = await bot.bank.record_atm_profit(
         str(interaction.user.id), books, f"ATM profit recorded by {interaction.user.name}"
     )
 
@@ -750,7 +759,7 @@ async def atmprofit(interaction: discord.Interaction, books: int):
 @app_commands.describe(atm_books="Expected ATM books to receive")
 async def mintcheck(interaction: discord.Interaction, atm_books: int = 0):
     """Mint check recommendation"""
-    result = bot.bank.mint_check(str(interaction.user.id), atm_books)
+    result = await bot.bank.mint_check(str(interaction.user.id), atm_books)
 
     if result.success:
         action = result.data["action"]
@@ -803,7 +812,7 @@ async def mintcheck(interaction: discord.Interaction, atm_books: int = 0):
 )
 async def mint(interaction: discord.Interaction, amount: float, currency: str = "carat"):
     """Mint currency"""
-    result = bot.bank.mint(
+    result = await bot.bank.mint(
         str(interaction.user.id), amount, currency, f"Minted by {interaction.user.name}"
     )
 
@@ -838,7 +847,7 @@ async def mint(interaction: discord.Interaction, amount: float, currency: str =
 )
 async def burn(interaction: discord.Interaction, amount: float, currency: str = "carat"):
     """Burn currency"""
-    result = bot.bank.burn(
+    result = await bot.bank.burn(
         str(interaction.user.id), amount, currency, f"Burned by {interaction.user.name}"
     )
 
@@ -867,7 +876,7 @@ async def burn(interaction: discord.Interaction, amount: float, currency: str =
 @app_commands.describe(user="User to promote")
 async def promote(interaction: discord.Interaction, user: discord.Member):
     """Promote to banker"""
-    result = bot.bank.promote_to_banker(str(interaction.user.id), str(user.id))
+    result = await bot.bank.promote_to_banker(str(interaction.user.id), str(user.id))
 
     if result.success:
         embed = success_embed(
@@ -882,7 +891,7 @@ async def promote(interaction: discord.Interaction, user: discord.Member):
 async def resign(interaction: discord.Interaction):
     """Resign from banker position (requires confirmation)"""
     # First check if user is a banker
-    result = bot.bank.get_balance(str(interaction.user.id))
+    result = await bot.bank.get_balance(str(interaction.user.id))
 
     if not result.success:
         await interaction.response.send_message(f"Error: {result.message}", ephemeral=True)
@@ -918,7 +927,7 @@ async def resign(interaction: discord.Interaction):
 @app_commands.describe(price="Price to freeze at (optional)")
 async def freezeprice(interaction: discord.Interaction, price: Optional[float] = None):
     """Freeze price"""
-    result = bot.bank.freeze_price(str(interaction.user.id), price)
+    result = await bot.bank.freeze_price(str(interaction.user.id), price)
 
     if result.success:
         await interaction.response.send_message(f"Frozen: {result.message}")
@@ -929,7 +938,7 @@ async def freezeprice(interaction: discord.Interaction, price: Optional[float] =
 @bot.tree.command(name="unfreezeprice", description="[HEAD BANKER] Unfreeze market price")
 async def unfreezeprice(interaction: discord.Interaction):
     """Unfreeze price"""
-    result = bot.bank.unfreeze_price(str(interaction.user.id))
+    result = await bot.bank.unfreeze_price(str(interaction.user.id))
 
     if result.success:
         await interaction.response.send_message(f"Unfrozen: {result.message}")
@@ -966,7 +975,7 @@ async def reporttrade(
     counterparty: Optional[str] = None,
 ):
     """Report a trade"""
-    result = bot.bank.report_trade(
+    result = await bot.bank.report_trade(
         discord_id=str(interaction.user.id),
         trade_type=trade_type,
         item_name=item_name,
@@ -1005,7 +1014,7 @@ async def reporttrade(
 @app_commands.describe(limit="Number of trades to show")
 async def mytrades(interaction: discord.Interaction, limit: Optional[int] = 10):
     """View user's trades"""
-    result = bot.bank.get_my_trades(str(interaction.user.id), limit=min(limit, 25))
+    result = await bot.bank.get_my_trades(str(interaction.user.id), limit=min(limit, 25))
 
     if result.success:
         trades = result.data.get("trades", [])
@@ -1040,7 +1049,7 @@ async def mytrades(interaction: discord.Interaction, limit: Optional[int] = 10):
 @bot.tree.command(name="mystats", description="View your trading statistics")
 async def mystats(interaction: discord.Interaction):
     """View user's trading stats"""
-    result = bot.bank.get_my_trader_stats(str(interaction.user.id))
+    result = await bot.bank.get_my_trader_stats(str(interaction.user.id))
 
     if result.success:
         data = result.data
@@ -1097,14 +1106,20 @@ async def mystats(interaction: discord.Interaction):
 @app_commands.describe(item_name="Name of the item")
 async def itemprice(interaction: discord.Interaction, item_name: str):
     """Check item price"""
-    result = bot.bank.get_item_price(item_name)
+    result = await bot.bank.get_item_price(item_name)
 
     if result.success:
         data = result.data
         if not data.get("found"):
+            suggestions = data.get("suggestions", [])
+            hint = (
+                "Did you mean: " + ", ".join(f"**{name}**" for name in suggestions)
+                if suggestions
+                else "Try reporting trades with `/reporttrade` to add price data."
+            )
             embed = create_embed(
                 title=f"{Emoji.CROSS} Item Not Found",
-                description=f"No price data found for: **{item_name}**\n\nTry reporting trades with `/reporttrade` to add price data.",
+                description=f"No price data found for: **{item_name}**\n\n{hint}",
                 color=Colors.WARNING,
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -1126,10 +1141,26 @@ async def itemprice(interaction: discord.Interaction, item_name: str):
         await interaction.response.send_message(embed=error_embed(result.message), ephemeral=True)
 
 
+@itemprice.autocomplete("item_name")
+async def itemprice_autocomplete(
+    interaction: discord.Interaction, current: str
+) -> List[app_commands.Choice[str]]:
+    """Suggest known item names while typing"""
+    if not current.strip():
+        return []
+    result = await bot.bank.search_items(current, limit=25)
+    if not result.success:
+        return []
+    return [
+        app_commands.Choice(name=match["item_name"][:100], value=match["item_name"][:100])
+        for match in result.data["results"]
+    ]
+
+
 @bot.tree.command(name="trending", description="View trending items by trading volume")
 async def trending(interaction: discord.Interaction):
     """View trending items"""
-    result = bot.bank.get_trending_items(limit=10)
+    result = await bot.bank.get_trending_items(limit=10)
 
     if result.success:
         items = result.data.get("items", [])
@@ -1165,7 +1196,7 @@ async def trending(interaction: discord.Interaction):
 @app_commands.describe(trade_id="ID of the trade to verify")
 async def verifytrade(interaction: discord.Interaction, trade_id: int):
     """Verify a trade"""
-    result = bot.bank.verify_trade(str(interaction.user.id), trade_id)
+    result = await bot.bank.verify_trade(str(interaction.user.id), trade_id)
 
     if result.success:
         await interaction.response.send_message(f"Trade #{trade_id} verified!")
@@ -1177,7 +1208,7 @@ async def verifytrade(interaction: discord.Interaction, trade_id: int):
 @app_commands.describe(user="The trader to get a report on")
 async def traderreport(interaction: discord.Interaction, user: discord.Member):
     """Get trader report"""
-    result = bot.bank.get_trader_report(str(interaction.user.id), str(user.id))
+    result = await bot.bank.get_trader_report(str(interaction.user.id), str(user.id))
 
     if result.success:
         data = result.data
@@ -1210,7 +1241,7 @@ async def traderreport(interaction: discord.Interaction, user: discord.Member):
 @bot.tree.command(name="alltraders", description="[HEAD BANKER] Get summary of all traders")
 async def alltraders(interaction: discord.Interaction):
     """Get all trader reports"""
-    result = bot.bank.get_all_trader_reports(str(interaction.user.id), limit=20)
+    result = await bot.bank.get_all_trader_reports(str(interaction.user.id), limit=20)
 
     if result.success:
         traders = result.data.get("traders", [])
@@ -1248,7 +1279,7 @@ async def alltraders(interaction: discord.Interaction):
 @app_commands.describe(user="User to set as consumer")
 async def setconsumer(interaction: discord.Interaction, user: discord.Member):
     """Set user to consumer role"""
-    result = bot.bank.set_consumer(str(interaction.user.id), str(user.id))
+    result = await bot.bank.set_consumer(str(interaction.user.id), str(user.id))
 
     if result.success:
         embed = success_embed(
@@ -1262,7 +1293,7 @@ async def setconsumer(interaction: discord.Interaction, user: discord.Member):
 @bot.tree.command(name="toptraders", description="View top traders by volume")
 async def toptraders(interaction: discord.Interaction):
     """View top traders"""
-    result = bot.bank.get_top_traders(limit=10, days=30)
+    result = await bot.bank.get_top_traders(limit=10, days=30)
 
     if result.success:
         traders = result.data.get("traders", [])
@@ -1404,13 +1435,20 @@ async def ping(interaction: discord.Interaction):
         inline=True,
     )
 
+    bank_stats = bot.bank.get_stats()
+    embed.add_field(
+        name="Bank Queue",
+        value=f"```{bank_stats['default']['in_flight']} / {bank_stats['heavy']['in_flight']} in flight```",
+        inline=True,
+    )
+
     await interaction.response.send_message(embed=embed)
 
 
 @bot.tree.command(name="leaderboard", description="View the richest users")
 async def leaderboard(interaction: discord.Interaction):
     """View wealth leaderboard"""
-    result = bot.bank.get_leaderboard(limit=10)
+    result = await bot.bank.get_leaderboard(limit=10)
 
     if result.success:
         users = result.data.get("users", [])
@@ -1441,6 +1479,15 @@ async def leaderboard(interaction: discord.Interaction):
                 inline=True,
             )
 
+        my_rank = await bot.bank.get_my_rank(str(interaction.user.id))
+        if my_rank.success and my_rank.data["ranked"]:
+            embed.add_field(
+                name="Your Rank",
+                value=f"**#{my_rank.data['rank']}** of {my_rank.data['total_ranked']} "
+                f"({my_rank.data['total_value']:,.2f}C)",
+                inline=False,
+            )
+
         await interaction.response.send_message(embed=embed)
     else:
         await interaction.response.send_message(embed=error_embed(result.message), ephemeral=True)
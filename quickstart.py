@@ -67,6 +67,21 @@ def print_status():
     print("\n" + "=" * 50)
 
 
+def rebuild_aggregates():
+    """Rebuild the treasury daily rollups and 24h volume buckets from the ledger"""
+    from src.services.treasury_service import TreasuryService
+    from src.services.volume_service import VolumeService
+
+    ArcaBank()
+
+    with get_db() as db:
+        rollups = TreasuryService(db).rebuild_daily_rollups()
+        recent = VolumeService(db).rebuild()
+
+    print(f"Rebuilt {rollups} daily rollup rows")
+    print(f"Rebuilt 24h volume buckets from {recent} recent transactions")
+
+
 def interactive_demo():
     """Run an interactive demo"""
     bank = ArcaBank()
@@ -135,7 +150,7 @@ def main():
         "command",
         nargs="?",
         default="demo",
-        choices=["demo", "status", "setup-head-banker"],
+        choices=["demo", "status", "setup-head-banker", "rebuild-aggregates"],
         help="Command to run",
     )
     parser.add_argument("--discord-id", help="Discord ID for head banker setup")
@@ -152,6 +167,8 @@ def main():
             print("Error: --discord-id and --username required for setup-head-banker")
             sys.exit(1)
         setup_initial_head_banker(args.discord_id, args.username)
+    elif args.command == "rebuild-aggregates":
+        rebuild_aggregates()
 
 
 if __name__ == "__main__":
@@ -3,7 +3,8 @@ Arca Bank API Layer
 Main interface for Discord bot and external integrations
 """
 
+from .async_bank import AsyncArcaBank
 from .bank_api import ArcaBank
-from .scheduler import MarketScheduler
+from .scheduler import JobScheduler, MarketScheduler
 
-__all__ = ["ArcaBank", "MarketScheduler"]
+__all__ = ["ArcaBank", "AsyncArcaBank", "JobScheduler", "MarketScheduler"]
@@ -0,0 +1,248 @@
+"""
+Async Arca Bank
+Non-blocking facade over ArcaBank for use inside an asyncio event loop
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from ..config import executor as executor_config
+from .bank_api import ArcaBank, OperationResult
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when a worker pool is saturated and backpressure rejects the call"""
+
+
+@dataclass
+class CallStats:
+    """Latency counters for one bank method"""
+
+    calls: int = 0
+    failures: int = 0
+    rejected: int = 0
+    total_wait_seconds: float = 0.0
+    total_run_seconds: float = 0.0
+    max_run_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        completed = max(self.calls, 1)
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait_seconds / completed * 1000,
+            "avg_run_ms": self.total_run_seconds / completed * 1000,
+            "max_run_ms": self.max_run_seconds * 1000,
+        }
+
+
+class BlockingExecutor:
+    """
+    Bounded thread pool that runs blocking callables for an event loop
+
+    At most `max_queue_depth` calls may be queued or running at once. When the
+    pool is full, callers either wait for a slot ('wait') or are rejected
+    immediately with ExecutorBusyError ('reject').
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_depth: int,
+        backpressure: str = "wait",
+        queue_timeout: Optional[float] = None,
+        name: str = "arca",
+    ):
+        if backpressure not in ("wait", "reject"):
+            raise ValueError("backpressure must be 'wait' or 'reject'")
+
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_depth = max(max_queue_depth, max_workers)
+        self.backpressure = backpressure
+        self.queue_timeout = queue_timeout
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight = 0
+        self._stats: Dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """Calls currently queued or running"""
+        return self._in_flight
+
+    async def run(self, label: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            # Created lazily so it binds to the loop that actually uses the executor
+            self._slots = asyncio.Semaphore(self.max_queue_depth)
+            self._loop = loop
+
+        if not await self._acquire():
+            self._record(label, rejected=True)
+            raise ExecutorBusyError(f"{self.name} executor is at capacity")
+
+        self._in_flight += 1
+        queued_at = time.perf_counter()
+        started_at = queued_at
+
+        def timed_call():
+            nonlocal started_at
+            started_at = time.perf_counter()
+            return fn(*args, **kwargs)
+
+        failed = False
+        try:
+            return await loop.run_in_executor(self._pool, timed_call)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            finished_at = time.perf_counter()
+            self._in_flight -= 1
+            self._slots.release()
+            self._record(
+                label,
+                wait=started_at - queued_at,
+                run=finished_at - started_at,
+                failed=failed,
+            )
+
+    async def _acquire(self) -> bool:
+        """Take a queue slot according to the backpressure policy"""
+        if self.backpressure == "reject":
+            if self._slots.locked():
+                return False
+            await self._slots.acquire()
+            return True
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _record(
+        self,
+        label: str,
+        wait: float = 0.0,
+        run: float = 0.0,
+        failed: bool = False,
+        rejected: bool = False,
+    ) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(label, CallStats())
+            if rejected:
+                stats.rejected += 1
+                return
+            stats.calls += 1
+            stats.failures += int(failed)
+            stats.total_wait_seconds += wait
+            stats.total_run_seconds += run
+            stats.max_run_seconds = max(stats.max_run_seconds, run)
+
+    def get_stats(self) -> dict:
+        """Get pool occupancy and per-call latency metrics"""
+        with self._lock:
+            calls = {label: stats.to_dict() for label, stats in self._stats.items()}
+
+        return {
+            "workers": self.max_workers,
+            "max_queue_depth": self.max_queue_depth,
+            "backpressure": self.backpressure,
+            "in_flight": self._in_flight,
+            "calls": calls,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work and release the worker threads"""
+        self._pool.shutdown(wait=wait)
+
+
+class AsyncArcaBank:
+    """
+    Awaitable wrapper around ArcaBank
+
+    Every public ArcaBank method is exposed as a coroutine with the same
+    signature. Chart rendering and reports run on a separate pool so they
+    cannot starve cheap commands like /balance.
+
+    Usage:
+        bank = AsyncArcaBank()
+        result = await bank.get_balance(discord_id)
+    """
+
+    HEAVY_METHODS = frozenset(
+        {
+            "get_market_chart",
+            "get_advanced_chart",
+            "get_market_indicators",
+            "get_multi_timeframe_chart",
+            "get_treasury_chart",
+            "get_sparkline",
+            "get_treasury_history",
+            "get_trader_report",
+            "get_all_trader_reports",
+            "get_leaderboard",
+        }
+    )
+
+    def __init__(self, bank: Optional[ArcaBank] = None):
+        self.bank = bank or ArcaBank()
+
+        self._executor = BlockingExecutor(
+            max_workers=executor_config.WORKERS,
+            max_queue_depth=executor_config.MAX_QUEUE_DEPTH,
+            backpressure=executor_config.BACKPRESSURE,
+            queue_timeout=executor_config.QUEUE_TIMEOUT_SECONDS,
+            name="arca-bank",
+        )
+        self._heavy_executor = BlockingExecutor(
+            max_workers=executor_config.HEAVY_WORKERS,
+            max_queue_depth=executor_config.MAX_QUEUE_DEPTH,
+            backpressure=executor_config.BACKPRESSURE,
+            queue_timeout=executor_config.QUEUE_TIMEOUT_SECONDS,
+            name="arca-bank-heavy",
+        )
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.bank, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        pool = self._heavy_executor if name in self.HEAVY_METHODS else self._executor
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            try:
+                return await pool.run(name, attr, *args, **kwargs)
+            except ExecutorBusyError as e:
+                return OperationResult(
+                    success=False,
+                    message="Arca Bank is busy right now, please try again shortly",
+                    error=str(e),
+                )
+
+        return call
+
+    def get_stats(self) -> dict:
+        """Get executor metrics for both pools"""
+        return {
+            "default": self._executor.get_stats(),
+            "heavy": self._heavy_executor.get_stats(),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down both worker pools"""
+        self._executor.shutdown(wait=wait)
+        self._heavy_executor.shutdown(wait=wait)
@@ -4,15 +4,20 @@ Main unified interface for all banking operations
 This is the primary class Discord bots should interact with
 """
 
+import functools
+import math
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
-from decimal import Decimal
-from typing import Optional, Tuple, Union
+from decimal import Decimal, InvalidOperation
+from typing import List, Optional, Tuple, Union
 
-from ..models.base import get_db, init_db
+from ..config import database as database_config
+from ..models.base import get_db, get_read_db, init_db
 from ..models.currency import CurrencyType
+from ..models.group_commit import get_group_commit_writer
 from ..models.trade import ItemCategory, TradeType
 from ..models.treasury import TransactionType
-from ..models.user import User, UserRole
+from ..models.user import UserRole
 from ..services.chart_service import ChartService
 from ..services.currency_service import CurrencyService
 from ..services.market_service import MarketService
@@ -32,18 +37,62 @@ class OperationResult:
     error: Optional[str] = None
 
 
+def _write_operation(method):
+    """
+    Run a write method through the group-commit writer when the bank uses it
+
+    The caller blocks until the batch holding its operation is committed and
+    gets the method's own result; a batch failure, or no commit within the
+    writer's timeout, is reported as a failed OperationResult.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        writer = self._group_commit_writer
+        if writer is None or writer.in_writer():
+            return method(self, *args, **kwargs)
+        future = writer.submit(method, self, *args, **kwargs)
+        try:
+            return future.result(timeout=writer.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                error = "Timed out waiting for the group-commit writer"
+            else:
+                error = "Timed out waiting for commit; the operation may still be applied"
+            return OperationResult(success=False, message="Operation failed", error=error)
+        except Exception as e:
+            return OperationResult(success=False, message="Operation failed", error=str(e))
+
+    return wrapper
+
+
 class ArcaBank:
     """
     Main API for Arca Bank operations
     All Discord bot commands should go through this class
     """
 
-    def __init__(self):
-        """Initialize the bank API"""
+    def __init__(self, group_commit: Optional[bool] = None):
+        """
+        Initialize the bank API
+
+        Args:
+            group_commit: Commit write operations in batches through one writer
+                thread (defaults to ARCA_GROUP_COMMIT)
+        """
         init_db()
+        # Create the singleton rows up front so read-only paths never have to
+        with get_db() as db:
+            TreasuryService(db).get_treasury()
+            MarketService(db).get_market_index()
+
+        if group_commit is None:
+            group_commit = database_config.GROUP_COMMIT
+        self._group_commit_writer = get_group_commit_writer() if group_commit else None
 
     # ==================== USER OPERATIONS ====================
 
+    @_write_operation
     def register_user(
         self,
         discord_id: str,
@@ -76,6 +125,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Failed to register user", error=str(e))
 
+    @_write_operation
     def link_minecraft(
         self, discord_id: str, minecraft_uuid: str, minecraft_username: str
     ) -> OperationResult:
@@ -108,7 +158,7 @@ class ArcaBank:
     def get_user_info(self, discord_id: str) -> OperationResult:
         """Get user information and balances"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 user_service = UserService(db)
                 currency_service = CurrencyService(db)
 
@@ -141,7 +191,7 @@ class ArcaBank:
     def get_balance(self, discord_id: str) -> OperationResult:
         """Get user's currency balances"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 user_service = UserService(db)
                 currency_service = CurrencyService(db)
 
@@ -164,6 +214,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Failed to get balance", error=str(e))
 
+    @_write_operation
     def transfer(
         self,
         sender_discord_id: str,
@@ -217,6 +268,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Transfer failed", error=str(e))
 
+    @_write_operation
     def exchange_currency(
         self, discord_id: str, amount: float, from_currency: str, to_currency: str
     ) -> OperationResult:
@@ -272,7 +324,7 @@ class ArcaBank:
     def get_treasury_status(self) -> OperationResult:
         """Get current treasury status (public read)"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 treasury_service = TreasuryService(db)
                 status = treasury_service.get_treasury_status()
 
@@ -302,7 +354,7 @@ class ArcaBank:
     def get_treasury_history(self, days: int = 30, limit: int = 50) -> OperationResult:
         """Get treasury transaction history"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 treasury_service = TreasuryService(db)
 
                 inflow_outflow = treasury_service.get_inflow_outflow(days)
@@ -342,6 +394,7 @@ class ArcaBank:
 
     # ==================== BANKER OPERATIONS (Write Permission) ====================
 
+    @_write_operation
     def deposit(
         self,
         banker_discord_id: str,
@@ -383,6 +436,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Deposit failed", error=str(e))
 
+    @_write_operation
     def record_atm_profit(
         self, banker_discord_id: str, book_count: int, notes: Optional[str] = None
     ) -> OperationResult:
@@ -451,6 +505,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Mint check failed", error=str(e))
 
+    @_write_operation
     def mint(
         self,
         admin_discord_id: str,
@@ -492,6 +547,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Minting failed", error=str(e))
 
+    @_write_operation
     def burn(
         self,
         admin_discord_id: str,
@@ -533,6 +589,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Burning failed", error=str(e))
 
+    @_write_operation
     def promote_to_banker(self, admin_discord_id: str, user_discord_id: str) -> OperationResult:
         """Promote user to banker role (Head Banker only)"""
         try:
@@ -559,6 +616,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Promotion failed", error=str(e))
 
+    @_write_operation
     def resign_as_banker(self, discord_id: str) -> OperationResult:
         """
         Allow a banker to voluntarily resign their position.
@@ -589,7 +647,7 @@ class ArcaBank:
     def get_market_status(self) -> OperationResult:
         """Get current market status"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 market_service = MarketService(db)
                 status = market_service.get_market_status()
 
@@ -599,6 +657,10 @@ class ArcaBank:
                     data={
                         "current_index": float(status["current_index"]),
                         "delayed_average": float(status["delayed_average"]),
+                        "delayed_averages": {
+                            window: float(value)
+                            for window, value in status["delayed_averages"].items()
+                        },
                         "carat_price": float(status["carat_price"]),
                         "effective_price": float(status["effective_price"]),
                         "circulation_status": status["circulation_status"],
@@ -611,6 +673,10 @@ class ArcaBank:
                         "change_1h": float(status["change_1h"]),
                         "change_24h": float(status["change_24h"]),
                         "change_7d": float(status["change_7d"]),
+                        "change_30d": float(status["change_30d"]),
+                        "change_ytd": float(status["change_ytd"]),
+                        "high_24h": float(status["high_24h"]) if status["high_24h"] else None,
+                        "low_24h": float(status["low_24h"]) if status["low_24h"] else None,
                         "total_circulation": float(status["total_circulation"]),
                     },
                 )
@@ -624,9 +690,11 @@ class ArcaBank:
     ) -> Union[bytes, OperationResult]:
         """Generate market chart image"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 chart_service = ChartService(db)
-                return chart_service.generate_market_chart(days=days, chart_type=chart_type)
+                return chart_service.get_cached_chart(
+                    "market_chart", days=days, chart_type=chart_type
+                )
         except Exception as e:
             return OperationResult(success=False, message="Failed to generate chart", error=str(e))
 
@@ -650,9 +718,10 @@ class ArcaBank:
         - Volume bars
         """
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 chart_service = ChartService(db)
-                return chart_service.generate_advanced_chart(
+                return chart_service.get_cached_chart(
+                    "advanced_chart",
                     days=days,
                     show_volume=show_volume,
                     show_rsi=show_rsi,
@@ -665,15 +734,51 @@ class ArcaBank:
                 success=False, message="Failed to generate advanced chart", error=str(e)
             )
 
+    def get_market_indicators(self, days: int = 30) -> OperationResult:
+        """
+        Get technical indicator series (SMA, EMA, Bollinger, RSI, MACD, VWAP)
+
+        Values are None during each indicator's warm-up period. "latest" holds
+        the most recent value of every series.
+        """
+        try:
+            with get_read_db() as db:
+                chart_service = ChartService(db)
+                series = chart_service.calculate_indicators(days=days)
+
+            timestamps = series.pop("timestamps")
+            data = {
+                name: [None if math.isnan(v) else v for v in values.tolist()]
+                for name, values in series.items()
+            }
+
+            return OperationResult(
+                success=True,
+                message="Market indicators calculated",
+                data={
+                    "days": days,
+                    "points": len(timestamps),
+                    "timestamps": timestamps.tolist(),
+                    "series": data,
+                    "latest": {
+                        name: values[-1] if values else None for name, values in data.items()
+                    },
+                },
+            )
+        except Exception as e:
+            return OperationResult(
+                success=False, message="Failed to calculate indicators", error=str(e)
+            )
+
     def get_multi_timeframe_chart(self) -> Union[bytes, OperationResult]:
         """
         Generate multi-timeframe overview chart
         Shows 1D, 7D, 30D, and 90D performance at a glance
         """
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 chart_service = ChartService(db)
-                return chart_service.generate_multi_timeframe_chart()
+                return chart_service.get_cached_chart("multi_timeframe_chart")
         except Exception as e:
             return OperationResult(
                 success=False, message="Failed to generate timeframe chart", error=str(e)
@@ -682,18 +787,18 @@ class ArcaBank:
     def get_treasury_chart(self, days: int = 30) -> Union[bytes, OperationResult]:
         """Generate treasury health chart"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 chart_service = ChartService(db)
-                return chart_service.generate_treasury_chart(days=days)
+                return chart_service.get_cached_chart("treasury_chart", days=days)
         except Exception as e:
             return OperationResult(success=False, message="Failed to generate chart", error=str(e))
 
     def get_sparkline(self, days: int = 7) -> Union[bytes, OperationResult]:
         """Generate small sparkline chart"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 chart_service = ChartService(db)
-                return chart_service.generate_mini_sparkline(days=days)
+                return chart_service.get_cached_chart("mini_sparkline", days=days)
         except Exception as e:
             return OperationResult(
                 success=False, message="Failed to generate sparkline", error=str(e)
@@ -701,6 +806,7 @@ class ArcaBank:
 
     # ==================== ADMIN MARKET CONTROLS ====================
 
+    @_write_operation
     def freeze_price(self, admin_discord_id: str, price: Optional[float] = None) -> OperationResult:
         """Manually freeze price (Head Banker only)"""
         try:
@@ -722,6 +828,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Failed to freeze price", error=str(e))
 
+    @_write_operation
     def unfreeze_price(self, admin_discord_id: str) -> OperationResult:
         """Manually unfreeze price (Head Banker only)"""
         try:
@@ -743,8 +850,32 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Failed to unfreeze price", error=str(e))
 
+    def backfill_snapshots(self, admin_discord_id: str) -> OperationResult:
+        """Rebuild market snapshots missed during downtime from the ledger (Head Banker only)"""
+        try:
+            with get_db() as db:
+                user_service = UserService(db)
+                market_service = MarketService(db)
+
+                admin = user_service.get_by_discord_id(admin_discord_id)
+                if not admin or not admin.can_mint():
+                    return OperationResult(success=False, message="Head Banker permission required")
+
+                inserted = market_service.backfill_snapshots()
+
+                return OperationResult(
+                    success=True,
+                    message=f"Backfilled {sum(inserted.values())} market snapshots",
+                    data={"inserted": inserted},
+                )
+        except Exception as e:
+            return OperationResult(
+                success=False, message="Failed to backfill snapshots", error=str(e)
+            )
+
     # ==================== TRADE REPORTING ====================
 
+    @_write_operation
     def report_trade(
         self,
         discord_id: str,
@@ -838,6 +969,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Failed to report trade", error=str(e))
 
+    @_write_operation
     def report_trade_by_uuid(
         self,
         minecraft_uuid: str,
@@ -905,12 +1037,108 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Failed to report trade", error=str(e))
 
+    @_write_operation
+    def report_trades_bulk_by_uuid(self, trades: List[dict]) -> OperationResult:
+        """
+        Report a batch of trades using Minecraft UUIDs (for Java mod)
+
+        Each entry takes report_trade_by_uuid's keyword arguments. Entries that
+        are malformed or fail validation are returned in "rejected" with their
+        index; all other entries are recorded together in one transaction.
+        """
+        try:
+            with get_db() as db:
+                user_service = UserService(db)
+                trade_service = TradeService(db)
+
+                players = user_service.get_by_minecraft_uuids(
+                    [entry.get("minecraft_uuid") for entry in trades if isinstance(entry, dict)]
+                )
+
+                accepted, accepted_index, rejected = [], [], []
+                for i, entry in enumerate(trades):
+                    if not isinstance(entry, dict):
+                        rejected.append({"index": i, "error": "Trade entry must be an object"})
+                        continue
+
+                    user = players.get(entry.get("minecraft_uuid"))
+                    if not user:
+                        rejected.append({"index": i, "error": "Player not found"})
+                        continue
+
+                    try:
+                        tt = TradeType(str(entry.get("trade_type", "")).upper())
+                    except ValueError:
+                        rejected.append({"index": i, "error": "Invalid trade type"})
+                        continue
+
+                    try:
+                        cat = ItemCategory(str(entry.get("item_category", "OTHER")).upper())
+                    except ValueError:
+                        cat = ItemCategory.OTHER
+
+                    try:
+                        trade = {
+                            "reporter": user,
+                            "trade_type": tt,
+                            "item_name": entry["item_name"],
+                            "item_quantity": entry["item_quantity"],
+                            "carat_amount": Decimal(str(entry["carat_amount"])),
+                            "golden_carat_amount": Decimal(
+                                str(entry.get("golden_carat_amount", 0.0))
+                            ),
+                            "item_category": cat,
+                            "counterparty_name": entry.get("counterparty_name"),
+                            "world_name": entry.get("world_name"),
+                            "location": entry.get("location"),
+                            "notes": entry.get("notes"),
+                        }
+                        trade_service.validate_trade(
+                            user,
+                            trade["item_quantity"],
+                            trade["carat_amount"],
+                            trade["golden_carat_amount"],
+                        )
+                    except KeyError as e:
+                        rejected.append({"index": i, "error": f"Missing field: {e.args[0]}"})
+                        continue
+                    except (TypeError, InvalidOperation):
+                        rejected.append({"index": i, "error": "Invalid quantity or amount"})
+                        continue
+                    except (PermissionError, ValueError) as e:
+                        rejected.append({"index": i, "error": str(e)})
+                        continue
+
+                    accepted.append(trade)
+                    accepted_index.append(i)
+
+                reports = trade_service.report_trades_bulk(accepted)
+
+                return OperationResult(
+                    success=bool(reports) or not trades,
+                    message=f"{len(reports)} trades reported, {len(rejected)} rejected",
+                    data={
+                        "accepted": [
+                            {
+                                "index": i,
+                                "trade_id": trade.id,
+                                "item_name": trade.item_name,
+                                "price_per_item": float(trade.price_per_item),
+                            }
+                            for i, trade in zip(accepted_index, reports)
+                        ],
+                        "rejected": rejected,
+                    },
+                )
+        except Exception as e:
+            return OperationResult(success=False, message="Failed to report trades", error=str(e))
+
     def get_my_trades(
         self, discord_id: str, limit: int = 20, trade_type: Optional[str] = None
     ) -> OperationResult:
         """Get user's recent trades"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 user_service = UserService(db)
                 trade_service = TradeService(db)
 
@@ -954,7 +1182,7 @@ class ArcaBank:
     def get_my_trader_stats(self, discord_id: str) -> OperationResult:
         """Get user's trading statistics"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 user_service = UserService(db)
                 trade_service = TradeService(db)
 
@@ -991,6 +1219,7 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Failed to get stats", error=str(e))
 
+    @_write_operation
     def verify_trade(self, banker_discord_id: str, trade_id: int) -> OperationResult:
         """Verify a trade (Banker only)"""
         try:
@@ -1023,7 +1252,7 @@ class ArcaBank:
     def get_trader_report(self, admin_discord_id: str, target_discord_id: str) -> OperationResult:
         """Get comprehensive trader report (Head Banker only)"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 user_service = UserService(db)
                 trade_service = TradeService(db)
 
@@ -1065,7 +1294,7 @@ class ArcaBank:
     def get_all_trader_reports(self, admin_discord_id: str, limit: int = 50) -> OperationResult:
         """Get summary reports for all traders (Head Banker only)"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 user_service = UserService(db)
                 trade_service = TradeService(db)
 
@@ -1086,7 +1315,7 @@ class ArcaBank:
     def get_top_traders(self, limit: int = 10, days: int = 30) -> OperationResult:
         """Get top traders by volume"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 trade_service = TradeService(db)
                 traders = trade_service.get_top_traders(limit, days)
 
@@ -1099,15 +1328,20 @@ class ArcaBank:
     def get_item_price(self, item_name: str) -> OperationResult:
         """Get current market price for an item"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 trade_service = TradeService(db)
                 price = trade_service.get_item_price(item_name)
 
                 if not price:
+                    suggestions = [
+                        match["item_name"]
+                        for match in trade_service.search_items(item_name, limit=5)
+                        if match["current_price"] is not None
+                    ]
                     return OperationResult(
                         success=True,
                         message=f"No price data for {item_name}",
-                        data={"found": False},
+                        data={"found": False, "suggestions": suggestions},
                     )
 
                 return OperationResult(
@@ -1128,10 +1362,29 @@ class ArcaBank:
         except Exception as e:
             return OperationResult(success=False, message="Failed to get price", error=str(e))
 
+    def search_items(self, query: str, limit: int = 10) -> OperationResult:
+        """
+        Search item names by partial or misspelled input
+
+        Used for autocomplete and "did you mean" suggestions.
+        """
+        try:
+            with get_read_db() as db:
+                trade_service = TradeService(db)
+                results = trade_service.search_items(query, limit=limit)
+
+                return OperationResult(
+                    success=True,
+                    message=f"Found {len(results)} items",
+                    data={"query": query, "results": results},
+                )
+        except Exception as e:
+            return OperationResult(success=False, message="Failed to search items", error=str(e))
+
     def get_trending_items(self, limit: int = 10) -> OperationResult:
         """Get items with highest trading volume"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 trade_service = TradeService(db)
                 items = trade_service.get_trending_items(limit)
 
@@ -1156,6 +1409,7 @@ class ArcaBank:
 
     # ==================== ROLE MANAGEMENT ====================
 
+    @_write_operation
     def set_consumer(self, admin_discord_id: str, target_discord_id: str) -> OperationResult:
         """Set a user to Consumer role (read-only)"""
         try:
@@ -1183,35 +1437,60 @@ class ArcaBank:
     def get_leaderboard(self, limit: int = 10) -> OperationResult:
         """Get wealth leaderboard - top users by total value"""
         try:
-            with get_db() as db:
+            with get_read_db() as db:
                 currency_service = CurrencyService(db)
+                leaders = currency_service.get_leaderboard(limit=limit)
 
-                # Get all users
-                users = db.query(User).filter(User.role != UserRole.CONSUMER).all()
-
-                # Calculate total value for each user
-                user_values = []
-                for user in users:
-                    balances = currency_service.get_user_balances(user)
-                    total_value = float(balances["total_in_carats"])
-                    if total_value > 0:  # Only include users with balance
-                        user_values.append(
+                return OperationResult(
+                    success=True,
+                    message=f"Top {len(leaders)} users by wealth",
+                    data={
+                        "users": [
                             {
-                                "username": user.minecraft_username or user.discord_username,
-                                "discord_id": user.discord_id,
-                                "carats": float(balances["carats"]),
-                                "golden_carats": float(balances["golden_carats"]),
-                                "total_value": total_value,
+                                "rank": entry["rank"],
+                                "username": entry["username"],
+                                "discord_id": entry["discord_id"],
+                                "carats": float(entry["carats"]),
+                                "golden_carats": float(entry["golden_carats"]),
+                                "total_value": float(entry["total_value"]),
                             }
-                        )
+                            for entry in leaders
+                        ]
+                    },
+                )
+        except Exception as e:
+            return OperationResult(success=False, message="Failed to get leaderboard", error=str(e))
+
+    def get_my_rank(self, discord_id: str) -> OperationResult:
+        """Get a user's position on the wealth leaderboard"""
+        try:
+            with get_read_db() as db:
+                user_service = UserService(db)
+                currency_service = CurrencyService(db)
+
+                user = user_service.get_by_discord_id(discord_id)
+                if not user:
+                    return OperationResult(success=False, message="User not registered")
 
-                # Sort by total value descending
-                user_values.sort(key=lambda x: x["total_value"], reverse=True)
+                rank = currency_service.get_wealth_rank(user)
+                if rank is None:
+                    return OperationResult(
+                        success=True,
+                        message="User is not ranked yet",
+                        data={"ranked": False},
+                    )
 
                 return OperationResult(
                     success=True,
-                    message=f"Top {min(limit, len(user_values))} users by wealth",
-                    data={"users": user_values[:limit]},
+                    message=f"Rank #{rank['rank']} of {rank['total_ranked']}",
+                    data={
+                        "ranked": True,
+                        "rank": rank["rank"],
+                        "total_ranked": rank["total_ranked"],
+                        "carats": float(rank["carats"]),
+                        "golden_carats": float(rank["golden_carats"]),
+                        "total_value": float(rank["total_value"]),
+                    },
                 )
         except Exception as e:
-            return OperationResult(success=False, message="Failed to get leaderboard", error=str(e))
+            return OperationResult(success=False, message="Failed to get rank", error=str(e))
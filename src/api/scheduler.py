@@ -4,179 +4,582 @@ Background tasks for market updates, snapshots, and monitoring
 """
 
 import asyncio
+import heapq
+import itertools
 import logging
+import math
+import random
+import threading
 import time
-from datetime import datetime, timedelta
-from threading import Thread
-from typing import Callable, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
 
+from sqlalchemy import func
+
+from ..config import cache as cache_config
+from ..config import database as database_config
 from ..config import economy
+from ..config import scheduler as scheduler_config
 from ..models.base import get_db
+from ..models.market import MarketSnapshot
+from ..models.treasury import TreasurySnapshot
 from ..services.market_service import MarketService
+from ..services.price_ticks import price_ticks
 from ..services.treasury_service import TreasuryService
 
 logger = logging.getLogger(__name__)
 
+CATCH_UP_POLICIES = ("latest", "all", "skip")
+
+# Longest single sleep, so wall-clock jumps (suspend, NTP) are noticed promptly
+_MAX_SLEEP_SECONDS = 60.0
+
+
+@dataclass
+class JobStats:
+    """Timing and outcome counters for one job"""
+
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0  # occurrences missed and not replayed
+    last_started: Optional[float] = None
+    last_duration: float = 0.0
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+    last_lag: float = 0.0  # seconds between the scheduled slot and the actual start
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started": (
+                datetime.utcfromtimestamp(self.last_started).isoformat()
+                if self.last_started
+                else None
+            ),
+            "last_duration_ms": round(self.last_duration * 1000, 2),
+            "avg_duration_ms": (
+                round(self.total_duration / self.runs * 1000, 2) if self.runs else 0.0
+            ),
+            "max_duration_ms": round(self.max_duration * 1000, 2),
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "last_error": self.last_error,
+        }
+
+
+@dataclass
+class ScheduledJob:
+    """A recurring job on a fixed grid of slots, interval seconds apart"""
+
+    name: str
+    func: Callable
+    interval: float
+    align: bool = True
+    jitter: float = 0.0
+    catch_up: str = "latest"
+    uses_db: bool = True
+    takes_slot: bool = False  # func also receives the slot time it runs for
+    slot: float = 0.0  # next scheduled time (epoch seconds, before jitter)
+    due: float = 0.0  # slot plus this run's jitter
+    stats: JobStats = field(default_factory=JobStats)
+
+
+class JobScheduler:
+    """
+    Heap-based scheduler for recurring jobs
+
+    Each job runs on a fixed grid: aligned jobs fire on exact multiples of
+    their interval since the Unix epoch (so minute, hour, and day jobs land
+    on UTC boundaries), and the next slot is always derived from the grid
+    rather than from when the last run finished, so there is no drift.
+    The runner sleeps until the earliest due job instead of polling.
+
+    Jobs due together share one database session; each runs in its own
+    savepoint so a failing job does not roll back the others.
+
+    Runs in a daemon thread (start()) or as an asyncio task on the running
+    loop (start(mode="asyncio")), where blocking work goes to the loop's
+    default executor.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
+
+        self._running = False
+        self._mode: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._async_wake: Optional[asyncio.Event] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    # ==================== JOBS ====================
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable,
+        interval: float,
+        align: bool = True,
+        jitter: Optional[float] = None,
+        catch_up: Optional[str] = None,
+        uses_db: bool = True,
+        takes_slot: bool = False,
+        last_run: Optional[float] = None,
+        run_immediately: bool = False,
+    ) -> ScheduledJob:
+        """
+        Register a recurring job
+
+        Args:
+            name: Unique job name
+            func: Called as func(db) when uses_db, else func()
+            interval: Seconds between runs
+            align: Fire on multiples of interval since the epoch (else relative to now)
+            jitter: Max random delay per run (defaults to the configured jitter)
+            catch_up: 'latest', 'all', or 'skip' for missed runs (defaults to config).
+                'all' replays each missed slot, so it requires takes_slot; jobs
+                without it fall back to 'latest' when 'all' is only the default
+            takes_slot: Also pass the scheduled slot as a naive UTC datetime,
+                func(db, slot) or func(slot)
+            last_run: Epoch seconds of the last run in a previous process; slots
+                missed since then are treated per catch_up
+            run_immediately: Run on the next tick, then follow the grid
+        """
+        if catch_up is None:
+            catch_up = scheduler_config.CATCH_UP
+            if catch_up == "all" and not takes_slot:
+                catch_up = "latest"
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"catch_up must be one of {CATCH_UP_POLICIES}")
+        if catch_up == "all" and not takes_slot:
+            # Replayed runs would be indistinguishable from each other
+            raise ValueError("catch_up 'all' requires a job that takes its slot time")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        now = self.clock()
+        if align:
+            next_boundary = (math.floor(now / interval) + 1) * interval
+            if last_run is not None and math.floor(last_run / interval) < math.floor(
+                now / interval
+            ):
+                # The first boundary after the last recorded run was missed
+                slot = (math.floor(last_run / interval) + 1) * interval
+            else:
+                slot = next_boundary
+        else:
+            slot = last_run + interval if last_run is not None else now + interval
+
+        job = ScheduledJob(
+            name=name,
+            func=func,
+            interval=interval,
+            align=align,
+            jitter=scheduler_config.JITTER_SECONDS if jitter is None else jitter,
+            catch_up=catch_up,
+            uses_db=uses_db,
+            takes_slot=takes_slot,
+        )
+
+        with self._lock:
+            if name in self._jobs:
+                raise ValueError(f"Job already registered: {name}")
+            self._jobs[name] = job
+            self._push(job, now if run_immediately else slot, jittered=not run_immediately)
+        self._notify()
+        return job
+
+    def remove_job(self, name: str) -> None:
+        """Unregister a job (its queued entry is dropped lazily)"""
+        with self._lock:
+            self._jobs.pop(name, None)
+
+    def get_job(self, name: str) -> Optional[ScheduledJob]:
+        return self._jobs.get(name)
+
+    @staticmethod
+    def _next_slot(job: ScheduledJob, slot: float) -> float:
+        """The grid slot after slot (an immediate first run rejoins the grid)"""
+        if job.align:
+            return (math.floor(slot / job.interval) + 1) * job.interval
+        return slot + job.interval
+
+    def _push(self, job: ScheduledJob, slot: float, jittered: bool = True) -> None:
+        job.slot = slot
+        job.due = slot + (random.uniform(0, job.jitter) if jittered and job.jitter > 0 else 0)
+        heapq.heappush(self._heap, (job.due, next(self._sequence), job))
+
+    # ==================== EXECUTION ====================
+
+    def run_pending(self, now: Optional[float] = None) -> int:
+        """
+        Run every job that is due and reschedule it
+
+        Returns:
+            Number of jobs executed
+        """
+        now = self.clock() if now is None else now
+        due = []
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, job = heapq.heappop(self._heap)
+                if self._jobs.get(job.name) is not job:
+                    continue  # removed
+
+                missed = max(0, math.floor((now - job.slot) / job.interval))
+                if job.catch_up == "skip" and missed:
+                    job.stats.skipped += missed + 1
+                    self._push(job, job.slot + (missed + 1) * job.interval)
+                    continue
+
+                if job.catch_up == "all":
+                    # Replay the most recent missed slots one tick at a time
+                    replay = min(missed, scheduler_config.MAX_CATCH_UP_RUNS)
+                    job.stats.skipped += missed - replay
+                    slot = job.slot + (missed - replay) * job.interval
+                else:
+                    # One run covers every missed slot
+                    job.stats.skipped += missed
+                    slot = job.slot + missed * job.interval
+
+                due.append((job, slot))
+                self._push(job, self._next_slot(job, slot))
+
+        if due:
+            self._execute(due, now)
+        return len(due)
+
+    def run_job(self, name: str) -> bool:
+        """Run a job now, outside its schedule. Returns False if it failed."""
+        job = self._jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        now = self.clock()
+        self._execute([(job, now)], now)
+        return job.stats.last_error is None
+
+    def _execute(self, due: List[tuple], now: float) -> None:
+        """Run due jobs, sharing one session among those that need the database"""
+        db_jobs = [(job, slot) for job, slot in due if job.uses_db]
+        plain_jobs = [(job, slot) for job, slot in due if not job.uses_db]
+
+        if db_jobs:
+            try:
+                with get_db() as db:
+                    for job, slot in db_jobs:
+                        self._run_one(job, slot, db)
+            except Exception as e:
+                # The shared commit failed: none of this tick's work was saved
+                logger.error(f"Scheduler commit failed: {e}")
+                for job, _ in db_jobs:
+                    job.stats.failures += 1
+                    job.stats.last_error = f"commit failed: {e}"
+
+        for job, slot in plain_jobs:
+            self._run_one(job, slot, None)
+
+    def _run_one(self, job: ScheduledJob, slot: float, db) -> None:
+        stats = job.stats
+        stats.last_started = self.clock()
+        stats.last_lag = max(0.0, stats.last_started - slot)
+        started = time.perf_counter()
+
+        args = (datetime.utcfromtimestamp(slot),) if job.takes_slot else ()
+        try:
+            if db is None:
+                job.func(*args)
+            else:
+                with db.begin_nested():
+                    job.func(db, *args)
+            stats.runs += 1
+            stats.last_error = None
+        except Exception as e:
+            stats.failures += 1
+            stats.last_error = str(e)
+            logger.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            duration = time.perf_counter() - started
+            stats.last_duration = duration
+            stats.total_duration += duration
+            stats.max_duration = max(stats.max_duration, duration)
+
+    def seconds_until_next(self) -> float:
+        """Seconds until the earliest due job, capped for clock-jump safety"""
+        with self._lock:
+            if not self._heap:
+                return _MAX_SLEEP_SECONDS
+            delay = self._heap[0][0] - self.clock()
+        return min(max(delay, 0.0), _MAX_SLEEP_SECONDS)
+
+    # ==================== RUNNERS ====================
+
+    def start(self, mode: str = "thread"):
+        """
+        Start running jobs
+
+        Args:
+            mode: 'thread' for a daemon thread, or 'asyncio' to run as a task on
+                the current event loop (must be called from a coroutine)
+        """
+        if self._running:
+            logger.warning("Scheduler already running")
+            return
+
+        if mode == "asyncio":
+            self._loop = asyncio.get_running_loop()
+            self._async_wake = asyncio.Event()
+            self._running = True
+            self._task = self._loop.create_task(self._run_async())
+        elif mode == "thread":
+            self._running = True
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._run_thread, daemon=True)
+            self._thread.start()
+        else:
+            raise ValueError("mode must be 'thread' or 'asyncio'")
+
+        self._mode = mode
+        logger.info(f"Scheduler started ({mode})")
+
+    def stop(self):
+        """Stop running jobs (a job already executing is allowed to finish)"""
+        self._running = False
+        self._notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._task = None
+        logger.info("Scheduler stopped")
+
+    def _notify(self) -> None:
+        """Wake the runner so it re-reads the heap"""
+        self._wake.set()
+        if self._loop is not None and self._async_wake is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._async_wake.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _run_thread(self):
+        while self._running:
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"Scheduler error: {e}")
+            self._wake.wait(timeout=self.seconds_until_next())
+            self._wake.clear()
+
+    async def _run_async(self):
+        loop = asyncio.get_running_loop()
+        while self._running:
+            try:
+                await loop.run_in_executor(None, self.run_pending)
+            except Exception as e:
+                logger.error(f"Scheduler error: {e}")
+            try:
+                await asyncio.wait_for(self._async_wake.wait(), self.seconds_until_next())
+            except asyncio.TimeoutError:
+                pass
+            self._async_wake.clear()
+
+    def get_job_stats(self) -> dict:
+        """Get per-job metrics and next run times"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            job.name: {
+                **job.stats.to_dict(),
+                "interval_seconds": job.interval,
+                "next_run": datetime.utcfromtimestamp(job.due).isoformat(),
+            }
+            for job in jobs
+        }
 
-class MarketScheduler:
+
+def _last_snapshot_time(model, interval_type: Optional[str] = None) -> Optional[float]:
+    """Epoch seconds of the newest stored snapshot, for catch-up after a restart"""
+    try:
+        with get_db() as db:
+            query = db.query(func.max(model.snapshot_time))
+            if interval_type is not None:
+                query = query.filter(model.interval_type == interval_type)
+            latest = query.scalar()
+    except Exception as e:
+        logger.error(f"Could not read last snapshot time: {e}")
+        return None
+    if latest is None:
+        return None
+    return (latest - datetime(1970, 1, 1)).total_seconds()
+
+
+class MarketScheduler(JobScheduler):
     """
     Handles scheduled background tasks for market operations
     - Market index refresh every X minutes
-    - Treasury snapshots
+    - Minute/hour/day market snapshots on exact UTC boundaries
+    - Snapshot backfill from the ledger after downtime
+    - Hourly snapshot downsampling and retention
+    - Price tick checkpoints
+    - Daily treasury snapshots
     - Circulation monitoring
     - Book value updates
     """
 
-    def __init__(self):
-        self._running = False
-        self._thread: Optional[Thread] = None
+    def __init__(self, clock: Callable[[], float] = time.time):
+        super().__init__(clock=clock)
         self._callbacks: dict = {
             "on_price_freeze": [],
             "on_price_unfreeze": [],
             "on_alert": [],
             "on_refresh": [],
         }
+        self._jobs_registered = False
+        self._last_compaction: Optional[dict] = None
 
-    def start(self):
-        """Start the scheduler in a background thread"""
-        if self._running:
-            logger.warning("Scheduler already running")
+    def register_jobs(self) -> None:
+        """Register the market jobs, catching up on snapshots missed while down"""
+        if self._jobs_registered:
             return
-
-        self._running = True
-        self._thread = Thread(target=self._run_loop, daemon=True)
-        self._thread.start()
+        self._jobs_registered = True
+
+        self.add_job(
+            "market_refresh",
+            self._refresh_market,
+            economy.MARKET_REFRESH_INTERVAL_MINUTES * 60,
+            run_immediately=True,
+        )
+        for interval_type, seconds in (("minute", 60), ("hour", 3600), ("day", 86400)):
+            self.add_job(
+                f"snapshot_{interval_type}",
+                lambda db, slot, interval_type=interval_type: self._create_snapshot(
+                    db, interval_type, slot
+                ),
+                seconds,
+                takes_slot=True,
+                last_run=_last_snapshot_time(MarketSnapshot, interval_type),
+            )
+        if scheduler_config.BACKFILL_SNAPSHOTS:
+            # Queued after the overdue snapshot jobs, so they cover the current buckets
+            self.add_job("snapshot_backfill", self._backfill_snapshots, 86400, run_immediately=True)
+        self.add_job("snapshot_compaction", self._compact_snapshots, 3600)
+        self.add_job(
+            "price_tick_checkpoint",
+            price_ticks.checkpoint,
+            cache_config.PRICE_TICK_CHECKPOINT_SECONDS,
+        )
+        self.add_job("fee_fold", self._fold_fees, database_config.FEE_FOLD_SECONDS)
+        self.add_job(
+            "treasury_snapshot",
+            self._create_treasury_snapshot,
+            86400,
+            last_run=_last_snapshot_time(TreasurySnapshot),
+        )
+
+    def start(self, mode: str = "thread"):
+        """Start the scheduler in a background thread or on the running event loop"""
+        self.register_jobs()
+        super().start(mode)
         logger.info("Market scheduler started")
 
-    def stop(self):
-        """Stop the scheduler"""
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=5)
-        logger.info("Market scheduler stopped")
-
     def add_callback(self, event: str, callback: Callable):
         """Add a callback for scheduler events"""
         if event in self._callbacks:
             self._callbacks[event].append(callback)
 
-    def _run_loop(self):
-        """Main scheduler loop"""
-        last_refresh = datetime.min
-        last_snapshot_minute = datetime.min
-        last_snapshot_hour = datetime.min
-        last_snapshot_day = datetime.min
-
-        while self._running:
+    def _emit(self, event: str, data: dict) -> None:
+        for cb in self._callbacks[event]:
             try:
-                now = datetime.utcnow()
-
-                # Market refresh every X minutes
-                if (
-                    now - last_refresh
-                ).total_seconds() >= economy.MARKET_REFRESH_INTERVAL_MINUTES * 60:
-                    self._refresh_market()
-                    last_refresh = now
-
-                # Minute snapshot (for high-frequency data)
-                if (now - last_snapshot_minute).total_seconds() >= 60:
-                    self._create_snapshot("minute")
-                    last_snapshot_minute = now
-
-                # Hourly snapshot
-                if (now - last_snapshot_hour).total_seconds() >= 3600:
-                    self._create_snapshot("hour")
-                    last_snapshot_hour = now
-
-                # Daily snapshot
-                if (now - last_snapshot_day).total_seconds() >= 86400:
-                    self._create_snapshot("day")
-                    self._create_treasury_snapshot()
-                    last_snapshot_day = now
-
-                # Sleep for 10 seconds between checks
-                time.sleep(10)
-
+                cb(data)
             except Exception as e:
-                logger.error(f"Scheduler error: {e}")
-                time.sleep(30)  # Back off on error
+                logger.error(f"Callback error: {e}")
 
-    def _refresh_market(self):
+    def _refresh_market(self, db):
         """Refresh market index and check conditions"""
-        try:
-            with get_db() as db:
-                treasury_service = TreasuryService(db)
-                market_service = MarketService(db)
-
-                # Recalculate book value
-                book_value = treasury_service.recalculate_book_value()
-
-                # Update market price
-                market_service.update_price_from_book_value(book_value)
-
-                # Refresh market index
-                old_frozen = market_service.get_market_index().is_price_frozen
-                index = market_service.refresh_market_index()
-                new_frozen = index.is_price_frozen
-
-                # Trigger callbacks
-                for cb in self._callbacks["on_refresh"]:
-                    try:
-                        cb({"book_value": float(book_value), "index": float(index.current_index)})
-                    except Exception as e:
-                        logger.error(f"Callback error: {e}")
-
-                # Check for freeze/unfreeze events
-                if new_frozen and not old_frozen:
-                    for cb in self._callbacks["on_price_freeze"]:
-                        try:
-                            cb({"frozen_price": float(index.frozen_price)})
-                        except Exception as e:
-                            logger.error(f"Callback error: {e}")
-                elif not new_frozen and old_frozen:
-                    for cb in self._callbacks["on_price_unfreeze"]:
-                        try:
-                            cb({"current_price": float(index.carat_price_diamonds)})
-                        except Exception as e:
-                            logger.error(f"Callback error: {e}")
-
-                logger.debug(
-                    f"Market refreshed: index={index.current_index}, book_value={book_value}"
-                )
-
-        except Exception as e:
-            logger.error(f"Market refresh failed: {e}")
-
-    def _create_snapshot(self, interval_type: str):
-        """Create a market snapshot"""
-        try:
-            with get_db() as db:
-                market_service = MarketService(db)
-                market_service.create_snapshot(interval_type)
-                logger.debug(f"Created {interval_type} snapshot")
-        except Exception as e:
-            logger.error(f"Snapshot creation failed: {e}")
-
-    def _create_treasury_snapshot(self):
+        treasury_service = TreasuryService(db)
+        market_service = MarketService(db)
+
+        # Recalculate book value
+        book_value = treasury_service.recalculate_book_value()
+
+        # Update market price
+        market_service.update_price_from_book_value(book_value)
+
+        # Refresh market index
+        old_frozen = market_service.get_market_index().is_price_frozen
+        index = market_service.refresh_market_index()
+        new_frozen = index.is_price_frozen
+
+        # Trigger callbacks
+        self._emit(
+            "on_refresh", {"book_value": float(book_value), "index": float(index.current_index)}
+        )
+
+        # Check for freeze/unfreeze events
+        if new_frozen and not old_frozen:
+            self._emit("on_price_freeze", {"frozen_price": float(index.frozen_price)})
+        elif not new_frozen and old_frozen:
+            self._emit("on_price_unfreeze", {"current_price": float(index.carat_price_diamonds)})
+
+        logger.debug(f"Market refreshed: index={index.current_index}, book_value={book_value}")
+
+    def _create_snapshot(self, db, interval_type: str, slot: Optional[datetime] = None):
+        """Create a market snapshot, stamped with the slot it was scheduled for"""
+        MarketService(db).create_snapshot(interval_type, at=slot)
+        logger.debug(f"Created {interval_type} snapshot")
+
+    def _backfill_snapshots(self, db):
+        """Fill snapshot gaps left by downtime from the treasury ledger"""
+        inserted = MarketService(db).backfill_snapshots()
+        if any(inserted.values()):
+            logger.info(f"Backfilled market snapshots: {inserted}")
+
+    def _compact_snapshots(self, db):
+        """Downsample old snapshots and drop those past retention"""
+        report = MarketService(db).compact_snapshots()
+        self._last_compaction = report
+        logger.info(
+            f"Compacted market snapshots: reclaimed {report['reclaimed']} rows "
+            f"in {report['duration_ms']}ms"
+        )
+
+    def _fold_fees(self, db):
+        """Move fees held by the fee shards into the treasury, and rollup shards into the rollups"""
+        folded = TreasuryService(db).fold_fees()
+        if folded:
+            logger.debug(f"Folded {folded} carats of fees into the treasury")
+
+    def _create_treasury_snapshot(self, db):
         """Create a treasury snapshot"""
-        try:
-            with get_db() as db:
-                treasury_service = TreasuryService(db)
-                treasury_service.create_snapshot()
-                logger.debug("Created treasury snapshot")
-        except Exception as e:
-            logger.error(f"Treasury snapshot failed: {e}")
+        TreasuryService(db).create_snapshot()
+        logger.debug("Created treasury snapshot")
 
     def force_refresh(self):
         """Manually trigger a market refresh"""
-        self._refresh_market()
+        self.register_jobs()
+        self.run_job("market_refresh")
 
     def get_status(self) -> dict:
         """Get scheduler status"""
         return {
             "running": self._running,
+            "mode": self._mode,
             "refresh_interval_minutes": economy.MARKET_REFRESH_INTERVAL_MINUTES,
             "average_window_hours": economy.MARKET_AVERAGE_WINDOW_HOURS,
+            "jobs": self.get_job_stats(),
+            "last_compaction": self._last_compaction,
         }
 
 
@@ -192,10 +595,15 @@ def get_scheduler() -> MarketScheduler:
     return _scheduler
 
 
-def start_scheduler() -> MarketScheduler:
-    """Start the global scheduler"""
+def start_scheduler(mode: str = "thread") -> MarketScheduler:
+    """
+    Start the global scheduler
+
+    Args:
+        mode: 'thread', or 'asyncio' when called from inside a running event loop
+    """
     scheduler = get_scheduler()
-    scheduler.start()
+    scheduler.start(mode)
     return scheduler
 
 
@@ -5,7 +5,7 @@ Core configuration settings for the economic system
 
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 
 @dataclass
@@ -22,7 +22,11 @@ class EconomyConfig:
     # Market settings
     MARKET_REFRESH_INTERVAL_MINUTES: int = 15  # How often to update market index
     MARKET_AVERAGE_WINDOW_HOURS: int = 24  # Window for calculating delayed average
+    DELAYED_AVERAGE_WINDOWS_HOURS: Tuple[int, ...] = (1, 24, 168)  # Windows kept up to date
+    DELAYED_AVERAGE_TIME_WEIGHTED: bool = False  # Weight each index value by how long it held
     PRICE_HISTORY_RETENTION_DAYS: int = 365  # How long to keep price history
+    MINUTE_SNAPSHOT_RETENTION_DAYS: int = 7  # Then rolled into hourly OHLC snapshots
+    HOUR_SNAPSHOT_RETENTION_DAYS: int = 90  # Then rolled into daily OHLC snapshots
 
     # Circulation controls
     MIN_CIRCULATION_THRESHOLD: float = 1000.0  # Minimum carats in circulation
@@ -49,6 +53,128 @@ class DatabaseConfig:
     DATABASE_URL: str = os.getenv("ARCA_DATABASE_URL", "sqlite:///arca_bank.db")
     ECHO_SQL: bool = os.getenv("ARCA_DEBUG", "false").lower() == "true"
 
+    # SQLite connection profile: 'tuned' = WAL journal, synchronous=NORMAL, busy
+    # timeout, larger page cache and memory-mapped reads; 'default' = SQLite's own
+    SQLITE_PROFILE: str = os.getenv("ARCA_SQLITE_PROFILE", "tuned")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("ARCA_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("ARCA_SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE_BYTES: int = int(os.getenv("ARCA_SQLITE_MMAP_SIZE", "268435456"))
+
+    # Connection pool; pre-ping replaces connections that died while idle
+    POOL_SIZE: int = int(os.getenv("ARCA_DB_POOL_SIZE", "10"))
+    POOL_MAX_OVERFLOW: int = int(os.getenv("ARCA_DB_POOL_MAX_OVERFLOW", "20"))
+    POOL_PRE_PING: bool = os.getenv("ARCA_DB_POOL_PRE_PING", "true").lower() == "true"
+    POOL_RECYCLE_SECONDS: int = int(os.getenv("ARCA_DB_POOL_RECYCLE", "1800"))  # non-SQLite
+
+    # Read replica for get_read_db() (charts, leaderboards, reports). Empty uses a
+    # separate read-only pool on the primary SQLite file (or the primary itself).
+    READ_DATABASE_URL: str = os.getenv("ARCA_READ_DATABASE_URL", "")
+    # After this process commits a write, reads use the primary for this long so
+    # callers see their own writes despite replica lag
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("ARCA_READ_YOUR_WRITES_SECONDS", "5"))
+
+    # Fees, daily rollups and volume buckets accrue to one of N shard rows instead
+    # of a single shared row, so concurrent transfers do not queue on one row lock;
+    # the scheduler folds fee and rollup shards in every FEE_FOLD_SECONDS
+    FEE_SHARDS: int = int(os.getenv("ARCA_FEE_SHARDS", "8"))
+    FEE_FOLD_SECONDS: float = float(os.getenv("ARCA_FEE_FOLD_INTERVAL", "60"))
+
+    # Opt-in group commit: ArcaBank writes from many threads are run by one writer
+    # and committed together once GROUP_COMMIT_MAX_BATCH operations are queued or
+    # GROUP_COMMIT_MAX_WAIT_MS has passed, trading a little latency for fewer fsyncs
+    GROUP_COMMIT: bool = os.getenv("ARCA_GROUP_COMMIT", "false").lower() == "true"
+    GROUP_COMMIT_MAX_BATCH: int = int(os.getenv("ARCA_GROUP_COMMIT_MAX_BATCH", "64"))
+    GROUP_COMMIT_MAX_WAIT_MS: float = float(os.getenv("ARCA_GROUP_COMMIT_MAX_WAIT_MS", "2"))
+    # Longest a caller waits for its operation's batch to commit
+    GROUP_COMMIT_TIMEOUT_SECONDS: float = float(os.getenv("ARCA_GROUP_COMMIT_TIMEOUT", "30"))
+
+
+@dataclass
+class ChartConfig:
+    """Chart data settings"""
+
+    # Directory for memory-mapped snapshot caches, one .npy file per interval type.
+    # Empty disables the disk cache and charts query the database directly.
+    SNAPSHOT_CACHE_DIR: str = os.getenv("ARCA_SNAPSHOT_CACHE_DIR", "")
+
+    # Memory budget for rendered chart PNGs, 32 MiB by default (LRU eviction). 0 disables.
+    RENDER_CACHE_MAX_BYTES: int = int(os.getenv("ARCA_CHART_CACHE_MAX_BYTES", "33554432"))
+    # Directory to persist rendered charts across restarts. Empty keeps them in memory only.
+    RENDER_CACHE_DIR: str = os.getenv("ARCA_CHART_CACHE_DIR", "")
+
+
+@dataclass
+class CacheConfig:
+    """In-process cache settings"""
+
+    # How long a cached Treasury/MarketIndex snapshot may be served before it is
+    # re-read. Bounds staleness when another process (bot vs API) writes. 0 disables.
+    SINGLETON_TTL_SECONDS: float = float(os.getenv("ARCA_SINGLETON_CACHE_TTL", "30"))
+
+    # How often the in-memory item search index reloads names from the database,
+    # picking up items first traded through another process
+    ITEM_INDEX_REFRESH_SECONDS: float = float(os.getenv("ARCA_ITEM_INDEX_REFRESH", "300"))
+
+    # How long the in-memory wealth ranking used for rank lookups is served before it
+    # is reloaded; this process's own balance changes drop it immediately
+    WEALTH_RANK_REFRESH_SECONDS: float = float(os.getenv("ARCA_WEALTH_RANK_REFRESH", "60"))
+
+    # Recent price ticks kept in memory for windowed stats, and how often the
+    # scheduler checkpoints them to the price_ticks table
+    PRICE_TICK_CAPACITY: int = int(os.getenv("ARCA_PRICE_TICK_CAPACITY", "65536"))
+    PRICE_TICK_CHECKPOINT_SECONDS: float = float(os.getenv("ARCA_PRICE_TICK_CHECKPOINT", "60"))
+
+
+@dataclass
+class ExecutorConfig:
+    """Worker pool settings for running blocking bank calls off the event loop"""
+
+    # Pool for cheap calls (balances, transfers, lookups)
+    WORKERS: int = int(os.getenv("ARCA_EXECUTOR_WORKERS", "4"))
+    # Separate pool for heavy calls (charts, reports) so they cannot starve cheap ones
+    HEAVY_WORKERS: int = int(os.getenv("ARCA_EXECUTOR_HEAVY_WORKERS", "2"))
+
+    # Maximum calls queued or running per pool before backpressure kicks in
+    MAX_QUEUE_DEPTH: int = int(os.getenv("ARCA_EXECUTOR_QUEUE_DEPTH", "64"))
+
+    # 'wait' = callers wait for a free slot, 'reject' = fail fast with a busy result
+    BACKPRESSURE: str = os.getenv("ARCA_EXECUTOR_BACKPRESSURE", "wait")
+    QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ARCA_EXECUTOR_QUEUE_TIMEOUT", "10"))
+
+
+@dataclass
+class ApiConfig:
+    """REST API (Java mod) settings"""
+
+    # Dedicated thread pool for blocking database work behind async endpoints.
+    # Keep it at or below the SQLAlchemy connection pool size (5 + 10 overflow).
+    DB_THREAD_POOL_SIZE: int = int(os.getenv("ARCA_API_DB_POOL_SIZE", "8"))
+    MAX_QUEUE_DEPTH: int = int(os.getenv("ARCA_API_QUEUE_DEPTH", "256"))
+    BACKPRESSURE: str = os.getenv("ARCA_API_BACKPRESSURE", "wait")
+    QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ARCA_API_QUEUE_TIMEOUT", "5"))
+
+    # Maximum trades accepted by one bulk trade report
+    MAX_TRADE_BATCH: int = int(os.getenv("ARCA_API_MAX_TRADE_BATCH", "500"))
+
+
+@dataclass
+class SchedulerConfig:
+    """Background job scheduler settings"""
+
+    # Random delay (0..N seconds) added to each run, so processes sharing a
+    # database do not all fire on the same boundary
+    JITTER_SECONDS: float = float(os.getenv("ARCA_SCHEDULER_JITTER", "0"))
+
+    # What to do with runs missed while the process was down or busy:
+    # 'latest' = run once to cover them, 'all' = replay each, 'skip' = wait for the next
+    CATCH_UP: str = os.getenv("ARCA_SCHEDULER_CATCH_UP", "latest")
+    # Upper bound on replayed runs per job when CATCH_UP is 'all'
+    MAX_CATCH_UP_RUNS: int = int(os.getenv("ARCA_SCHEDULER_MAX_CATCH_UP", "24"))
+
+    # Rebuild snapshots missed while the scheduler was down from the treasury ledger,
+    # once at startup and then daily
+    BACKFILL_SNAPSHOTS: bool = os.getenv("ARCA_SCHEDULER_BACKFILL", "true").lower() == "true"
+
 
 @dataclass
 class PermissionConfig:
@@ -68,4 +194,9 @@ class PermissionConfig:
 # Global config instances
 economy = EconomyConfig()
 database = DatabaseConfig()
+cache = CacheConfig()
+charts = ChartConfig()
+executor = ExecutorConfig()
+api = ApiConfig()
+scheduler = SchedulerConfig()
 permissions = PermissionConfig()
@@ -5,7 +5,7 @@ REST API endpoints for Minecraft mod integration
 
 from dataclasses import asdict
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional
 
 from ..api.bank_api import ArcaBank, OperationResult
 
@@ -194,7 +194,11 @@ class JavaModInterface:
                 "index": result.data["current_index"],
                 "status": result.data["circulation_status"],
                 "is_frozen": result.data["is_price_frozen"],
+                "change_1h": result.data["change_1h"],
                 "change_24h": result.data["change_24h"],
+                "change_7d": result.data["change_7d"],
+                "change_30d": result.data["change_30d"],
+                "change_ytd": result.data["change_ytd"],
             }
         return {"success": False, "error": result.message}
 
@@ -316,6 +320,38 @@ class JavaModInterface:
             }
         return {"success": False, "error": result.message}
 
+    def report_trades_bulk(self, trades: list) -> dict:
+        """
+        Report a batch of buffered trades from in-game
+
+        Args:
+            trades: List of dicts with report_trade's arguments
+
+        Returns:
+            {"success": bool, "accepted": [...], "rejected": [{"index", "error"}]}
+        """
+        entries = []
+        for trade in trades:
+            if not isinstance(trade, dict):
+                entries.append(trade)  # rejected by the bank with its index
+                continue
+            entry = dict(trade)
+            x, y, z = (entry.pop(f"location_{axis}", None) for axis in "xyz")
+            if x is not None and y is not None and z is not None:
+                entry["location"] = (x, y, z)
+            entries.append(entry)
+
+        result = self.bank.report_trades_bulk_by_uuid(entries)
+
+        if result.data is not None:
+            return {
+                "success": result.success,
+                "accepted": result.data["accepted"],
+                "rejected": result.data["rejected"],
+                "message": result.message,
+            }
+        return {"success": False, "error": result.error or result.message}
+
     def get_item_price(self, item_name: str) -> dict:
         """
         Get current market price for an item
@@ -339,7 +375,29 @@ class JavaModInterface:
                     "trade_count_24h": result.data["trade_count_24h"],
                     "volume_24h": result.data["volume_24h"],
                 }
-            return {"success": True, "found": False, "item_name": item_name}
+            return {
+                "success": True,
+                "found": False,
+                "item_name": item_name,
+                "suggestions": result.data.get("suggestions", []),
+            }
+        return {"success": False, "error": result.message}
+
+    def search_items(self, query: str, limit: int = 10) -> dict:
+        """
+        Search item names for in-game autocomplete
+
+        Args:
+            query: Partial or misspelled item name
+            limit: Maximum results
+
+        Returns:
+            {"success": bool, "results": [{"item_name", "score", "current_price"}]}
+        """
+        result = self.bank.search_items(query, limit)
+
+        if result.success:
+            return {"success": True, "results": result.data["results"]}
         return {"success": False, "error": result.message}
 
     def get_trending_items(self, limit: int = 10) -> dict:
@@ -450,16 +508,24 @@ class JavaModInterface:
 
 
 # Example FastAPI integration
-def create_fastapi_app():
+def create_fastapi_app(db_pool_size: Optional[int] = None):
     """
     Create a FastAPI app for Java mod REST integration
 
+    Handlers never touch the database on the event loop. Every blocking
+    JavaModInterface call runs on a dedicated thread pool, so concurrent
+    clients are served in parallel instead of queueing behind one query.
+
+    Args:
+        db_pool_size: Worker threads for database calls (defaults to config)
+
     Usage:
         from src.integration.java_interface import create_fastapi_app
         app = create_fastapi_app()
         # Run with: uvicorn module:app --host 0.0.0.0 --port 8080
     """
     try:
+        from contextlib import asynccontextmanager
         from typing import List, Optional
 
         from fastapi import FastAPI, HTTPException, Query
@@ -467,9 +533,33 @@ def create_fastapi_app():
     except ImportError:
         raise ImportError("FastAPI required: pip install fastapi uvicorn")
 
-    app = FastAPI(title="Arca Bank API", version="1.0.0")
+    from ..api.async_bank import BlockingExecutor, ExecutorBusyError
+    from ..config import api as api_config
+
+    db_executor = BlockingExecutor(
+        max_workers=db_pool_size or api_config.DB_THREAD_POOL_SIZE,
+        max_queue_depth=api_config.MAX_QUEUE_DEPTH,
+        backpressure=api_config.BACKPRESSURE,
+        queue_timeout=api_config.QUEUE_TIMEOUT_SECONDS,
+        name="arca-api-db",
+    )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        db_executor.shutdown(wait=False)
+
+    app = FastAPI(title="Arca Bank API", version="1.0.0", lifespan=lifespan)
+    app.state.db_executor = db_executor
     interface = JavaModInterface()
 
+    async def run_db(fn, *args, **kwargs) -> dict:
+        """Run a blocking interface call on the DB pool"""
+        try:
+            return await db_executor.run(fn.__name__, fn, *args, **kwargs)
+        except ExecutorBusyError:
+            raise HTTPException(status_code=503, detail="Server busy, retry shortly")
+
     class TransferRequest(BaseModel):
         sender_uuid: str
         recipient_uuid: str
@@ -496,16 +586,20 @@ def create_fastapi_app():
         location_z: Optional[int] = None
         notes: Optional[str] = None
 
+    class BulkTradeReportRequest(BaseModel):
+        trades: List[TradeReportRequest]
+
     @app.get("/api/balance/{minecraft_uuid}")
     async def get_balance(minecraft_uuid: str):
-        result = interface.get_balance_by_uuid(minecraft_uuid)
+        result = await run_db(interface.get_balance_by_uuid, minecraft_uuid)
         if not result["success"]:
             raise HTTPException(status_code=404, detail=result["error"])
         return result
 
     @app.post("/api/transfer")
     async def transfer(request: TransferRequest):
-        result = interface.transfer_by_uuid(
+        result = await run_db(
+            interface.transfer_by_uuid,
             request.sender_uuid, request.recipient_uuid, request.amount, request.currency
         )
         if not result["success"]:
@@ -514,7 +608,8 @@ def create_fastapi_app():
 
     @app.post("/api/register")
     async def register(request: RegisterRequest):
-        result = interface.register_player(
+        result = await run_db(
+            interface.register_player,
             request.minecraft_uuid, request.minecraft_username, request.discord_id
         )
         if not result["success"]:
@@ -523,15 +618,15 @@ def create_fastapi_app():
 
     @app.get("/api/market")
     async def get_market():
-        return interface.get_market_price()
+        return await run_db(interface.get_market_price)
 
     @app.get("/api/treasury")
     async def get_treasury():
-        return interface.get_treasury_info()
+        return await run_db(interface.get_treasury_info)
 
     @app.get("/api/is_banker/{minecraft_uuid}")
     async def is_banker(minecraft_uuid: str):
-        result = interface.check_is_banker(minecraft_uuid)
+        result = await run_db(interface.check_is_banker, minecraft_uuid)
         if not result["success"]:
             raise HTTPException(status_code=404, detail=result["error"])
         return result
@@ -541,7 +636,8 @@ def create_fastapi_app():
     @app.post("/api/trade/report")
     async def report_trade(request: TradeReportRequest):
         """Report a trade from in-game"""
-        result = interface.report_trade(
+        result = await run_db(
+            interface.report_trade,
             minecraft_uuid=request.minecraft_uuid,
             trade_type=request.trade_type,
             item_name=request.item_name,
@@ -562,20 +658,40 @@ def create_fastapi_app():
             )
         return result
 
+    @app.post("/api/trade/report/bulk")
+    async def report_trades_bulk(request: BulkTradeReportRequest):
+        """Report a batch of buffered trades in one transaction"""
+        if len(request.trades) > api_config.MAX_TRADE_BATCH:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {api_config.MAX_TRADE_BATCH} trades per batch",
+            )
+        result = await run_db(
+            interface.report_trades_bulk, [trade.model_dump() for trade in request.trades]
+        )
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return result
+
     @app.get("/api/trade/price/{item_name}")
     async def get_item_price(item_name: str):
         """Get current market price for an item"""
-        return interface.get_item_price(item_name)
+        return await run_db(interface.get_item_price, item_name)
+
+    @app.get("/api/trade/search")
+    async def search_items(q: str, limit: int = Query(default=10, le=25)):
+        """Search item names by partial or misspelled input"""
+        return await run_db(interface.search_items, q, limit)
 
     @app.get("/api/trade/trending")
     async def get_trending(limit: int = Query(default=10, le=50)):
         """Get trending items by trading volume"""
-        return interface.get_trending_items(limit)
+        return await run_db(interface.get_trending_items, limit)
 
     @app.get("/api/trade/history/{minecraft_uuid}")
     async def get_trade_history(minecraft_uuid: str, limit: int = Query(default=20, le=100)):
         """Get player's trade history"""
-        result = interface.get_my_trades(minecraft_uuid, limit)
+        result = await run_db(interface.get_my_trades, minecraft_uuid, limit)
         if not result["success"]:
             raise HTTPException(status_code=404, detail=result["error"])
         return result
@@ -583,9 +699,14 @@ def create_fastapi_app():
     @app.get("/api/trade/stats/{minecraft_uuid}")
     async def get_trade_stats(minecraft_uuid: str):
         """Get player's trading statistics"""
-        result = interface.get_my_stats(minecraft_uuid)
+        result = await run_db(interface.get_my_stats, minecraft_uuid)
         if not result["success"]:
             raise HTTPException(status_code=404, detail=result["error"])
         return result
 
+    @app.get("/api/stats")
+    async def get_stats():
+        """Get DB thread pool occupancy and per-endpoint latency"""
+        return db_executor.get_stats()
+
     return app
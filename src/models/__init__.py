@@ -4,9 +4,23 @@ Database Models for Arca Bank
 
 from .base import Base, SessionLocal, engine, get_db
 from .currency import CurrencyBalance, CurrencyType
-from .market import CirculationStatus, MarketIndex, MarketSnapshot
-from .trade import ItemCategory, MarketPrice, TradeReport, TraderStats, TradeType
-from .treasury import TransactionType, Treasury, TreasuryTransaction
+from .market import CirculationStatus, MarketIndex, MarketSnapshot, PriceTick, VolumeBucket
+from .trade import (
+    ItemCategory,
+    MarketPrice,
+    TradeReport,
+    TraderStats,
+    TradeType,
+    normalize_item_key,
+)
+from .treasury import (
+    TransactionType,
+    Treasury,
+    TreasuryDailyRollup,
+    TreasuryFeeShard,
+    TreasuryRollupShard,
+    TreasuryTransaction,
+)
 from .user import User, UserRole
 
 __all__ = [
@@ -19,9 +33,14 @@ __all__ = [
     "Treasury",
     "TreasuryTransaction",
     "TransactionType",
+    "TreasuryDailyRollup",
+    "TreasuryFeeShard",
+    "TreasuryRollupShard",
     "MarketSnapshot",
+    "PriceTick",
     "MarketIndex",
     "CirculationStatus",
+    "VolumeBucket",
     "CurrencyBalance",
     "CurrencyType",
     "TradeReport",
@@ -29,4 +48,5 @@ __all__ = [
     "ItemCategory",
     "TraderStats",
     "MarketPrice",
+    "normalize_item_key",
 ]
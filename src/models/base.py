@@ -3,31 +3,140 @@ Database Base Configuration
 SQLAlchemy setup and session management
 """
 
+import threading
+import time
 from contextlib import contextmanager
+from typing import Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from ..config import database
 
-# Create engine
-engine = create_engine(
-    database.DATABASE_URL,
-    echo=database.ECHO_SQL,
-    connect_args={"check_same_thread": False} if "sqlite" in database.DATABASE_URL else {},
-)
+SQLITE_PROFILES = ("tuned", "default")
 
-# Create session factory
+
+def sqlite_pragmas(profile: str) -> list:
+    """PRAGMA statements run on every new SQLite connection for a profile"""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"SQLite profile must be one of {', '.join(SQLITE_PROFILES)}")
+    if profile == "default":
+        return []
+    return [
+        # Readers no longer block the writer (or vice versa); bot, scheduler and
+        # API processes share one file
+        "journal_mode=WAL",
+        # Durable at checkpoints rather than every commit; safe with WAL
+        "synchronous=NORMAL",
+        f"busy_timeout={database.SQLITE_BUSY_TIMEOUT_MS}",
+        f"cache_size=-{database.SQLITE_CACHE_SIZE_KB}",
+        f"mmap_size={database.SQLITE_MMAP_SIZE_BYTES}",
+    ]
+
+
+def create_db_engine(
+    url: str, sqlite_profile: Optional[str] = None, read_only: bool = False
+) -> Engine:
+    """
+    Create an engine with the configured pool and, for SQLite, connection pragmas
+
+    Pragmas are applied from a connect event, so every pooled connection
+    gets them, including ones opened after a pre-ping discards a dead one.
+    read_only makes SQLite connections reject writes (replicas of other
+    databases are read-only on the server side).
+    """
+    options = {"echo": database.ECHO_SQL, "pool_pre_ping": database.POOL_PRE_PING}
+    parsed = make_url(url)
+
+    if parsed.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=database.POOL_SIZE,
+            max_overflow=database.POOL_MAX_OVERFLOW,
+            pool_recycle=database.POOL_RECYCLE_SECONDS,
+            **options,
+        )
+
+    options["connect_args"] = {
+        "check_same_thread": False,
+        "timeout": database.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+    if parsed.database and parsed.database != ":memory:":
+        # In-memory databases keep SQLAlchemy's single-connection pools
+        options.update(pool_size=database.POOL_SIZE, max_overflow=database.POOL_MAX_OVERFLOW)
+    engine = create_engine(url, **options)
+
+    pragmas = sqlite_pragmas(sqlite_profile or database.SQLITE_PROFILE)
+    if read_only:
+        pragmas.append("query_only=ON")
+    if pragmas:
+
+        @event.listens_for(engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(f"PRAGMA {pragma}")
+            cursor.close()
+
+    return engine
+
+
+def _create_read_engine() -> Engine:
+    """
+    Engine for get_read_db(): the replica if one is configured, otherwise a
+    separate read-only pool on the same SQLite file (WAL readers run alongside
+    the writer). Other databases without a replica share the primary engine.
+    """
+    if database.READ_DATABASE_URL:
+        return create_db_engine(database.READ_DATABASE_URL, read_only=True)
+    if engine.url.get_backend_name() == "sqlite" and engine.url.database not in (None, ":memory:"):
+        return create_db_engine(database.DATABASE_URL, read_only=True)
+    return engine
+
+
+# Create engines
+engine = create_db_engine(database.DATABASE_URL)
+read_engine = _create_read_engine()
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Base class for models
 Base = declarative_base()
 
 
+# Batch session of the group-commit writer, set only on its thread (see group_commit.py)
+_batch = threading.local()
+
+
+@contextmanager
+def batch_session(session):
+    """Route get_db() calls on this thread into `session` until exit"""
+    _batch.session = session
+    try:
+        yield session
+    finally:
+        _batch.session = None
+
+
 @contextmanager
 def get_db():
-    """Context manager for database sessions"""
+    """
+    Context manager for database sessions
+
+    Inside a group-commit batch, yields the batch session wrapped in a
+    savepoint instead: a failure rolls back only this block, and the
+    writer commits the batch as a whole.
+    """
+    batch = getattr(_batch, "session", None)
+    if batch is not None:
+        with batch.begin_nested():
+            yield batch
+        return
+
     db = SessionLocal()
     try:
         yield db
@@ -39,6 +148,70 @@ def get_db():
         db.close()
 
 
+# Session.info key marking a session that wrote something before committing
+_WROTE_KEY = "arca_wrote"
+
+# Monotonic time of this process's last committed write (read-your-writes routing)
+_last_write = float("-inf")
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_flush_write(session, flush_context) -> None:
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _mark_statement_write(orm_execute_state) -> None:
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _remember_write(session) -> None:
+    global _last_write
+    if session.in_nested_transaction():
+        # A savepoint was released; the write is not committed yet
+        return
+    if session.info.pop(_WROTE_KEY, False):
+        _last_write = time.monotonic()
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _forget_write(session, previous_transaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(_WROTE_KEY, None)
+
+
+@contextmanager
+def get_read_db():
+    """
+    Context manager for read-only sessions
+
+    Uses the read engine, so heavy reads (charts, leaderboards, reports) do
+    not hold connections from the writers' pool. Nothing is committed.
+
+    Read-your-writes: a replica may lag the primary, so for
+    READ_YOUR_WRITES_SECONDS after this process commits a write, reads go to
+    the primary instead. Readers of the same SQLite file see every commit at
+    once and are never redirected.
+    """
+    if (
+        database.READ_DATABASE_URL
+        and time.monotonic() - _last_write < database.READ_YOUR_WRITES_SECONDS
+    ):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
+
 def init_db():
-    """Initialize all database tables"""
+    """Initialize all database tables and upgrade older schemas"""
+    from .migrations import upgrade_schema
+
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
@@ -9,7 +9,7 @@ from enum import Enum
 
 from sqlalchemy import Column, DateTime
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, Integer, Numeric, String
+from sqlalchemy import ForeignKey, Index, Integer, Numeric, String
 from sqlalchemy.orm import relationship
 
 from ..config import economy
@@ -47,6 +47,11 @@ class CurrencyBalance(Base):
     # Relationships
     user = relationship("User", back_populates="balances")
 
+    # Balance lookups are by (user, currency)
+    __table_args__ = (
+        Index("ix_currency_balances_user_currency", "user_id", "currency_type"),
+    )
+
     def __repr__(self):
         return f"<CurrencyBalance(user_id={self.user_id}, type={self.currency_type.value}, balance={self.balance})>"
 
@@ -0,0 +1,203 @@
+"""
+Group Commit
+Single writer thread that runs queued write operations and commits them in batches
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config import database as database_config
+from .base import SessionLocal, batch_session
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel telling the writer to exit once earlier operations are done
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Commits many callers' operations with one transaction
+
+    Operations are queued by submit() and run in order on the writer thread.
+    A batch closes when it holds `max_batch` operations or `max_wait_ms` has
+    passed since its first one; the writer then commits it and resolves each
+    operation's future. Every get_db() block inside an operation runs in its
+    own savepoint, so one operation's failure leaves the rest of the batch
+    intact. If the batch transaction cannot be opened or committed, every
+    future in the batch receives the error and nothing from the batch is kept.
+
+    `batches` and `operations` count committed batches and the operations they
+    held; `failed_batches` counts batches lost to a transaction error.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        timeout_seconds: float = 30.0,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout_seconds
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+        self.failed_batches = 0
+
+    # ==================== CALLERS ====================
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue func(*args, **kwargs); the future resolves once its batch is committed"""
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def in_writer(self) -> bool:
+        """Whether the calling thread is the writer (operations must not wait on it)"""
+        return threading.current_thread() is self._thread
+
+    def get_stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "operations": self.operations,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.operations / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+    # ==================== LIFECYCLE ====================
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="arca-group-commit", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Commit everything already queued, then stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        with self._lock:
+            if self._thread is thread and not thread.is_alive():
+                self._thread = None
+
+    # ==================== WRITER ====================
+
+    def _run(self) -> None:
+        while True:
+            batch, stopping = self._collect()
+            if batch:
+                self._commit_batch(batch)
+            if stopping:
+                return
+
+    def _collect(self) -> Tuple[List[tuple], bool]:
+        """Block for the first operation, then gather more until the batch is full or due"""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(block=remaining > 0, timeout=max(remaining, 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    @staticmethod
+    def _begin(session: Session) -> None:
+        """
+        Open the batch transaction explicitly on SQLite
+
+        pysqlite only emits BEGIN before DML, so the first operation's SAVEPOINT
+        would open the transaction itself and its RELEASE would commit that
+        operation on its own. BEGIN IMMEDIATE also takes the write lock up
+        front, so the batch never has to upgrade a read lock mid-way.
+        """
+        connection = session.connection()
+        if connection.dialect.name != "sqlite":
+            return
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def _commit_batch(self, batch: List[tuple]) -> None:
+        outcomes: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        session: Session = self.session_factory()
+        try:
+            self._begin(session)
+            with batch_session(session):
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Group commit of {len(batch)} operations failed: {e}")
+            self.failed_batches += 1
+            # Fail the whole batch, including operations that never got to run
+            outcomes = [(future, None, e) for future, _, _, _ in batch if not future.done()]
+        else:
+            self.batches += 1
+            self.operations += len(outcomes)
+        finally:
+            session.close()
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+# Global writer, started by the first submitted operation
+_writer: Optional[GroupCommitWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_group_commit_writer() -> GroupCommitWriter:
+    """Get the shared writer configured from DatabaseConfig"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = GroupCommitWriter(
+                max_batch=database_config.GROUP_COMMIT_MAX_BATCH,
+                max_wait_ms=database_config.GROUP_COMMIT_MAX_WAIT_MS,
+                timeout_seconds=database_config.GROUP_COMMIT_TIMEOUT_SECONDS,
+            )
+        return _writer
+
+
+def stop_group_commit_writer() -> None:
+    """Flush and stop the shared writer, if one was started"""
+    with _writer_lock:
+        writer = _writer
+    if writer is not None:
+        writer.stop()
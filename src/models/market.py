@@ -9,7 +9,7 @@ from enum import Enum
 
 from sqlalchemy import Boolean, Column, DateTime
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import Integer, Numeric, String
+from sqlalchemy import Float, Index, Integer, Numeric, String
 
 from .base import Base
 
@@ -59,11 +59,18 @@ class MarketIndex(Base):
     change_1h = Column(Numeric(precision=10, scale=4), default=Decimal("0"), nullable=False)
     change_24h = Column(Numeric(precision=10, scale=4), default=Decimal("0"), nullable=False)
     change_7d = Column(Numeric(precision=10, scale=4), default=Decimal("0"), nullable=False)
+    change_30d = Column(Numeric(precision=10, scale=4), default=Decimal("0"), nullable=False)
+    change_ytd = Column(Numeric(precision=10, scale=4), default=Decimal("0"), nullable=False)
 
     # Timestamps
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_refresh = Column(DateTime, default=datetime.utcnow)
 
+    # Row version for optimistic concurrency (checked and bumped on every UPDATE)
+    version = Column(Integer, default=1, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<MarketIndex(index={self.current_index}, status={self.circulation_status.value})>"
 
@@ -114,11 +121,53 @@ class MarketSnapshot(Base):
 
     # Timestamps
     snapshot_time = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = Column(DateTime, nullable=True)  # set when compaction rewrites the row
+
+    # Charts and averages filter one interval type by time
+    __table_args__ = (
+        Index("ix_market_snapshots_interval_time", "interval_type", "snapshot_time"),
+    )
 
     def __repr__(self):
         return f"<MarketSnapshot(time={self.snapshot_time}, index={self.index_value})>"
 
 
+class VolumeBucket(Base):
+    """
+    One minute of transaction volume in a 24h ring buffer
+    Slot is shard * 1440 + minute % 1440, so each row is reused once a day
+    """
+
+    __tablename__ = "volume_buckets"
+
+    slot = Column(Integer, primary_key=True, autoincrement=False)
+
+    # Minutes since the Unix epoch (UTC) this bucket currently holds
+    minute = Column(Integer, nullable=False)
+
+    volume = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    transaction_count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<VolumeBucket(slot={self.slot}, volume={self.volume})>"
+
+
+class PriceTick(Base):
+    """
+    Checkpointed price tick
+    Compact copy of the in-memory tick buffer, trimmed to its capacity
+    """
+
+    __tablename__ = "price_ticks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    price = Column(Float, nullable=False)
+    recorded_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<PriceTick(time={self.recorded_at}, price={self.price})>"
+
+
 class MarketAlert(Base):
     """
     Market alerts and notifications
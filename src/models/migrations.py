@@ -0,0 +1,184 @@
+"""
+Schema Migrations
+Lightweight in-place upgrades for databases created by older versions
+"""
+
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from .trade import normalize_item_key
+
+# Columns added after the initial schema: table -> [(column, DDL type/default)]
+ADDED_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    "treasury": [("version", "INTEGER NOT NULL DEFAULT 1")],
+    "market_index": [
+        ("version", "INTEGER NOT NULL DEFAULT 1"),
+        ("change_30d", "NUMERIC(10, 4) NOT NULL DEFAULT 0"),
+        ("change_ytd", "NUMERIC(10, 4) NOT NULL DEFAULT 0"),
+    ],
+    "market_prices": [("item_key", "VARCHAR(128)")],
+    "market_snapshots": [("updated_at", "TIMESTAMP")],
+}
+
+
+def _backfill_item_keys(conn: Connection) -> None:
+    """
+    Populate market_prices.item_key, merging rows whose names normalize alike
+
+    Lookups used to be case-insensitive, so "Diamond Sword" and "diamond sword"
+    could not both be hit; the oldest row is kept and absorbs the others' counts.
+    """
+    rows = conn.execute(
+        text("SELECT id, item_name, trade_count_24h, volume_24h FROM market_prices ORDER BY id")
+    ).all()
+
+    keepers: Dict[str, list] = {}
+    duplicates = []
+    for row_id, item_name, trade_count, volume in rows:
+        key = normalize_item_key(item_name)
+        if key in keepers:
+            keepers[key][1] += trade_count or 0
+            keepers[key][2] += volume or 0
+            duplicates.append(row_id)
+        else:
+            keepers[key] = [row_id, trade_count or 0, volume or 0]
+
+    if duplicates:
+        conn.execute(
+            text("DELETE FROM market_prices WHERE id = :id"), [{"id": i} for i in duplicates]
+        )
+    if keepers:
+        conn.execute(
+            text(
+                "UPDATE market_prices SET item_key = :key, trade_count_24h = :count, "
+                "volume_24h = :volume WHERE id = :id"
+            ),
+            [
+                {"key": key, "id": row_id, "count": count, "volume": volume}
+                for key, (row_id, count, volume) in keepers.items()
+            ],
+        )
+
+
+# Data fixes run right after the column they populate is added: "table.column" -> function
+BACKFILLS: Dict[str, Callable[[Connection], None]] = {
+    "market_prices.item_key": _backfill_item_keys,
+}
+
+
+def _backfill_daily_rollups(conn: Connection) -> bool:
+    """
+    Fill treasury_daily_rollups from the ledger when it predates the rollups
+
+    Runs only while both the rollups and their pending shards are empty, so
+    rows already covered by a shard are never counted twice.
+    """
+    for table in ("treasury_daily_rollups", "treasury_rollup_shards"):
+        if conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is not None:
+            return False
+    if conn.execute(text("SELECT 1 FROM treasury_transactions LIMIT 1")).first() is None:
+        return False
+
+    conn.execute(
+        text(
+            "INSERT INTO treasury_daily_rollups (day, transaction_type, inflow_diamonds, "
+            "outflow_diamonds, inflow_carats, outflow_carats, fee_total, transaction_count) "
+            "SELECT DATE(created_at), transaction_type, "
+            "ROUND(SUM(CASE WHEN diamond_amount > 0 THEN diamond_amount ELSE 0 END), 4), "
+            "ROUND(SUM(CASE WHEN diamond_amount <= 0 THEN -diamond_amount ELSE 0 END), 4), "
+            "ROUND(SUM(CASE WHEN carat_amount > 0 THEN carat_amount ELSE 0 END), 4), "
+            "ROUND(SUM(CASE WHEN carat_amount <= 0 THEN -carat_amount ELSE 0 END), 4), "
+            "ROUND(SUM(fee_amount), 4), COUNT(id) "
+            "FROM treasury_transactions GROUP BY DATE(created_at), transaction_type"
+        )
+    )
+    return True
+
+
+# Tables derived from others, filled on startup when they start out empty:
+# (table, required source tables, function returning whether it wrote anything)
+DERIVED_TABLES: List[Tuple[str, Tuple[str, ...], Callable[[Connection], bool]]] = [
+    (
+        "treasury_daily_rollups",
+        ("treasury_rollup_shards", "treasury_transactions"),
+        _backfill_daily_rollups,
+    ),
+]
+
+# Indexes added after the initial schema, created once backfills have run:
+# (name, table, comma-separated columns, unique)
+ADDED_INDEXES: List[Tuple[str, str, str, bool]] = [
+    ("ix_market_prices_item_key", "market_prices", "item_key", True),
+    (
+        "ix_market_snapshots_interval_time",
+        "market_snapshots",
+        "interval_type, snapshot_time",
+        False,
+    ),
+    (
+        "ix_treasury_transactions_type_created",
+        "treasury_transactions",
+        "transaction_type, created_at",
+        False,
+    ),
+    ("ix_trade_reports_reporter_reported", "trade_reports", "reporter_id, reported_at", False),
+    ("ix_currency_balances_user_currency", "currency_balances", "user_id, currency_type", False),
+    ("ix_market_prices_trade_volume", "market_prices", "last_trade_at, volume_24h", False),
+]
+
+
+def upgrade_schema(bind: Engine) -> List[str]:
+    """
+    Add any columns and indexes missing from existing tables
+
+    create_all() only creates missing tables, so columns introduced later
+    are added (and backfilled) here, followed by indexes introduced later and
+    the initial contents of derived tables. Safe to run on every startup.
+
+    Returns:
+        List of applied changes, e.g. ["treasury.version"]
+    """
+    applied = []
+
+    with bind.begin() as conn:
+        # Inspect through the migrating connection so reflection shares its transaction
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+
+        for table, columns in ADDED_COLUMNS.items():
+            if table not in tables:
+                continue
+
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, ddl in columns:
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+                    applied.append(f"{table}.{name}")
+
+                    backfill = BACKFILLS.get(f"{table}.{name}")
+                    if backfill:
+                        backfill(conn)
+
+        # Fresh inspector: the cached one predates the columns added above
+        inspector = inspect(conn)
+        for index_name, table, columns, unique in ADDED_INDEXES:
+            if table not in tables:
+                continue
+
+            present = {column["name"] for column in inspector.get_columns(table)}
+            if not {column.strip() for column in columns.split(",")} <= present:
+                continue
+
+            existing = {index["name"] for index in inspector.get_indexes(table)}
+            if index_name not in existing:
+                kind = "UNIQUE INDEX" if unique else "INDEX"
+                conn.execute(text(f"CREATE {kind} {index_name} ON {table} ({columns})"))
+                applied.append(index_name)
+
+        for table, sources, backfill in DERIVED_TABLES:
+            if {table, *sources} <= tables and backfill(conn):
+                applied.append(table)
+
+    return applied
@@ -0,0 +1,54 @@
+"""
+Query Plan Audit
+Flags SELECTs that SQLite answers with a full table scan
+"""
+
+import re
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# "SCAN trade_reports" (no index) as opposed to "SEARCH ... USING INDEX" or
+# "SCAN ... USING INDEX" (index-ordered walk, usually cut short by a LIMIT)
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+class QueryPlanAudit:
+    """
+    Context manager that runs EXPLAIN QUERY PLAN on every SELECT an engine executes
+
+    Intended for tests and diagnostics against a seeded database; does
+    nothing on backends other than SQLite.
+
+    Usage:
+        with QueryPlanAudit(engine, allowed_tables={"treasury"}) as audit:
+            service.get_snapshots()
+        assert not audit.full_scans
+    """
+
+    def __init__(self, engine: Engine, allowed_tables: Iterable[str] = ()):
+        self.engine = engine
+        self.allowed_tables = set(allowed_tables)
+        self.full_scans: List[Tuple[str, str]] = []  # (table, statement)
+        self.statements = 0
+
+    def __enter__(self) -> "QueryPlanAudit":
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "before_cursor_execute", self._explain)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if event.contains(self.engine, "before_cursor_execute", self._explain):
+            event.remove(self.engine, "before_cursor_execute", self._explain)
+
+    def _explain(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if executemany or not statement.lstrip().upper().startswith("SELECT"):
+            return
+
+        self.statements += 1
+        plan = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        for row in plan.fetchall():
+            match = _FULL_SCAN.match(row[-1])
+            if match and match.group(1) not in self.allowed_tables:
+                self.full_scans.append((match.group(1), statement))
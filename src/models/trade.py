@@ -15,6 +15,7 @@ from sqlalchemy import (
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy import (
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
@@ -25,6 +26,20 @@ from sqlalchemy.orm import relationship
 from .base import Base
 
 
+def normalize_item_key(item_name: str) -> str:
+    """
+    Canonical lookup key for an item name
+
+    Case-insensitive, with underscores treated as spaces and runs of
+    whitespace collapsed, so "Diamond_Sword" and " diamond  sword" match.
+    """
+    return " ".join(item_name.replace("_", " ").casefold().split())
+
+
+def _default_item_key(context) -> str:
+    return normalize_item_key(context.get_current_parameters()["item_name"])
+
+
 class TradeType(Enum):
     """Types of trades"""
 
@@ -109,6 +124,9 @@ class TradeReport(Base):
     counterparty = relationship("User", foreign_keys=[counterparty_id])
     verified_by = relationship("User", foreign_keys=[verified_by_id])
 
+    # A user's trade history is filtered and ordered by report time
+    __table_args__ = (Index("ix_trade_reports_reporter_reported", "reporter_id", "reported_at"),)
+
     def __repr__(self):
         return f"<TradeReport(id={self.id}, {self.trade_type.value} {self.item_name} for {self.carat_amount}₵)>"
 
@@ -174,6 +192,10 @@ class MarketPrice(Base):
     # Item identification
     item_category = Column(SQLEnum(ItemCategory), nullable=False, index=True)
     item_name = Column(String(128), nullable=False, index=True)
+    # normalize_item_key(item_name); exact-match lookups use this unique index
+    item_key = Column(
+        String(128), nullable=False, unique=True, index=True, default=_default_item_key
+    )
 
     # Price data
     current_price = Column(Numeric(precision=20, scale=4), nullable=False)
@@ -192,5 +214,8 @@ class MarketPrice(Base):
     last_trade_at = Column(DateTime, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Trending items: recently traded, ranked by volume
+    __table_args__ = (Index("ix_market_prices_trade_volume", "last_trade_at", "volume_24h"),)
+
     def __repr__(self):
         return f"<MarketPrice({self.item_name}: {self.current_price}₵)>"
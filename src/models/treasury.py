@@ -10,11 +10,13 @@ from enum import Enum
 from sqlalchemy import (
     Boolean,
     Column,
+    Date,
     DateTime,
 )
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy import (
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
@@ -74,6 +76,11 @@ class Treasury(Base):
     # Timestamps
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Row version for optimistic concurrency (checked and bumped on every UPDATE)
+    version = Column(Integer, default=1, nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<Treasury(diamonds={self.total_diamonds}, carats={self.total_carats_minted})>"
 
@@ -152,10 +159,78 @@ class TreasuryTransaction(Base):
     user = relationship("User", back_populates="transactions", foreign_keys=[user_id])
     recipient = relationship("User", foreign_keys=[recipient_id])
 
+    # Mint limits and history filter one transaction type by time
+    __table_args__ = (
+        Index("ix_treasury_transactions_type_created", "transaction_type", "created_at"),
+    )
+
     def __repr__(self):
         return f"<TreasuryTransaction(type={self.transaction_type.value}, diamonds={self.diamond_amount}, carats={self.carat_amount})>"
 
 
+class TreasuryDailyRollup(Base):
+    """
+    Per-day, per-type ledger totals
+    Maintained on every transaction so history summaries never scan the ledger
+    """
+
+    __tablename__ = "treasury_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    transaction_type = Column(SQLEnum(TransactionType), primary_key=True)
+
+    inflow_diamonds = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    outflow_diamonds = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    inflow_carats = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    outflow_carats = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    fee_total = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    transaction_count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<TreasuryDailyRollup(day={self.day}, type={self.transaction_type.value})>"
+
+
+class TreasuryRollupShard(Base):
+    """
+    Per-shard daily rollup deltas not yet folded into TreasuryDailyRollup
+    Each transaction adds to its session's shard, so concurrent writers
+    rarely update the same row
+    """
+
+    __tablename__ = "treasury_rollup_shards"
+
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    day = Column(Date, primary_key=True)
+    transaction_type = Column(SQLEnum(TransactionType), primary_key=True)
+
+    inflow_diamonds = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    outflow_diamonds = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    inflow_carats = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    outflow_carats = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    fee_total = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    transaction_count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<TreasuryRollupShard(shard={self.shard}, day={self.day})>"
+
+
+class TreasuryFeeShard(Base):
+    """
+    One of several fee accumulators
+    Fees are spread over these rows instead of the treasury row, then
+    periodically folded into Treasury.accumulated_fees_carats
+    """
+
+    __tablename__ = "treasury_fee_shards"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # shard number
+    pending_carats = Column(Numeric(precision=20, scale=4), default=Decimal("0"), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<TreasuryFeeShard(id={self.id}, pending={self.pending_carats})>"
+
+
 class TreasurySnapshot(Base):
     """
     Periodic snapshots of treasury state for historical analysis
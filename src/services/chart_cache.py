@@ -0,0 +1,208 @@
+"""
+Chart Cache
+Process-level LRU cache of rendered chart PNGs, bounded by total bytes
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from ..config import charts as chart_config
+
+
+class ChartCache:
+    """
+    Rendered PNGs keyed by (chart kind, parameters, data version)
+
+    The data version changes whenever snapshots are written, so entries never
+    need explicit invalidation; superseded versions simply age out of the LRU.
+    Concurrent misses on the same key render once while the others wait.
+    With a cache directory, entries are also written to disk and survive
+    restarts; evicting an entry from memory deletes its file. Files left by
+    earlier runs or other processes are pruned, least recently used first,
+    on startup and after each write, so the directory also stays within
+    max_bytes.
+    """
+
+    # Temporary files older than this belong to writers that died mid-write
+    STALE_TMP_SECONDS = 300
+
+    def __init__(self, max_bytes: int, cache_dir: str = ""):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._rendering: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._prune_dir()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Get a cached PNG, or None"""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return png
+
+        png = self._read_file(key)
+        with self._lock:
+            if png is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._store(key, png, persist=False)
+        return png
+
+    def put(self, key: Hashable, png: bytes) -> None:
+        """Store a PNG, evicting least recently used entries to fit"""
+        self._store(key, png, persist=True)
+
+    def get_or_render(self, key: Hashable, render: Callable[[], bytes]) -> bytes:
+        """Get a cached PNG or render it, rendering at most once per key at a time"""
+        png = self.get(key)
+        if png is not None:
+            return png
+
+        with self._lock:
+            key_lock = self._rendering.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                with self._lock:
+                    png = self._entries.get(key)
+                if png is None:
+                    png = render()
+                    self.put(key, png)
+                return png
+            finally:
+                with self._lock:
+                    self._rendering.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters (disk files included)"""
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+        for key in keys:
+            self._remove_file(key)
+
+    def get_stats(self) -> dict:
+        """Get entry count, size, and hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    # ==================== INTERNALS ====================
+
+    def _store(self, key: Hashable, png: bytes, persist: bool) -> None:
+        if len(png) > self.max_bytes:
+            return
+
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = png
+            self._size += len(png)
+
+            while self._size > self.max_bytes:
+                old_key, old_png = self._entries.popitem(last=False)
+                self._size -= len(old_png)
+                self.evictions += 1
+                evicted.append(old_key)
+
+        if persist:
+            self._write_file(key, png)
+        for old_key in evicted:
+            self._remove_file(old_key)
+        if persist:
+            self._prune_dir()
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"chart_{digest}.png")
+
+    def _read_file(self, key: Hashable) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+            os.utime(path)  # recently used: pruned last
+        except FileNotFoundError:
+            return None
+        return png
+
+    def _write_file(self, key: Hashable, png: bytes) -> None:
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+
+    def _remove_file(self, key: Hashable) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _prune_dir(self) -> None:
+        """Delete stale temporary files, then the oldest charts beyond max_bytes"""
+        if not self.cache_dir:
+            return
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except FileNotFoundError:
+            return
+
+        now = time.time()
+        charts = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(".tmp"):
+                    if now - stat.st_mtime > self.STALE_TMP_SECONDS:
+                        os.remove(entry.path)
+                elif entry.name.startswith("chart_") and entry.name.endswith(".png"):
+                    charts.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                continue  # removed by another process meanwhile
+
+        total = sum(size for _, size, _ in charts)
+        for _, size, path in sorted(charts):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+chart_cache = ChartCache(
+    max_bytes=chart_config.RENDER_CACHE_MAX_BYTES, cache_dir=chart_config.RENDER_CACHE_DIR
+)
@@ -6,11 +6,13 @@ Generates stock-chart style visualizations of market data
 import io
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import List, Optional, Tuple
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from ..models.market import CirculationStatus, MarketSnapshot
+from . import indicators
+from .chart_cache import chart_cache
+from .snapshot_store import SnapshotSeries, SnapshotStore
 
 
 class ChartService:
@@ -44,6 +46,31 @@ class ChartService:
 
     def __init__(self, db: Session):
         self.db = db
+        self.snapshot_store = SnapshotStore(db)
+
+    def get_cached_chart(self, kind: str, **params) -> bytes:
+        """
+        Get a chart PNG from the render cache, generating it on a miss
+
+        Args:
+            kind: Chart name, dispatched to generate_<kind>
+                ('market_chart', 'advanced_chart', 'treasury_chart', ...)
+            **params: Keyword arguments for the generator; part of the cache key
+        """
+        generate = getattr(self, f"generate_{kind}")
+        key = (kind, tuple(sorted(params.items())), self._data_version(kind))
+        return chart_cache.get_or_render(key, lambda: generate(**params))
+
+    def _data_version(self, kind: str) -> tuple:
+        """Fingerprint of the snapshot table a chart is drawn from"""
+        if kind == "treasury_chart":
+            from ..models.treasury import TreasurySnapshot
+
+            count, max_id = self.db.query(
+                func.count(TreasurySnapshot.id), func.max(TreasurySnapshot.id)
+            ).one()
+            return count, max_id or 0
+        return self.snapshot_store.fingerprint()
 
     def generate_market_chart(
         self,
@@ -69,17 +96,16 @@ class ChartService:
             raise RuntimeError("matplotlib is required for chart generation")
 
         # Get data
-        snapshots = self._get_snapshots(days)
+        series = self._get_snapshots(days)
 
-        if not snapshots:
+        if not len(series):
             return self._generate_no_data_chart(width, height)
 
         # Prepare data
-        timestamps = [s.snapshot_time for s in snapshots]
-        prices = [float(s.close_price) for s in snapshots]
-        volumes = [float(s.volume) for s in snapshots]
-        indices = [float(s.index_value) for s in snapshots]
-        delayed_avg = [float(s.delayed_average) for s in snapshots]
+        timestamps = series.times
+        prices = series.close
+        volumes = series.volume
+        delayed_avg = series.delayed_average
 
         # Create figure
         fig, axes = plt.subplots(
@@ -98,7 +124,7 @@ class ChartService:
         ax_price.set_facecolor(self.COLORS["background"])
 
         if chart_type == "candlestick":
-            self._draw_candlestick(ax_price, snapshots)
+            self._draw_candlestick(ax_price, series)
         else:
             # Line chart
             ax_price.plot(
@@ -134,7 +160,7 @@ class ChartService:
         ax_price.spines["right"].set_color(self.COLORS["grid"])
 
         # Mark frozen periods
-        self._mark_frozen_periods(ax_price, snapshots)
+        self._mark_frozen_periods(ax_price, series)
 
         # Volume chart
         if show_volume:
@@ -155,7 +181,7 @@ class ChartService:
         plt.xticks(rotation=45)
 
         # Title
-        latest_price = prices[-1] if prices else 0
+        latest_price = prices[-1] if len(prices) else 0
         price_change = (
             ((prices[-1] - prices[0]) / prices[0] * 100)
             if len(prices) > 1 and prices[0] != 0
@@ -179,77 +205,6 @@ class ChartService:
 
         return buf.getvalue()
 
-    def _calculate_moving_average(self, data: List[float], window: int) -> List[Optional[float]]:
-        """Calculate simple moving average"""
-        result = []
-        for i in range(len(data)):
-            if i < window - 1:
-                result.append(None)
-            else:
-                avg = sum(data[i - window + 1 : i + 1]) / window
-                result.append(avg)
-        return result
-
-    def _calculate_bollinger_bands(
-        self, data: List[float], window: int = 20, num_std: float = 2.0
-    ) -> Tuple[List[Optional[float]], List[Optional[float]], List[Optional[float]]]:
-        """Calculate Bollinger Bands (middle, upper, lower)"""
-        import math
-
-        middle = self._calculate_moving_average(data, window)
-        upper = []
-        lower = []
-
-        for i in range(len(data)):
-            if i < window - 1:
-                upper.append(None)
-                lower.append(None)
-            else:
-                window_data = data[i - window + 1 : i + 1]
-                mean = sum(window_data) / window
-                variance = sum((x - mean) ** 2 for x in window_data) / window
-                std = math.sqrt(variance)
-                upper.append(mean + num_std * std)
-                lower.append(mean - num_std * std)
-
-        return middle, upper, lower
-
-    def _calculate_rsi(self, data: List[float], period: int = 14) -> List[Optional[float]]:
-        """Calculate Relative Strength Index"""
-        if len(data) < period + 1:
-            return [None] * len(data)
-
-        result = [None] * period
-
-        # Calculate price changes
-        changes = [data[i] - data[i - 1] for i in range(1, len(data))]
-
-        # Initial averages
-        gains = [max(0, c) for c in changes[:period]]
-        losses = [abs(min(0, c)) for c in changes[:period]]
-
-        avg_gain = sum(gains) / period
-        avg_loss = sum(losses) / period
-
-        for i in range(period, len(changes)):
-            change = changes[i]
-            gain = max(0, change)
-            loss = abs(min(0, change))
-
-            # Smoothed averages
-            avg_gain = (avg_gain * (period - 1) + gain) / period
-            avg_loss = (avg_loss * (period - 1) + loss) / period
-
-            if avg_loss == 0:
-                rsi = 100
-            else:
-                rs = avg_gain / avg_loss
-                rsi = 100 - (100 / (1 + rs))
-
-            result.append(rsi)
-
-        return result
-
     def generate_advanced_chart(
         self,
         days: int = 30,
@@ -284,18 +239,15 @@ class ChartService:
             raise RuntimeError("matplotlib is required for chart generation")
 
         # Get data
-        snapshots = self._get_snapshots(days)
+        series = self._get_snapshots(days)
 
-        if not snapshots:
+        if not len(series):
             return self._generate_no_data_chart(width, height)
 
         # Prepare data
-        timestamps = [s.snapshot_time for s in snapshots]
-        prices = [float(s.close_price) for s in snapshots]
-        opens = [float(s.open_price) for s in snapshots]
-        highs = [float(s.high_price) for s in snapshots]
-        lows = [float(s.low_price) for s in snapshots]
-        volumes = [float(s.volume) for s in snapshots]
+        timestamps = series.times
+        prices = series.close
+        volumes = series.volume
 
         # Calculate number of subplots
         num_plots = 1
@@ -329,7 +281,7 @@ class ChartService:
 
         # Draw price chart
         if chart_type == "candlestick":
-            self._draw_candlestick(ax_price, snapshots)
+            self._draw_candlestick(ax_price, series)
         else:
             ax_price.plot(
                 timestamps, prices, color=self.COLORS["price_line"], linewidth=2, label="Price"
@@ -338,26 +290,26 @@ class ChartService:
 
         # Moving Averages
         if show_ma:
-            ma7 = self._calculate_moving_average(prices, 7)
-            ma21 = self._calculate_moving_average(prices, 21)
+            ma7 = indicators.sma(prices, 7)
+            ma21 = indicators.sma(prices, 21)
 
-            # Filter None values for plotting
-            valid_ma7 = [(t, m) for t, m in zip(timestamps, ma7) if m is not None]
-            valid_ma21 = [(t, m) for t, m in zip(timestamps, ma21) if m is not None]
+            # Skip the warm-up period where the averages are undefined
+            valid_ma7 = ~np.isnan(ma7)
+            valid_ma21 = ~np.isnan(ma21)
 
-            if valid_ma7:
+            if valid_ma7.any():
                 ax_price.plot(
-                    [x[0] for x in valid_ma7],
-                    [x[1] for x in valid_ma7],
+                    timestamps[valid_ma7],
+                    ma7[valid_ma7],
                     color=self.COLORS["ma_short"],
                     linewidth=1,
                     label="MA-7",
                     alpha=0.8,
                 )
-            if valid_ma21:
+            if valid_ma21.any():
                 ax_price.plot(
-                    [x[0] for x in valid_ma21],
-                    [x[1] for x in valid_ma21],
+                    timestamps[valid_ma21],
+                    ma21[valid_ma21],
                     color=self.COLORS["ma_long"],
                     linewidth=1,
                     label="MA-21",
@@ -366,17 +318,16 @@ class ChartService:
 
         # Bollinger Bands
         if show_bollinger:
-            middle, upper, lower = self._calculate_bollinger_bands(prices)
-            valid_upper = [(t, u) for t, u in zip(timestamps, upper) if u is not None]
-            valid_lower = [(t, l) for t, l in zip(timestamps, lower) if l is not None]
+            middle, upper, lower = indicators.bollinger_bands(prices)
+            valid_bands = ~np.isnan(upper)
 
-            if valid_upper and valid_lower:
-                upper_times = [x[0] for x in valid_upper]
-                upper_vals = [x[1] for x in valid_upper]
-                lower_vals = [x[1] for x in valid_lower]
+            if valid_bands.any():
+                band_times = timestamps[valid_bands]
+                upper_vals = upper[valid_bands]
+                lower_vals = lower[valid_bands]
 
                 ax_price.plot(
-                    upper_times,
+                    band_times,
                     upper_vals,
                     color=self.COLORS["bollinger_band"],
                     linewidth=0.8,
@@ -384,7 +335,7 @@ class ChartService:
                     alpha=0.6,
                 )
                 ax_price.plot(
-                    upper_times,
+                    band_times,
                     lower_vals,
                     color=self.COLORS["bollinger_band"],
                     linewidth=0.8,
@@ -392,7 +343,7 @@ class ChartService:
                     alpha=0.6,
                 )
                 ax_price.fill_between(
-                    upper_times,
+                    band_times,
                     upper_vals,
                     lower_vals,
                     alpha=0.05,
@@ -400,12 +351,10 @@ class ChartService:
                 )
 
         # Mark frozen periods
-        self._mark_frozen_periods(ax_price, snapshots)
+        self._mark_frozen_periods(ax_price, series)
 
         # Price annotations
         latest_price = prices[-1]
-        highest = max(prices)
-        lowest = min(prices)
         price_change = ((prices[-1] - prices[0]) / prices[0] * 100) if prices[0] != 0 else 0
 
         # Add current price line
@@ -467,12 +416,9 @@ class ChartService:
             ax_volume.set_facecolor(self.COLORS["background"])
 
             # Color volume bars by price direction
-            colors = []
-            for i, s in enumerate(snapshots):
-                if float(s.close_price) >= float(s.open_price):
-                    colors.append(self.COLORS["price_up"])
-                else:
-                    colors.append(self.COLORS["price_down"])
+            colors = np.where(
+                series.close >= series.open, self.COLORS["price_up"], self.COLORS["price_down"]
+            )
 
             ax_volume.bar(timestamps, volumes, color=colors, alpha=0.6, width=0.8)
             ax_volume.set_ylabel("Vol", color=self.COLORS["text"], fontsize=9)
@@ -487,12 +433,12 @@ class ChartService:
             ax_rsi = axes[current_ax_idx]
             ax_rsi.set_facecolor(self.COLORS["background"])
 
-            rsi = self._calculate_rsi(prices)
-            valid_rsi = [(t, r) for t, r in zip(timestamps, rsi) if r is not None]
+            rsi = indicators.rsi(prices)
+            valid_rsi = ~np.isnan(rsi)
 
-            if valid_rsi:
-                rsi_times = [x[0] for x in valid_rsi]
-                rsi_vals = [x[1] for x in valid_rsi]
+            if valid_rsi.any():
+                rsi_times = timestamps[valid_rsi]
+                rsi_vals = rsi[valid_rsi]
 
                 ax_rsi.plot(rsi_times, rsi_vals, color=self.COLORS["rsi_line"], linewidth=1.5)
                 ax_rsi.axhline(
@@ -513,7 +459,7 @@ class ChartService:
                     rsi_times,
                     30,
                     rsi_vals,
-                    where=[r < 30 for r in rsi_vals],
+                    where=rsi_vals < 30,
                     alpha=0.3,
                     color=self.COLORS["rsi_oversold"],
                 )
@@ -521,7 +467,7 @@ class ChartService:
                     rsi_times,
                     70,
                     rsi_vals,
-                    where=[r > 70 for r in rsi_vals],
+                    where=rsi_vals > 70,
                     alpha=0.3,
                     color=self.COLORS["rsi_overbought"],
                 )
@@ -566,6 +512,37 @@ class ChartService:
 
         return buf.getvalue()
 
+    def calculate_indicators(self, days: int = 30) -> dict:
+        """
+        Compute the advanced chart's indicators as arrays over market close prices
+
+        Returns:
+            Dict of equal-length arrays keyed by indicator name, plus "timestamps"
+            (epoch seconds). Undefined warm-up values are NaN.
+        """
+        series = self._get_snapshots(days)
+        prices = series.close
+
+        bb_middle, bb_upper, bb_lower = indicators.bollinger_bands(prices)
+        macd_line, macd_signal, macd_histogram = indicators.macd(prices)
+
+        return {
+            "timestamps": series.timestamps,
+            "close": prices,
+            "sma_7": indicators.sma(prices, 7),
+            "sma_21": indicators.sma(prices, 21),
+            "ema_12": indicators.ema(prices, 12),
+            "ema_26": indicators.ema(prices, 26),
+            "bollinger_middle": bb_middle,
+            "bollinger_upper": bb_upper,
+            "bollinger_lower": bb_lower,
+            "rsi_14": indicators.rsi(prices, 14),
+            "macd": macd_line,
+            "macd_signal": macd_signal,
+            "macd_histogram": macd_histogram,
+            "vwap": indicators.vwap(prices, series.volume),
+        }
+
     def _style_axis(self, ax) -> None:
         """Apply consistent styling to an axis"""
         ax.spines["bottom"].set_color(self.COLORS["grid"])
@@ -584,11 +561,16 @@ class ChartService:
             matplotlib.use("Agg")
             import matplotlib.dates as mdates
             import matplotlib.pyplot as plt
+            import numpy as np
         except ImportError:
             raise RuntimeError("matplotlib is required for chart generation")
 
         timeframes = [(1, "1D"), (7, "7D"), (30, "30D"), (90, "90D")]
 
+        # Load the longest window once; shorter ones are views into it
+        full_series = self._get_snapshots(max(days for days, _ in timeframes))
+        now = datetime.utcnow()
+
         fig, axes = plt.subplots(
             1, 4, figsize=(width / 100, height / 100), facecolor=self.COLORS["background"]
         )
@@ -596,9 +578,9 @@ class ChartService:
         for ax, (days, label) in zip(axes, timeframes):
             ax.set_facecolor(self.COLORS["background"])
 
-            snapshots = self._get_snapshots(days)
+            series = full_series.since(now - timedelta(days=days))
 
-            if not snapshots:
+            if not len(series):
                 ax.text(
                     0.5,
                     0.5,
@@ -611,7 +593,7 @@ class ChartService:
                 ax.set_title(label, color=self.COLORS["text"], fontsize=11, fontweight="bold")
                 continue
 
-            prices = [float(s.close_price) for s in snapshots]
+            prices = series.close
 
             # Determine color based on price change
             if len(prices) > 1 and prices[0] != 0:
@@ -626,10 +608,10 @@ class ChartService:
             ax.fill_between(range(len(prices)), prices, alpha=0.15, color=color)
 
             # Add min/max markers
-            min_idx = prices.index(min(prices))
-            max_idx = prices.index(max(prices))
-            ax.scatter([min_idx], [min(prices)], color=self.COLORS["price_down"], s=20, zorder=5)
-            ax.scatter([max_idx], [max(prices)], color=self.COLORS["price_up"], s=20, zorder=5)
+            min_idx = int(np.argmin(prices))
+            max_idx = int(np.argmax(prices))
+            ax.scatter([min_idx], [prices[min_idx]], color=self.COLORS["price_down"], s=20, zorder=5)
+            ax.scatter([max_idx], [prices[max_idx]], color=self.COLORS["price_up"], s=20, zorder=5)
 
             # Styling
             ax.set_xticks([])
@@ -668,64 +650,58 @@ class ChartService:
         buf.seek(0)
 
         return buf.getvalue()
-        """Draw candlestick chart"""
-        import matplotlib.patches as patches
-
-        for i, s in enumerate(snapshots):
-            open_p = float(s.open_price)
-            close_p = float(s.close_price)
-            high_p = float(s.high_price)
-            low_p = float(s.low_price)
 
-            color = self.COLORS["price_up"] if close_p >= open_p else self.COLORS["price_down"]
+    def _draw_candlestick(self, ax, series: SnapshotSeries) -> None:
+        """Draw candlestick chart on the time axis"""
+        import matplotlib.dates as mdates
+        import numpy as np
 
-            # Wick
-            ax.plot([i, i], [low_p, high_p], color=color, linewidth=1)
+        x = mdates.date2num(series.times)
+        spacing = np.median(np.diff(x)) if len(x) > 1 else 1 / 24
+        colors = np.where(
+            series.close >= series.open, self.COLORS["price_up"], self.COLORS["price_down"]
+        )
 
-            # Body
-            body_bottom = min(open_p, close_p)
-            body_height = abs(close_p - open_p)
-            rect = patches.Rectangle(
-                (i - 0.3, body_bottom), 0.6, body_height, facecolor=color, edgecolor=color
-            )
-            ax.add_patch(rect)
+        # Wicks
+        ax.vlines(x, series.low, series.high, colors=colors, linewidth=1)
+
+        # Bodies (the edge keeps flat candles visible)
+        ax.bar(
+            x,
+            np.abs(series.close - series.open),
+            bottom=np.minimum(series.open, series.close),
+            width=spacing * 0.6,
+            color=colors,
+            edgecolor=colors,
+            label="OHLC",
+        )
 
-    def _mark_frozen_periods(self, ax, snapshots: List[MarketSnapshot]) -> None:
+    def _mark_frozen_periods(self, ax, series: SnapshotSeries) -> None:
         """Mark periods when price was frozen"""
-        frozen_periods = []
-        in_frozen = False
-        start_idx = 0
-
-        for i, s in enumerate(snapshots):
-            if s.circulation_status == CirculationStatus.FROZEN and not in_frozen:
-                in_frozen = True
-                start_idx = i
-            elif s.circulation_status != CirculationStatus.FROZEN and in_frozen:
-                in_frozen = False
-                frozen_periods.append((start_idx, i))
-
-        if in_frozen:
-            frozen_periods.append((start_idx, len(snapshots) - 1))
-
-        for start, end in frozen_periods:
+        import numpy as np
+
+        if not series.frozen.any():
+            return
+
+        # Rising/falling edges of the frozen flag give each period's bounds
+        edges = np.diff(np.concatenate(([0], series.frozen.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        times = series.times
+        for start, end in zip(starts, ends):
+            # A period that is still frozen ends at the last snapshot
             ax.axvspan(
-                snapshots[start].snapshot_time,
-                snapshots[end].snapshot_time,
+                times[start],
+                times[min(end, len(times) - 1)],
                 alpha=0.2,
                 color=self.COLORS["frozen"],
                 label="Price Frozen",
             )
 
-    def _get_snapshots(self, days: int) -> List[MarketSnapshot]:
-        """Get market snapshots for the given period"""
-        cutoff = datetime.utcnow() - timedelta(days=days)
-
-        return (
-            self.db.query(MarketSnapshot)
-            .filter(MarketSnapshot.snapshot_time >= cutoff)
-            .order_by(MarketSnapshot.snapshot_time)
-            .all()
-        )
+    def _get_snapshots(self, days: int) -> SnapshotSeries:
+        """Get market snapshots for the given period as NumPy columns"""
+        return self.snapshot_store.load(days)
 
     def _generate_no_data_chart(self, width: int, height: int) -> bytes:
         """Generate a chart indicating no data available"""
@@ -838,12 +814,12 @@ class ChartService:
         except ImportError:
             raise RuntimeError("matplotlib is required for chart generation")
 
-        snapshots = self._get_snapshots(days)
+        series = self._get_snapshots(days)
 
-        if not snapshots:
+        if not len(series):
             return self._generate_no_data_chart(width, height)
 
-        prices = [float(s.close_price) for s in snapshots]
+        prices = series.close
 
         fig, ax = plt.subplots(
             figsize=(width / 100, height / 100), facecolor=self.COLORS["background"]
@@ -5,14 +5,17 @@ Handles all currency operations including conversions and exchanges
 
 from datetime import datetime
 from decimal import ROUND_DOWN, Decimal
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
+from sqlalchemy import case, func, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from ..config import economy
 from ..models.currency import CurrencyBalance, CurrencyExchange, CurrencyType
 from ..models.treasury import TransactionType, TreasuryTransaction
-from ..models.user import User
+from ..models.user import User, UserRole
+from .wealth_ranking import mark_balances_changed, wealth_ranking
 
 
 class CurrencyService:
@@ -79,18 +82,61 @@ class CurrencyService:
         return balance
 
     def get_user_balances(self, user: User) -> dict:
-        """Get all balances for a user"""
-        carat_balance = self.get_or_create_balance(user, CurrencyType.CARAT)
-        golden_balance = self.get_or_create_balance(user, CurrencyType.GOLDEN_CARAT)
+        """Get all balances for a user; missing balance rows read as zero without being created"""
+        stored = dict(
+            self.db.query(CurrencyBalance.currency_type, CurrencyBalance.balance)
+            .filter(CurrencyBalance.user_id == user.id)
+            .all()
+        )
+        carats = Decimal(stored.get(CurrencyType.CARAT) or 0)
+        golden_carats = Decimal(stored.get(CurrencyType.GOLDEN_CARAT) or 0)
 
         return {
-            "carats": Decimal(carat_balance.balance),
-            "golden_carats": Decimal(golden_balance.balance),
-            "total_in_carats": self.to_total_carats(
-                Decimal(carat_balance.balance), Decimal(golden_balance.balance)
-            ),
+            "carats": carats,
+            "golden_carats": golden_carats,
+            "total_in_carats": self.to_total_carats(carats, golden_carats),
         }
 
+    def _apply_delta(self, balance: CurrencyBalance, delta: Decimal) -> CurrencyBalance:
+        """
+        Add delta to a stored balance with a single conditional UPDATE
+
+        The new value is computed by the database from the current row, never
+        from a value read earlier, so concurrent adjustments cannot overwrite
+        each other. A debit only matches while the row still covers it; the
+        row stays locked until the transaction ends.
+        """
+        now = datetime.utcnow()
+        statement = (
+            update(CurrencyBalance)
+            .where(CurrencyBalance.id == balance.id)
+            .values(balance=CurrencyBalance.balance + delta, updated_at=now)
+            .returning(CurrencyBalance.balance)
+            .execution_options(synchronize_session=False)
+        )
+        if delta < 0:
+            statement = statement.where(CurrencyBalance.balance >= -delta)
+
+        new_balance = self.db.execute(statement).scalar()
+        if new_balance is None:
+            raise ValueError(f"Insufficient {balance.currency_type.value} balance")
+        mark_balances_changed(self.db)
+
+        set_committed_value(balance, "balance", new_balance)
+        set_committed_value(balance, "updated_at", now)
+        return balance
+
+    def _apply_deltas(self, legs: List[Tuple[CurrencyBalance, Decimal]]) -> None:
+        """
+        Apply several balance changes in ascending row order
+
+        Every multi-row mutation locks rows in the same order, so two
+        transfers in opposite directions cannot deadlock. A failed debit
+        raises and the caller's transaction rolls back any leg already applied.
+        """
+        for balance, delta in sorted(legs, key=lambda leg: leg[0].id):
+            self._apply_delta(balance, delta)
+
     def add_balance(
         self, user: User, currency_type: CurrencyType, amount: Decimal
     ) -> CurrencyBalance:
@@ -98,26 +144,16 @@ class CurrencyService:
         if amount < 0:
             raise ValueError("Cannot add negative amount")
 
-        balance = self.get_or_create_balance(user, currency_type)
-        balance.balance = Decimal(balance.balance) + amount
-        balance.updated_at = datetime.utcnow()
-        return balance
+        return self._apply_delta(self.get_or_create_balance(user, currency_type), amount)
 
     def subtract_balance(
         self, user: User, currency_type: CurrencyType, amount: Decimal
     ) -> CurrencyBalance:
-        """Subtract from user's balance"""
+        """Subtract from user's balance, failing if it does not cover the amount"""
         if amount < 0:
             raise ValueError("Cannot subtract negative amount")
 
-        balance = self.get_or_create_balance(user, currency_type)
-
-        if Decimal(balance.balance) < amount:
-            raise ValueError(f"Insufficient {currency_type.value} balance")
-
-        balance.balance = Decimal(balance.balance) - amount
-        balance.updated_at = datetime.utcnow()
-        return balance
+        return self._apply_delta(self.get_or_create_balance(user, currency_type), -amount)
 
     # ==================== EXCHANGE OPERATIONS ====================
 
@@ -154,8 +190,9 @@ class CurrencyService:
             received = base_result - fee_in_carats
 
         # Perform the exchange
-        self.subtract_balance(user, from_type, amount)
-        self.add_balance(user, to_type, received)
+        self._apply_deltas(
+            [(from_balance, -amount), (self.get_or_create_balance(user, to_type), received)]
+        )
 
         # Record the exchange
         exchange = CurrencyExchange(
@@ -196,7 +233,121 @@ class CurrencyService:
         amount_received = amount - fee
 
         # Perform transfer
-        self.subtract_balance(sender, currency_type, amount)
-        self.add_balance(recipient, currency_type, amount_received)
+        self._apply_deltas(
+            [
+                (self.get_or_create_balance(sender, currency_type), -amount),
+                (self.get_or_create_balance(recipient, currency_type), amount_received),
+            ]
+        )
 
         return amount_received, fee
+
+    # ==================== LEADERBOARD ====================
+
+    def _wealth_query(self):
+        """One row per ranked user: carats, golden carats and total value in carats"""
+        carats = func.sum(
+            case(
+                (CurrencyBalance.currency_type == CurrencyType.CARAT, CurrencyBalance.balance),
+                else_=0,
+            )
+        )
+        golden = func.sum(
+            case(
+                (CurrencyBalance.currency_type == CurrencyType.GOLDEN_CARAT, CurrencyBalance.balance),
+                else_=0,
+            )
+        )
+        total = carats + golden * economy.GOLDEN_CARAT_MULTIPLIER
+
+        return (
+            self.db.query(
+                CurrencyBalance.user_id.label("user_id"),
+                carats.label("carats"),
+                golden.label("golden_carats"),
+                total.label("total_value"),
+            )
+            .join(User, User.id == CurrencyBalance.user_id)
+            .filter(User.role != UserRole.CONSUMER)
+            .group_by(CurrencyBalance.user_id)
+            .having(total > 0)
+        )
+
+    def get_leaderboard(self, limit: int = 10, offset: int = 0) -> List[dict]:
+        """
+        Get the richest users by total value in carats
+
+        Computed with a single grouped query; users without a balance row or
+        with zero balance are not ranked. Ranks follow get_wealth_rank: tied
+        users share a rank (1, 1, 3) and are listed by user id.
+        """
+        wealth = self._wealth_query().subquery()
+
+        rows = (
+            self.db.query(
+                User.discord_id,
+                User.discord_username,
+                User.minecraft_username,
+                wealth.c.carats,
+                wealth.c.golden_carats,
+                wealth.c.total_value,
+            )
+            .join(wealth, wealth.c.user_id == User.id)
+            .order_by(wealth.c.total_value.desc(), User.id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+        leaders, previous, rank = [], None, offset + 1
+        for position, row in enumerate(rows, offset + 1):
+            if previous is None and offset:
+                # The page may start inside a run of ties
+                rank = 1 + (
+                    self.db.query(func.count())
+                    .select_from(wealth)
+                    .filter(wealth.c.total_value > row.total_value)
+                    .scalar()
+                )
+            elif previous is not None and row.total_value != previous:
+                rank = position
+            previous = row.total_value
+
+            leaders.append(
+                {
+                    "rank": rank,
+                    "discord_id": row.discord_id,
+                    "username": row.minecraft_username or row.discord_username,
+                    "carats": Decimal(str(row.carats)),
+                    "golden_carats": Decimal(str(row.golden_carats)),
+                    "total_value": Decimal(str(row.total_value)),
+                }
+            )
+
+        return leaders
+
+    def get_wealth_rank(self, user: User) -> Optional[dict]:
+        """
+        Get a user's leaderboard position
+
+        Rank is 1 + the number of users strictly richer, so ties share a rank.
+        The user's own totals are read live; the others come from the shared
+        wealth ranking instead of grouping every balance on each call.
+        Returns None if the user is not ranked.
+        """
+        own = self._wealth_query().filter(CurrencyBalance.user_id == user.id).first()
+        if own is None:
+            return None
+
+        totals = self._wealth_query().subquery().c.total_value
+        richer, ranked = wealth_ranking.count_richer(
+            own.total_value, lambda: [total for (total,) in self.db.query(totals)]
+        )
+
+        return {
+            "rank": richer + 1,
+            "total_ranked": ranked,
+            "carats": Decimal(str(own.carats)),
+            "golden_carats": Decimal(str(own.golden_carats)),
+            "total_value": Decimal(str(own.total_value)),
+        }
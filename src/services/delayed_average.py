@@ -0,0 +1,181 @@
+"""
+Delayed Average
+Sliding-window averages of the market index maintained with running sums
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import economy
+from ..models.market import MarketSnapshot
+from .time_utils import epoch_seconds
+
+
+class _Window:
+    """
+    Points inside one trailing window plus their running sums
+
+    `total` sums the values for the plain mean. `area` integrates the value
+    as a step function (each point holds until the next) for the
+    time-weighted mean. One point at or before the window start is kept,
+    since its value carries into the window.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.points: deque = deque()  # (timestamp, Decimal value, float value)
+        self.total = Decimal("0")
+        self.area = 0.0
+
+    def add(self, timestamp: float, value: Decimal) -> None:
+        if self.points:
+            last_time, _, last_value = self.points[-1]
+            self.area += last_value * (timestamp - last_time)
+        self.points.append((timestamp, value, float(value)))
+        self.total += value
+
+    def _evict(self, cutoff: float) -> None:
+        points = self.points
+        while len(points) >= 2 and points[1][0] <= cutoff:
+            first_time, value, float_value = points.popleft()
+            self.area -= float_value * (points[0][0] - first_time)
+            self.total -= value
+
+    def mean(self, now: float) -> Optional[Decimal]:
+        cutoff = now - self.seconds
+        self._evict(cutoff)
+        count, total = len(self.points), self.total
+        if count and self.points[0][0] <= cutoff:
+            count -= 1
+            total -= self.points[0][1]
+        return total / count if count else None
+
+    def time_weighted_mean(self, now: float) -> Optional[Decimal]:
+        cutoff = now - self.seconds
+        self._evict(cutoff)
+        if not self.points:
+            return None
+
+        first_time, _, first_value = self.points[0]
+        last_time, last_value, last_float = self.points[-1]
+        start = max(cutoff, first_time)
+        if now <= start:
+            return last_value
+        area = self.area - first_value * (start - first_time) + last_float * (now - last_time)
+        return Decimal(repr(area / (now - start)))
+
+
+class DelayedAverages:
+    """
+    Index averages over several trailing windows
+
+    Follows one snapshot interval's index values. Each sync reads only
+    snapshots with ids above the last one seen, so refresh cost does not
+    grow with the table; rows that arrive out of time order (ledger
+    backfills) trigger a one-off reload of the longest window.
+    """
+
+    def __init__(self, windows_hours: Iterable[int], interval_type: str = "minute"):
+        self.windows_hours = tuple(sorted(set(windows_hours)))
+        self.interval_type = interval_type
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._windows: Dict[int, _Window] = {
+            hours: _Window(hours * 3600) for hours in self.windows_hours
+        }
+        self._last_id: Optional[int] = None
+        self._last_time = float("-inf")
+        self._synced_at: Optional[float] = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def add(self, at: datetime, value) -> bool:
+        """Add a point; returns False (ignoring it) if it is older than the newest point"""
+        timestamp = epoch_seconds(at)
+        with self._lock:
+            if timestamp < self._last_time:
+                return False
+            self._last_time = timestamp
+            value = Decimal(value)
+            for window in self._windows.values():
+                window.add(timestamp, value)
+            return True
+
+    def sync(
+        self, db: Session, now: Optional[datetime] = None, max_age: Optional[float] = None
+    ) -> int:
+        """
+        Pull snapshots written since the last sync (loading the longest window first)
+
+        Args:
+            max_age: Skip the sync if the last one is more recent than this many seconds
+
+        Returns:
+            Number of snapshots added
+        """
+        query = select(MarketSnapshot.id, MarketSnapshot.snapshot_time, MarketSnapshot.index_value)
+        query = query.where(MarketSnapshot.interval_type == self.interval_type)
+
+        with self._lock:
+            synced_at = self._synced_at
+            if max_age is not None and synced_at and time.monotonic() - synced_at < max_age:
+                return 0
+            self._synced_at = time.monotonic()
+
+            if self._last_id is not None:
+                rows = db.execute(
+                    query.where(MarketSnapshot.id > self._last_id).order_by(MarketSnapshot.id)
+                ).all()
+                if all(self.add(at, value) for _, at, value in rows):
+                    if rows:
+                        self._last_id = rows[-1][0]
+                    return len(rows)
+                # A row landed behind the newest point: rebuild from the database
+                self._reset()
+                self._synced_at = time.monotonic()
+
+            max_id = db.execute(select(func.max(MarketSnapshot.id))).scalar() or 0
+            query = query.where(MarketSnapshot.id <= max_id)
+            longest = max(self.windows_hours) * 3600
+            cutoff = datetime.utcfromtimestamp(epoch_seconds(now or datetime.utcnow()) - longest)
+
+            # The last point before the window carries its value into it
+            rows = db.execute(
+                query.where(MarketSnapshot.snapshot_time < cutoff)
+                .order_by(MarketSnapshot.snapshot_time.desc(), MarketSnapshot.id.desc())
+                .limit(1)
+            ).all()
+            rows += db.execute(
+                query.where(MarketSnapshot.snapshot_time >= cutoff).order_by(
+                    MarketSnapshot.snapshot_time, MarketSnapshot.id
+                )
+            ).all()
+            for _, at, value in rows:
+                self.add(at, value)
+            self._last_id = max_id
+            return len(rows)
+
+    def average(
+        self, hours: int, now: Optional[datetime] = None, time_weighted: bool = False
+    ) -> Optional[Decimal]:
+        """Average index over a configured window, or None if it holds no points"""
+        timestamp = epoch_seconds(now or datetime.utcnow())
+        with self._lock:
+            window = self._windows[hours]
+            return window.time_weighted_mean(timestamp) if time_weighted else window.mean(timestamp)
+
+
+delayed_averages = DelayedAverages(
+    economy.DELAYED_AVERAGE_WINDOWS_HOURS + (economy.MARKET_AVERAGE_WINDOW_HOURS,)
+)
@@ -0,0 +1,149 @@
+"""
+Fee Shards
+Sharded fee accumulators folded periodically into the treasury
+"""
+
+import random
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import cache as cache_config
+from ..config import database as database_config
+from ..models.treasury import TreasuryFeeShard
+
+# Session.info keys: the shard a session accrues to, and whether it changed any shard
+_SHARD_KEY = "arca_fee_shard"
+_CHANGED_KEY = "arca_fee_shards_changed"
+
+
+class FeeShards:
+    """
+    Fee accumulators spread over `shard_count` rows
+
+    Each session adds its fees to one randomly chosen shard with a single
+    UPDATE, so concurrent fee-bearing transactions mostly lock different
+    rows. TreasuryService.fold_fees moves shard totals into the treasury;
+    until then they are reported through pending(), whose sum is cached
+    like the singleton rows.
+    """
+
+    def __init__(self, shard_count: int, ttl_seconds: float):
+        self.shard_count = max(1, shard_count)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._pending: Optional[tuple] = None  # (monotonic time, Decimal)
+
+    def session_shard(self, db: Session) -> int:
+        """
+        Shard this session's transaction writes to, picked at random on first use
+
+        Other sharded aggregates (daily rollups, volume buckets) use the same
+        number, so one transaction touches one shard of each.
+        """
+        if _SHARD_KEY not in db.info:
+            db.info[_SHARD_KEY] = random.randrange(self.shard_count)
+        return db.info[_SHARD_KEY]
+
+    def accrue(self, db: Session, amount: Decimal) -> None:
+        """Add a fee to this session's shard, creating the row on first use"""
+        shard = self.session_shard(db)
+        statement = (
+            update(TreasuryFeeShard)
+            .where(TreasuryFeeShard.id == shard)
+            .values(
+                pending_carats=TreasuryFeeShard.pending_carats + amount,
+                updated_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.info[_CHANGED_KEY] = True
+
+        if db.execute(statement).rowcount:
+            return
+        try:
+            with db.begin_nested():
+                db.add(TreasuryFeeShard(id=shard, pending_carats=amount))
+        except IntegrityError:
+            # Another writer created the row first
+            db.execute(statement)
+
+    def drain(self, db: Session) -> Decimal:
+        """
+        Zero every shard and return what they held
+
+        Each shard is reduced by the amount read rather than set to zero, so
+        fees accrued between the read and the update stay pending.
+        """
+        rows = db.execute(
+            select(TreasuryFeeShard.id, TreasuryFeeShard.pending_carats).where(
+                TreasuryFeeShard.pending_carats != 0
+            )
+        ).all()
+
+        total = Decimal("0")
+        for shard, amount in rows:
+            db.execute(
+                update(TreasuryFeeShard)
+                .where(TreasuryFeeShard.id == shard)
+                .values(pending_carats=TreasuryFeeShard.pending_carats - amount)
+                .execution_options(synchronize_session=False)
+            )
+            total += Decimal(amount)
+        if rows:
+            db.info[_CHANGED_KEY] = True
+        return total
+
+    def pending(self, db: Session) -> Decimal:
+        """
+        Fees accrued but not yet folded into the treasury
+
+        Served from the cache unless this session has uncommitted shard changes
+        of its own or the cached sum is older than the TTL.
+        """
+        if not db.info.get(_CHANGED_KEY):
+            with self._lock:
+                entry = self._pending
+                if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                    return entry[1]
+
+        total = db.execute(select(func.sum(TreasuryFeeShard.pending_carats))).scalar()
+        total = Decimal(str(total)).quantize(Decimal("0.0001")) if total else Decimal("0")
+        if not db.info.get(_CHANGED_KEY):
+            with self._lock:
+                self._pending = (time.monotonic(), total)
+        return total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending = None
+
+
+fee_shards = FeeShards(
+    shard_count=database_config.FEE_SHARDS, ttl_seconds=cache_config.SINGLETON_TTL_SECONDS
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_shards(session: Session) -> None:
+    """Drop the cached pending sum once shard changes are committed"""
+    if session.in_nested_transaction():
+        # A savepoint was released; the outer transaction is still open
+        return
+    session.info.pop(_SHARD_KEY, None)
+    if session.info.pop(_CHANGED_KEY, None):
+        fee_shards.clear()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_shards(session: Session, previous_transaction) -> None:
+    """Discard the rolled-back transaction's shard state"""
+    if not previous_transaction.nested:
+        session.info.pop(_SHARD_KEY, None)
+        session.info.pop(_CHANGED_KEY, None)
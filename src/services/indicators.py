@@ -0,0 +1,177 @@
+"""
+Technical Indicators
+Vectorized NumPy implementations of the chart indicators
+
+All functions take 1-D float arrays and return float64 arrays of the same
+length, with NaN where the indicator is not yet defined (warm-up period).
+"""
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Largest growth factor allowed inside one EWM block before carrying state over;
+# keeps the rescaled cumulative sums far from overflow and precision loss
+_EWM_MAX_SCALE = 1e12
+
+
+def _as_array(data) -> np.ndarray:
+    return np.asarray(data, dtype=np.float64)
+
+
+def sma(data, window: int) -> np.ndarray:
+    """Simple moving average via cumulative sums, O(n)"""
+    values = _as_array(data)
+    result = np.full(values.shape, np.nan)
+    if window <= 0 or len(values) < window:
+        return result
+
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    result[window - 1 :] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def rolling_std(data, window: int) -> np.ndarray:
+    """Rolling population standard deviation via cumulative sums of x and x^2"""
+    values = _as_array(data)
+    result = np.full(values.shape, np.nan)
+    if window <= 0 or len(values) < window:
+        return result
+
+    # Centering first keeps E[x^2] - E[x]^2 from cancelling catastrophically
+    centered = values - values.mean()
+    sums = np.cumsum(np.concatenate(([0.0], centered)))
+    squares = np.cumsum(np.concatenate(([0.0], centered * centered)))
+
+    mean = (sums[window:] - sums[:-window]) / window
+    variance = (squares[window:] - squares[:-window]) / window - mean * mean
+    result[window - 1 :] = np.sqrt(np.maximum(variance, 0.0))
+    return result
+
+
+def bollinger_bands(
+    data, window: int = 20, num_std: float = 2.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger Bands as (middle, upper, lower)"""
+    middle = sma(data, window)
+    spread = num_std * rolling_std(data, window)
+    return middle, middle + spread, middle - spread
+
+
+def ewm(data, alpha: float, initial: Optional[float] = None) -> np.ndarray:
+    """
+    Exponentially weighted mean y[t] = alpha * x[t] + (1 - alpha) * y[t-1]
+
+    The recurrence is solved in closed form over blocks: within a block,
+    y[j] = d^j * (y_prev + alpha * cumsum(x[k] / d^(k+1))) with d = 1 - alpha.
+    Blocks are sized so d^-k stays bounded, then state carries to the next.
+
+    Args:
+        data: Input values
+        alpha: Smoothing factor in (0, 1]
+        initial: Value of y[-1]; defaults to the first input (y[0] = x[0])
+    """
+    values = _as_array(data)
+    result = np.empty(values.shape)
+    if len(values) == 0:
+        return result
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        result[:] = values
+        return result
+
+    block = max(1, int(math.log(_EWM_MAX_SCALE) / -math.log(decay)))
+    previous = values[0] if initial is None else initial
+
+    for start in range(0, len(values), block):
+        chunk = values[start : start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        result[start : start + len(chunk)] = powers * (
+            previous + alpha * np.cumsum(chunk / powers)
+        )
+        previous = result[start + len(chunk) - 1]
+
+    return result
+
+
+def ema(data, span: int) -> np.ndarray:
+    """Exponential moving average, seeded with the SMA of the first `span` values"""
+    values = _as_array(data)
+    result = np.full(values.shape, np.nan)
+    if span <= 0 or len(values) < span:
+        return result
+
+    seed = values[:span].mean()
+    result[span - 1] = seed
+    result[span:] = ewm(values[span:], 2.0 / (span + 1), initial=seed)
+    return result
+
+
+def rsi(data, period: int = 14) -> np.ndarray:
+    """
+    Wilder's Relative Strength Index
+
+    The first value (at index `period`) uses simple averages of the first
+    `period` gains/losses; later values use Wilder smoothing (alpha = 1/period).
+    """
+    values = _as_array(data)
+    result = np.full(values.shape, np.nan)
+    if period <= 0 or len(values) < period + 1:
+        return result
+
+    changes = np.diff(values)
+    gains = np.maximum(changes, 0.0)
+    losses = np.maximum(-changes, 0.0)
+
+    alpha = 1.0 / period
+    avg_gain = np.concatenate(
+        ([gains[:period].mean()], ewm(gains[period:], alpha, gains[:period].mean()))
+    )
+    avg_loss = np.concatenate(
+        ([losses[:period].mean()], ewm(losses[period:], alpha, losses[:period].mean()))
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    result[period:] = np.where(avg_loss == 0, 100.0, strength)
+    return result
+
+
+def macd(
+    data, fast: int = 12, slow: int = 26, signal: int = 9
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD as (macd line, signal line, histogram)"""
+    line = ema(data, fast) - ema(data, slow)
+
+    signal_line = np.full(line.shape, np.nan)
+    defined = np.flatnonzero(~np.isnan(line))
+    if len(defined):
+        signal_line[defined[0] :] = ema(line[defined[0] :], signal)
+
+    return line, signal_line, line - signal_line
+
+
+def vwap(prices, volumes, window: Optional[int] = None) -> np.ndarray:
+    """
+    Volume-weighted average price
+
+    Cumulative from the start of the series, or over a trailing window of
+    `window` points. Falls back to the price where there is no volume yet.
+    """
+    price_values = _as_array(prices)
+    volume_values = _as_array(volumes)
+
+    weighted = np.cumsum(np.concatenate(([0.0], price_values * volume_values)))
+    total = np.cumsum(np.concatenate(([0.0], volume_values)))
+
+    if window:
+        lag = np.maximum(np.arange(1, len(price_values) + 1) - window, 0)
+        weighted = weighted[1:] - weighted[lag]
+        total = total[1:] - total[lag]
+    else:
+        weighted, total = weighted[1:], total[1:]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, weighted / total, price_values)
@@ -0,0 +1,269 @@
+"""
+Item Index
+In-process lookup structures for traded item names
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..config import cache as cache_config
+from ..models.trade import MarketPrice, TradeReport, normalize_item_key
+
+# Session.info key for traded item names waiting for their transaction to commit
+_PENDING_KEY = "arca_pending_item_names"
+
+
+class ItemKeyCache:
+    """
+    Normalized item key -> MarketPrice id
+
+    Lets exact price lookups go straight to a primary-key get. Entries are
+    hints: callers check the loaded row's item_key and fall back to the
+    indexed query if the row is gone or the id was reused after a rollback.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[int]:
+        return self._ids.get(key)
+
+    def put(self, key: str, market_price_id: int) -> None:
+        with self._lock:
+            self._ids[key] = market_price_id
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._ids.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+item_ids = ItemKeyCache()
+
+
+def _trigrams(key: str, complete: bool = True) -> Set[str]:
+    """
+    Character trigrams of each word, padded so word starts weigh more
+
+    Queries pass complete=False: the last word may still be being typed, so
+    no trigram requires it to end there.
+    """
+    words = key.split()
+    grams = set()
+    for i, word in enumerate(words):
+        padded = f"  {word} " if complete or i < len(words) - 1 else f"  {word}"
+        grams.update(padded[j : j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+class _SearchState:
+    """
+    One generation of the search index
+
+    Never changed once published: rebuilds and adds build a new state and
+    swap it in, so searches need no lock.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []  # item id -> normalized key
+        self.names: List[str] = []  # item id -> display name
+        self.ids: Dict[str, int] = {}  # key -> item id
+        self.sorted_keys: List[str] = []  # for prefix range scans
+        self.postings: Dict[str, List[int]] = {}  # trigram -> item ids
+        self.posting_arrays: Dict[str, np.ndarray] = {}  # trigram -> ids as int32, lazily
+        self.gram_counts = np.zeros(64, dtype=np.int32)  # item id -> distinct trigrams
+
+    def add(self, name: str) -> None:
+        key = normalize_item_key(name)
+        if not key or key in self.ids:
+            return
+
+        item_id = len(self.keys)
+        if item_id == len(self.gram_counts):
+            self.gram_counts = np.concatenate([self.gram_counts, np.zeros_like(self.gram_counts)])
+
+        grams = _trigrams(key)
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(item_id)
+            self.posting_arrays.pop(gram, None)
+        self.gram_counts[item_id] = len(grams)
+        self.keys.append(key)
+        self.names.append(name.strip())
+        bisect.insort(self.sorted_keys, key)
+        self.ids[key] = item_id
+
+    def copy(self, grams: Iterable[str]) -> "_SearchState":
+        """A copy safe to add to; only the posting lists of grams are duplicated"""
+        state = _SearchState()
+        state.keys = list(self.keys)
+        state.names = list(self.names)
+        state.ids = dict(self.ids)
+        state.sorted_keys = list(self.sorted_keys)
+        state.postings = dict(self.postings)
+        for gram in grams:
+            if gram in state.postings:
+                state.postings[gram] = list(state.postings[gram])
+        state.posting_arrays = dict(self.posting_arrays)
+        state.gram_counts = self.gram_counts.copy()
+        return state
+
+    def posting_array(self, gram: str) -> Optional[np.ndarray]:
+        array = self.posting_arrays.get(gram)
+        if array is None:
+            postings = self.postings.get(gram)
+            if not postings:
+                return None
+            array = self.posting_arrays[gram] = np.array(postings, dtype=np.int32)
+        return array
+
+
+class ItemSearchIndex:
+    """
+    Fuzzy lookup over every item name seen in prices or trade reports
+
+    Combines a sorted-key prefix scan (autocomplete) with trigram similarity
+    (typos, word order, substrings). Trades add their names once they
+    commit; the index is rebuilt from the database every refresh_seconds
+    so names written by other processes show up too.
+    """
+
+    MIN_SIMILARITY = 0.3
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._state = _SearchState()
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._state.keys)
+
+    def add(self, *names: str) -> None:
+        """Add item names (known ones are skipped), publishing a new state"""
+        with self._lock:
+            current = self._state
+            keys = {normalize_item_key(name) for name in names} - current.ids.keys() - {""}
+            if not keys:
+                return
+
+            state = current.copy(set().union(*map(_trigrams, keys)))
+            for name in names:
+                state.add(name)
+            self._state = state
+
+    def rebuild(self, db: Session) -> int:
+        """Reload all names from the database, returning the number indexed"""
+        state = _SearchState()
+        for (name,) in db.query(MarketPrice.item_name):
+            state.add(name)
+        for (name,) in db.query(TradeReport.item_name).distinct():
+            state.add(name)
+
+        with self._lock:
+            self._state = state
+            self._loaded_at = time.monotonic()
+        return len(state.keys)
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Rebuild if never loaded or older than refresh_seconds"""
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= self.refresh_seconds:
+            self.rebuild(db)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._state = _SearchState()
+            self._loaded_at = None
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Find item names matching a partial or misspelled query
+
+        Returns:
+            (display name, score) pairs, best first. Exact matches score 3,
+            prefix matches 2-3, names containing every query word 1-2, and
+            other fuzzy matches their trigram similarity (0.3-1).
+        """
+        state = self._state
+        key = normalize_item_key(query)
+        if not key or limit <= 0:
+            return []
+
+        scores: Dict[int, float] = {}
+
+        # Prefix scan over the sorted keys
+        start = bisect.bisect_left(state.sorted_keys, key)
+        for candidate in state.sorted_keys[start : start + limit]:
+            if not candidate.startswith(key):
+                break
+            scores[state.ids[candidate]] = 2.0 + len(key) / len(candidate)
+
+        # Trigram similarity (Jaccard over distinct trigrams), counted in one pass
+        words = key.split()
+        grams = _trigrams(key, complete=False)
+        arrays = [array for array in map(state.posting_array, grams) if array is not None]
+        if arrays:
+            size = len(state.keys)
+            shared = np.bincount(np.concatenate(arrays), minlength=size)
+            totals = len(grams) + state.gram_counts[:size] - shared
+            # Items holding every query trigram almost always contain each query
+            # word and rank above other fuzzy matches; only the winners are verified
+            similarity = shared / totals + (shared == len(grams))
+
+            candidates = np.flatnonzero(similarity >= self.MIN_SIMILARITY)
+            if len(candidates) > limit:
+                top = np.argpartition(similarity[candidates], -limit)[-limit:]
+                candidates = candidates[top]
+            for item_id in candidates.tolist():
+                score = float(similarity[item_id])
+                if score >= 1.0 and not all(word in state.keys[item_id] for word in words):
+                    score -= 1.0
+                scores.setdefault(item_id, score)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(state.names[item_id], round(score, 4)) for item_id, score in best]
+
+
+item_search = ItemSearchIndex(refresh_seconds=cache_config.ITEM_INDEX_REFRESH_SECONDS)
+
+
+def index_item_names(db: Session, *names: str) -> None:
+    """Add traded item names to the search index once db's transaction commits"""
+    nested = db.get_nested_transaction()
+    db.info.setdefault(_PENDING_KEY, []).extend((nested, name) for name in names)
+
+
+@event.listens_for(Session, "after_commit")
+def _index_committed_names(session: Session) -> None:
+    """Publish the names of committed trades to the search index"""
+    if session.in_nested_transaction():
+        # A savepoint was released; the outer transaction may still roll back
+        return
+    pending = session.info.pop(_PENDING_KEY, [])
+    if pending:
+        item_search.add(*(name for _, name in pending))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_names(session: Session, previous_transaction) -> None:
+    """Drop names recorded inside the transaction or savepoint that rolled back"""
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_KEY, None)
+        return
+    pending = session.info.get(_PENDING_KEY)
+    if pending:
+        pending[:] = [entry for entry in pending if entry[0] is not previous_transaction]
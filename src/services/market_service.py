@@ -3,17 +3,25 @@ Market Service
 Tracks market index, price history, circulation status, and provides delayed averages
 """
 
+import time
 from collections import deque
 from datetime import datetime, timedelta
 from decimal import ROUND_DOWN, Decimal
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, select
 from sqlalchemy.orm import Session
 
+from ..config import cache as cache_config
 from ..config import economy
 from ..models.market import CirculationStatus, MarketAlert, MarketIndex, MarketSnapshot
-from ..models.treasury import Treasury
+from ..models.treasury import Treasury, TreasuryTransaction
+from .delayed_average import delayed_averages
+from .price_ticks import price_ticks
+from .singleton_cache import load_singleton, read_singleton
+from .tick_aggregator import record_tick, tick_aggregator
+from .time_utils import epoch_seconds
+from .volume_service import VolumeService
 
 
 class MarketService:
@@ -21,8 +29,37 @@ class MarketService:
     Service for managing market data and indices
     """
 
-    # In-memory price buffer for delayed average calculation
-    _price_buffer: deque = deque(maxlen=1000)
+    # Change horizons tracked on the market index (plus 'ytd')
+    CHANGE_HORIZONS = {
+        "1h": timedelta(hours=1),
+        "24h": timedelta(hours=24),
+        "7d": timedelta(days=7),
+        "30d": timedelta(days=30),
+    }
+
+    # Snapshot interval lengths, and how far back a backfill looks for gaps
+    SNAPSHOT_INTERVALS = {"minute": 60, "hour": 3600, "day": 86400}
+    BACKFILL_LOOKBACK = {
+        "minute": timedelta(days=1),
+        "hour": timedelta(days=30),
+        "day": timedelta(days=365),
+    }
+
+    # Snapshots deleted per statement during compaction
+    COMPACTION_BATCH_SIZE = 5000
+
+    # Point-in-time fields a rolled-up row takes from the last row it covers
+    _ROLLUP_FIELDS = (
+        "index_value",
+        "delayed_average",
+        "carat_price",
+        "volume",
+        "transaction_count",
+        "total_circulation",
+        "circulation_status",
+        "book_value",
+        "reserve_ratio",
+    )
 
     def __init__(self, db: Session):
         self.db = db
@@ -31,7 +68,7 @@ class MarketService:
 
     def get_market_index(self) -> MarketIndex:
         """Get or create the market index singleton"""
-        index = self.db.query(MarketIndex).first()
+        index = load_singleton(self.db, MarketIndex)
         if not index:
             index = MarketIndex(
                 current_index=Decimal("100"),
@@ -46,12 +83,19 @@ class MarketService:
 
     def get_market_status(self) -> dict:
         """Get comprehensive market status"""
-        index = self.get_market_index()
-        treasury = self.db.query(Treasury).first()
+        index = read_singleton(self.db, MarketIndex) or self.get_market_index()
+        treasury = read_singleton(self.db, Treasury)
+        price_ticks.ensure_loaded(self.db)
+        day = price_ticks.window(86400)
+        delayed_averages.sync(self.db, max_age=cache_config.SINGLETON_TTL_SECONDS)
 
         return {
             "current_index": Decimal(index.current_index),
             "delayed_average": Decimal(index.delayed_average),
+            "delayed_averages": {
+                f"{hours}h": self._windowed_average(hours) or Decimal(index.current_index)
+                for hours in economy.DELAYED_AVERAGE_WINDOWS_HOURS
+            },
             "carat_price": Decimal(index.carat_price_diamonds),
             "effective_price": index.effective_price,
             "circulation_status": index.circulation_status.value,
@@ -62,6 +106,10 @@ class MarketService:
             "change_1h": Decimal(index.change_1h),
             "change_24h": Decimal(index.change_24h),
             "change_7d": Decimal(index.change_7d),
+            "change_30d": Decimal(index.change_30d),
+            "change_ytd": Decimal(index.change_ytd),
+            "high_24h": _to_price(day["max"]) if day else None,
+            "low_24h": _to_price(day["min"]) if day else None,
             "last_updated": index.last_updated,
             "last_refresh": index.last_refresh,
             "total_circulation": treasury.total_circulation_in_carats if treasury else Decimal("0"),
@@ -77,8 +125,8 @@ class MarketService:
         index = self.get_market_index()
         old_price = Decimal(index.carat_price_diamonds)
 
-        # Store in buffer for delayed average
-        self._price_buffer.append({"price": book_value, "timestamp": datetime.utcnow()})
+        # Feeds the snapshot OHLC bars and the tick history once committed
+        record_tick(self.db, book_value)
 
         # Update current price (unless frozen)
         if not index.is_price_frozen:
@@ -94,27 +142,52 @@ class MarketService:
 
         return book_value
 
-    def calculate_delayed_average(self, window_hours: int = None) -> Decimal:
+    def calculate_delayed_average(
+        self, window_hours: int = None, time_weighted: Optional[bool] = None
+    ) -> Decimal:
         """
         Calculate delayed moving average for public display
         This prevents front-running and manipulation
+
+        Configured windows are served from running sums over minute snapshots;
+        other windows scan those snapshots.
         """
         if window_hours is None:
             window_hours = economy.MARKET_AVERAGE_WINDOW_HOURS
+        if time_weighted is None:
+            time_weighted = economy.DELAYED_AVERAGE_TIME_WEIGHTED
 
-        cutoff = datetime.utcnow() - timedelta(hours=window_hours)
-
-        # Get from snapshots
-        snapshots = (
-            self.db.query(MarketSnapshot).filter(MarketSnapshot.snapshot_time >= cutoff).all()
-        )
+        if window_hours in delayed_averages.windows_hours:
+            delayed_averages.sync(self.db)
+            average = self._windowed_average(window_hours, time_weighted)
+        else:
+            cutoff = datetime.utcnow() - timedelta(hours=window_hours)
+            average = (
+                self.db.query(func.avg(MarketSnapshot.index_value))
+                .filter(
+                    MarketSnapshot.interval_type == delayed_averages.interval_type,
+                    MarketSnapshot.snapshot_time >= cutoff,
+                )
+                .scalar()
+            )
+            if average is not None:
+                average = Decimal(average).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
 
-        if not snapshots:
+        if average is None:
             index = self.get_market_index()
             return Decimal(index.current_index)
-
-        total = sum(Decimal(s.index_value) for s in snapshots)
-        return (total / len(snapshots)).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
+        return average
+
+    def _windowed_average(
+        self, window_hours: int, time_weighted: Optional[bool] = None
+    ) -> Optional[Decimal]:
+        """Average from the running sums as last synced, or None if the window is empty"""
+        if time_weighted is None:
+            time_weighted = economy.DELAYED_AVERAGE_TIME_WEIGHTED
+        average = delayed_averages.average(window_hours, time_weighted=time_weighted)
+        if average is None:
+            return None
+        return average.quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
 
     def refresh_market_index(self) -> MarketIndex:
         """
@@ -122,7 +195,7 @@ class MarketService:
         Called every X minutes as configured
         """
         index = self.get_market_index()
-        treasury = self.db.query(Treasury).first()
+        treasury = load_singleton(self.db, Treasury)
 
         if not treasury:
             return index
@@ -131,9 +204,12 @@ class MarketService:
         index.delayed_average = self.calculate_delayed_average()
 
         # Calculate changes
-        index.change_1h = self._calculate_change(hours=1)
-        index.change_24h = self._calculate_change(hours=24)
-        index.change_7d = self._calculate_change(hours=168)
+        changes = self.calculate_changes(current_value=Decimal(index.current_index))
+        index.change_1h = changes["1h"]
+        index.change_24h = changes["24h"]
+        index.change_7d = changes["7d"]
+        index.change_30d = changes["30d"]
+        index.change_ytd = changes["ytd"]
 
         # Update volume metrics
         self._update_volume_metrics(index)
@@ -145,52 +221,64 @@ class MarketService:
 
         return index
 
-    def _calculate_change(self, hours: int) -> Decimal:
-        """Calculate percentage change over time period"""
-        cutoff = datetime.utcnow() - timedelta(hours=hours)
-
-        old_snapshot = (
-            self.db.query(MarketSnapshot)
-            .filter(MarketSnapshot.snapshot_time <= cutoff)
-            .order_by(desc(MarketSnapshot.snapshot_time))
-            .first()
-        )
-
-        if not old_snapshot:
-            return Decimal("0")
+    @staticmethod
+    def _horizon_cutoff(horizon: str, now: datetime) -> datetime:
+        """Reference time for a change horizon ('ytd' = start of the UTC year)"""
+        if horizon == "ytd":
+            return datetime(now.year, 1, 1)
+        return now - MarketService.CHANGE_HORIZONS[horizon]
 
-        index = self.get_market_index()
-        old_value = Decimal(old_snapshot.index_value)
-        current_value = Decimal(index.current_index)
+    def calculate_changes(
+        self,
+        horizons: Optional[Sequence[str]] = None,
+        current_value: Optional[Decimal] = None,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Decimal]:
+        """
+        Percentage change of the index over several horizons in one query
 
-        if old_value == 0:
-            return Decimal("0")
+        Each horizon compares against the latest snapshot at or before its
+        cutoff; all lookups are scalar subqueries of a single SELECT. A
+        horizon with no snapshot that old reports 0.
 
-        change = ((current_value - old_value) / old_value * Decimal("100")).quantize(
-            Decimal("0.01"), rounding=ROUND_DOWN
-        )
-        return change
+        Args:
+            horizons: Keys of CHANGE_HORIZONS or 'ytd' (defaults to all)
+            current_value: Index to compare (defaults to the current index)
+        """
+        horizons = list(horizons or [*self.CHANGE_HORIZONS, "ytd"])
+        now = now or datetime.utcnow()
+        if current_value is None:
+            current_value = Decimal(self.get_market_index().current_index)
+
+        lookups = [
+            select(MarketSnapshot.index_value)
+            .where(MarketSnapshot.snapshot_time <= self._horizon_cutoff(horizon, now))
+            .order_by(desc(MarketSnapshot.snapshot_time))
+            .limit(1)
+            .scalar_subquery()
+            .label(horizon)
+            for horizon in horizons
+        ]
+        old_values = self.db.execute(select(*lookups)).one()
+
+        changes = {}
+        for horizon, old_value in zip(horizons, old_values):
+            if not old_value:
+                changes[horizon] = Decimal("0")
+                continue
+            old_value = Decimal(old_value)
+            changes[horizon] = ((current_value - old_value) / old_value * Decimal("100")).quantize(
+                Decimal("0.01"), rounding=ROUND_DOWN
+            )
+        return changes
 
     def _update_volume_metrics(self, index: MarketIndex) -> None:
-        """Update 24h volume metrics"""
-        from ..models.treasury import TreasuryTransaction
-
-        cutoff = datetime.utcnow() - timedelta(hours=24)
+        """Update 24h volume metrics from the rolling minute buckets"""
+        volume_service = VolumeService(self.db)
+        if not volume_service.is_initialized():
+            volume_service.rebuild()
 
-        transactions = (
-            self.db.query(TreasuryTransaction)
-            .filter(TreasuryTransaction.created_at >= cutoff)
-            .all()
-        )
-
-        total_volume = sum(
-            abs(Decimal(tx.carat_amount))
-            + abs(Decimal(tx.golden_carat_amount)) * Decimal(economy.GOLDEN_CARAT_MULTIPLIER)
-            for tx in transactions
-        )
-
-        index.volume_24h = total_volume
-        index.transaction_count_24h = len(transactions)
+        index.volume_24h, index.transaction_count_24h = volume_service.get_window_totals()
 
     # ==================== CIRCULATION CONTROL ====================
 
@@ -260,10 +348,12 @@ class MarketService:
 
     # ==================== SNAPSHOTS ====================
 
-    def create_snapshot(self, interval_type: str = "hour") -> MarketSnapshot:
-        """Create a market snapshot"""
+    def create_snapshot(
+        self, interval_type: str = "hour", at: Optional[datetime] = None
+    ) -> MarketSnapshot:
+        """Create a market snapshot, stamped at the given time (default: now)"""
         index = self.get_market_index()
-        treasury = self.db.query(Treasury).first()
+        treasury = read_singleton(self.db, Treasury)
 
         # Get OHLC data from recent transactions
         last_snapshot = (
@@ -276,15 +366,22 @@ class MarketService:
             else Decimal(index.carat_price_diamonds)
         )
         current_price = Decimal(index.carat_price_diamonds)
+        high_price = max(open_price, current_price)
+        low_price = min(open_price, current_price)
+
+        # Widen to every price seen since this interval's last snapshot
+        bar = tick_aggregator.flush(interval_type)
+        if bar and bar["ticks"] and not index.is_price_frozen:
+            high_price = max(high_price, _to_price(bar["high"]))
+            low_price = min(low_price, _to_price(bar["low"]))
 
-        # Simplified OHLC - in production you'd track highs/lows
         snapshot = MarketSnapshot(
             index_value=index.current_index,
             delayed_average=index.delayed_average,
             carat_price=current_price,
             open_price=open_price,
-            high_price=max(open_price, current_price),
-            low_price=min(open_price, current_price),
+            high_price=high_price,
+            low_price=low_price,
             close_price=current_price,
             volume=index.volume_24h,
             transaction_count=index.transaction_count_24h,
@@ -293,10 +390,187 @@ class MarketService:
             book_value=treasury.book_value if treasury else Decimal("1"),
             reserve_ratio=treasury.reserve_ratio if treasury else Decimal("0"),
             interval_type=interval_type,
+            snapshot_time=at or datetime.utcnow(),
         )
         self.db.add(snapshot)
         return snapshot
 
+    def backfill_snapshots(
+        self, interval_types: Optional[Sequence[str]] = None, now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        Reconstruct snapshots missing after scheduler downtime from the treasury ledger
+
+        Every ledger row records the treasury state after it, so the book
+        value (and with it price and index) at any past moment is that of the
+        last transaction before it. Each completed interval bucket within the
+        lookback window that holds no snapshot gets one at the bucket start.
+        All rows are built in one pass over the ledger and inserted in bulk.
+
+        Returns:
+            Snapshots inserted per interval type
+        """
+        now = now or datetime.utcnow()
+        return {
+            interval_type: self._backfill_interval(interval_type, now)
+            for interval_type in (interval_types or self.SNAPSHOT_INTERVALS)
+        }
+
+    def _backfill_interval(self, interval_type: str, now: datetime) -> int:
+        seconds = self.SNAPSHOT_INTERVALS[interval_type]
+        first_tx = self.db.query(func.min(TreasuryTransaction.created_at)).scalar()
+        if first_tx is None:
+            return 0
+
+        # Completed buckets only: the scheduler still owns the current one
+        earliest = max(first_tx, now - self.BACKFILL_LOOKBACK[interval_type])
+        start = -(-int(epoch_seconds(earliest)) // seconds)
+        end = int(epoch_seconds(now)) // seconds - 1
+        if start > end:
+            return 0
+        start_time = datetime.utcfromtimestamp(start * seconds)
+        window = timedelta(hours=economy.MARKET_AVERAGE_WINDOW_HOURS)
+        volume_window = timedelta(minutes=VolumeService.WINDOW_MINUTES)
+
+        existing = {}
+        for snapshot in (
+            self.db.query(MarketSnapshot)
+            .filter(
+                MarketSnapshot.interval_type == interval_type,
+                MarketSnapshot.snapshot_time >= start_time - window,
+            )
+            .order_by(MarketSnapshot.snapshot_time)
+        ):
+            existing.setdefault(int(epoch_seconds(snapshot.snapshot_time)) // seconds, snapshot)
+
+        previous = (
+            self.db.query(MarketSnapshot)
+            .filter(
+                MarketSnapshot.interval_type == interval_type,
+                MarketSnapshot.snapshot_time < start_time,
+            )
+            .order_by(desc(MarketSnapshot.snapshot_time))
+            .first()
+        )
+        treasury = read_singleton(self.db, Treasury)
+        previous_close = Decimal(previous.close_price) if previous else None
+        reserve_ratio = (
+            Decimal(previous.reserve_ratio)
+            if previous
+            else (treasury.reserve_ratio if treasury else Decimal("0"))
+        )
+
+        # Trailing index values for the delayed average, seeded from stored snapshots
+        averaged = deque(
+            (int(epoch_seconds(s.snapshot_time)), Decimal(s.index_value))
+            for bucket, s in existing.items()
+            if bucket < start
+        )
+        averaged_total = sum((value for _, value in averaged), Decimal("0"))
+
+        ledger = (
+            self.db.query(
+                TreasuryTransaction.created_at,
+                TreasuryTransaction.carat_amount,
+                TreasuryTransaction.golden_carat_amount,
+                TreasuryTransaction.treasury_diamonds_after,
+                TreasuryTransaction.treasury_carats_after,
+                TreasuryTransaction.book_value_after,
+            )
+            .filter(
+                TreasuryTransaction.created_at >= start_time - max(window, volume_window),
+                TreasuryTransaction.created_at < datetime.utcfromtimestamp((end + 1) * seconds),
+            )
+            .order_by(TreasuryTransaction.created_at, TreasuryTransaction.id)
+            .all()
+        )
+        state = (
+            self.db.query(
+                TreasuryTransaction.treasury_diamonds_after,
+                TreasuryTransaction.treasury_carats_after,
+                TreasuryTransaction.book_value_after,
+            )
+            .filter(TreasuryTransaction.created_at < start_time - max(window, volume_window))
+            .order_by(desc(TreasuryTransaction.created_at), desc(TreasuryTransaction.id))
+            .first()
+        )
+
+        rows = []
+        applied = 0  # ledger rows folded into state
+        expired = 0  # ledger rows that left the 24h volume window
+        volume, count = Decimal("0"), 0
+        for bucket in range(start, end + 1):
+            at = bucket * seconds
+            at_time = datetime.utcfromtimestamp(at)
+
+            prices = []
+            while applied < len(ledger) and ledger[applied].created_at <= at_time:
+                tx = ledger[applied]
+                state = (tx.treasury_diamonds_after, tx.treasury_carats_after, tx.book_value_after)
+                if tx.created_at > at_time - timedelta(seconds=seconds):
+                    prices.append(Decimal(tx.book_value_after))
+                volume += VolumeService.transaction_volume(tx.carat_amount, tx.golden_carat_amount)
+                count += 1
+                applied += 1
+            while expired < applied and ledger[expired].created_at <= at_time - volume_window:
+                tx = ledger[expired]
+                volume -= VolumeService.transaction_volume(tx.carat_amount, tx.golden_carat_amount)
+                count -= 1
+                expired += 1
+
+            stored = existing.get(bucket)
+            if stored is not None:
+                index_value = Decimal(stored.index_value)
+                previous_close = Decimal(stored.close_price)
+                reserve_ratio = Decimal(stored.reserve_ratio)
+            elif state is not None:
+                diamonds, carats, book_value = (Decimal(value) for value in state)
+                index_value = (book_value * Decimal("100")).quantize(
+                    Decimal("0.0001"), rounding=ROUND_DOWN
+                )
+                # Book value is diamonds per carat in circulation
+                circulation = (
+                    (diamonds / book_value).quantize(Decimal("0.0001"))
+                    if diamonds and book_value
+                    else carats
+                )
+                open_price = previous_close if previous_close is not None else book_value
+                rows.append(
+                    {
+                        "index_value": index_value,
+                        "carat_price": book_value,
+                        "open_price": open_price,
+                        "high_price": max(prices + [open_price, book_value]),
+                        "low_price": min(prices + [open_price, book_value]),
+                        "close_price": book_value,
+                        "volume": volume,
+                        "transaction_count": count,
+                        "total_circulation": circulation,
+                        "circulation_status": _circulation_status(circulation),
+                        "book_value": book_value,
+                        "reserve_ratio": reserve_ratio,
+                        "interval_type": interval_type,
+                        "snapshot_time": at_time,
+                    }
+                )
+                previous_close = book_value
+            else:
+                continue
+
+            averaged.append((at, index_value))
+            averaged_total += index_value
+            while averaged and averaged[0][0] < at - window.total_seconds():
+                averaged_total -= averaged.popleft()[1]
+            if stored is None:
+                rows[-1]["delayed_average"] = (averaged_total / len(averaged)).quantize(
+                    Decimal("0.0001"), rounding=ROUND_DOWN
+                )
+
+        if rows:
+            self.db.bulk_insert_mappings(MarketSnapshot, rows)
+            self.db.flush()
+        return len(rows)
+
     def get_snapshots(
         self, interval_type: str = "hour", days: int = 30, limit: int = 720
     ) -> List[MarketSnapshot]:
@@ -328,6 +602,156 @@ class MarketService:
             for s in snapshots
         ]
 
+    # ==================== COMPACTION ====================
+
+    def compact_snapshots(self, now: Optional[datetime] = None) -> dict:
+        """
+        Downsample old snapshots and enforce retention
+
+        Minute snapshots older than MINUTE_SNAPSHOT_RETENTION_DAYS are rolled
+        into hour rows and hour rows older than HOUR_SNAPSHOT_RETENTION_DAYS
+        into day rows, then deleted in batches. Day rows are dropped after
+        PRICE_HISTORY_RETENTION_DAYS. A rolled-up row at time T covers the
+        source rows in [T, T + interval), the same buckets the backfill fills:
+        open of the first, high/low over all, close of the last. Days touched
+        by new hour rows are re-rolled from their hours so daily candles are
+        true OHLC as well.
+
+        Returns:
+            Rows rolled up and deleted per interval type, and elapsed ms
+        """
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        minute_cutoff = _floor_time(
+            now - timedelta(days=economy.MINUTE_SNAPSHOT_RETENTION_DAYS), 3600
+        )
+        hour_cutoff = _floor_time(now - timedelta(days=economy.HOUR_SNAPSHOT_RETENTION_DAYS), 86400)
+        day_cutoff = now - timedelta(days=economy.PRICE_HISTORY_RETENTION_DAYS)
+
+        hours = self._rollup_snapshots("minute", "hour", until=minute_cutoff)
+        days = set()
+        if hours:
+            touched = {hour // 86400 * 86400 for hour in hours}
+            days |= self._rollup_snapshots(
+                "hour",
+                "day",
+                since=datetime.utcfromtimestamp(min(touched)),
+                until=datetime.utcfromtimestamp(max(touched) + 86400),
+            )
+        days |= self._rollup_snapshots("hour", "day", until=hour_cutoff)
+
+        deleted = {
+            "minute": self._delete_snapshots("minute", minute_cutoff),
+            "hour": self._delete_snapshots("hour", hour_cutoff),
+            "day": self._delete_snapshots("day", day_cutoff),
+        }
+
+        return {
+            "rolled_up": {"hour": len(hours), "day": len(days)},
+            "deleted": deleted,
+            "reclaimed": sum(deleted.values()),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _rollup_snapshots(
+        self, source: str, target: str, until: datetime, since: Optional[datetime] = None
+    ) -> set:
+        """
+        Aggregate source snapshots in [since, until) into target-interval OHLC rows
+
+        Rows are bucketed by the start of their target interval. An existing
+        target row in the same bucket, even one stamped just after the
+        boundary, gets its OHLC replaced; missing buckets are inserted at the
+        bucket start. Returns the epoch times of the target buckets written.
+        """
+        seconds = self.SNAPSHOT_INTERVALS[target]
+        query = self.db.query(
+            MarketSnapshot.snapshot_time,
+            MarketSnapshot.open_price,
+            MarketSnapshot.high_price,
+            MarketSnapshot.low_price,
+            MarketSnapshot.close_price,
+            *(getattr(MarketSnapshot, name) for name in self._ROLLUP_FIELDS),
+        ).filter(MarketSnapshot.interval_type == source, MarketSnapshot.snapshot_time < until)
+        if since is not None:
+            query = query.filter(MarketSnapshot.snapshot_time >= since)
+
+        buckets: Dict[int, dict] = {}
+        for row in query.order_by(MarketSnapshot.snapshot_time, MarketSnapshot.id).yield_per(
+            self.COMPACTION_BATCH_SIZE
+        ):
+            bucket = int(epoch_seconds(row.snapshot_time)) // seconds * seconds
+            candle = buckets.get(bucket)
+            if candle is None:
+                candle = buckets[bucket] = {
+                    "open_price": row.open_price,
+                    "high_price": row.high_price,
+                    "low_price": row.low_price,
+                }
+            else:
+                candle["high_price"] = max(candle["high_price"], row.high_price)
+                candle["low_price"] = min(candle["low_price"], row.low_price)
+            candle["close_price"] = row.close_price
+            for name in self._ROLLUP_FIELDS:
+                candle[name] = getattr(row, name)
+
+        if not buckets:
+            return set()
+
+        existing = {}
+        for row_id, snapshot_time in (
+            self.db.query(MarketSnapshot.id, MarketSnapshot.snapshot_time)
+            .filter(
+                MarketSnapshot.interval_type == target,
+                MarketSnapshot.snapshot_time >= datetime.utcfromtimestamp(min(buckets)),
+                MarketSnapshot.snapshot_time < datetime.utcfromtimestamp(max(buckets) + seconds),
+            )
+            .order_by(MarketSnapshot.snapshot_time, MarketSnapshot.id)
+        ):
+            existing.setdefault(int(epoch_seconds(snapshot_time)) // seconds * seconds, row_id)
+
+        updates, inserts = [], []
+        revised = datetime.utcnow()  # changes snapshot fingerprints, so cached charts reload
+        for bucket, candle in buckets.items():
+            ohlc = {name: candle[name] for name in _OHLC_FIELDS}
+            if bucket in existing:
+                updates.append({"id": existing[bucket], **ohlc, "updated_at": revised})
+            else:
+                inserts.append(
+                    {
+                        **candle,
+                        "interval_type": target,
+                        "snapshot_time": datetime.utcfromtimestamp(bucket),
+                    }
+                )
+
+        if updates:
+            self.db.bulk_update_mappings(MarketSnapshot, updates)
+        if inserts:
+            self.db.bulk_insert_mappings(MarketSnapshot, inserts)
+        self.db.flush()
+        return set(buckets)
+
+    def _delete_snapshots(self, interval_type: str, until: datetime) -> int:
+        """Delete snapshots of one interval before a time, in batches"""
+        deleted = 0
+        while True:
+            ids = [
+                row_id
+                for (row_id,) in self.db.query(MarketSnapshot.id)
+                .filter(
+                    MarketSnapshot.interval_type == interval_type,
+                    MarketSnapshot.snapshot_time < until,
+                )
+                .limit(self.COMPACTION_BATCH_SIZE)
+            ]
+            if not ids:
+                return deleted
+            self.db.query(MarketSnapshot).filter(MarketSnapshot.id.in_(ids)).delete(
+                synchronize_session=False
+            )
+            deleted += len(ids)
+
     # ==================== ALERTS ====================
 
     def _create_alert(
@@ -372,3 +796,26 @@ class MarketService:
             alert.is_active = False
             alert.resolved_at = datetime.utcnow()
         return alert
+
+
+_OHLC_FIELDS = ("open_price", "high_price", "low_price", "close_price")
+
+
+def _to_price(value: float) -> Decimal:
+    """Tick price as a Decimal at snapshot price precision"""
+    return Decimal(repr(value)).quantize(Decimal("0.00000001"))
+
+
+def _floor_time(at: datetime, seconds: int) -> datetime:
+    """Start of the interval bucket containing a naive UTC datetime"""
+    return datetime.utcfromtimestamp(int(epoch_seconds(at)) // seconds * seconds)
+
+
+def _circulation_status(circulation: Decimal) -> CirculationStatus:
+    """Status implied by circulation alone (freezes are not recorded in the ledger)"""
+    threshold = Decimal(economy.MIN_CIRCULATION_THRESHOLD)
+    if circulation < threshold * Decimal("0.5"):
+        return CirculationStatus.CRITICAL
+    if circulation < threshold:
+        return CirculationStatus.LOW
+    return CirculationStatus.HEALTHY
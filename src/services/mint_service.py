@@ -15,6 +15,7 @@ from ..config import economy
 from ..models.currency import CurrencyType
 from ..models.treasury import TransactionType, Treasury, TreasuryTransaction
 from ..models.user import User
+from .treasury_service import TreasuryService
 
 
 @dataclass
@@ -40,6 +41,7 @@ class MintService:
 
     def __init__(self, db: Session):
         self.db = db
+        self.treasury_service = TreasuryService(db)
 
     # ==================== MINTING OPERATIONS ====================
 
@@ -75,21 +77,15 @@ class MintService:
             )
 
         # Record transaction
-        transaction = TreasuryTransaction(
+        return self.treasury_service._record_transaction(
             transaction_type=TransactionType.MINT,
+            user=admin,
             carat_amount=amount if currency_type == CurrencyType.CARAT else Decimal("0"),
             golden_carat_amount=(
                 amount if currency_type == CurrencyType.GOLDEN_CARAT else Decimal("0")
             ),
-            user_id=admin.id,
-            treasury_diamonds_after=treasury.total_diamonds,
-            treasury_carats_after=treasury.total_carats_minted,
-            book_value_after=treasury.book_value,
             notes=notes or f"Minted {amount} {currency_type.value}",
         )
-        self.db.add(transaction)
-
-        return transaction
 
     def burn_carats(
         self,
@@ -123,21 +119,15 @@ class MintService:
             )
 
         # Record transaction
-        transaction = TreasuryTransaction(
+        return self.treasury_service._record_transaction(
             transaction_type=TransactionType.BURN,
+            user=admin,
             carat_amount=-amount if currency_type == CurrencyType.CARAT else Decimal("0"),
             golden_carat_amount=(
                 -amount if currency_type == CurrencyType.GOLDEN_CARAT else Decimal("0")
             ),
-            user_id=admin.id,
-            treasury_diamonds_after=treasury.total_diamonds,
-            treasury_carats_after=treasury.total_carats_minted,
-            book_value_after=treasury.book_value,
             notes=notes or f"Burned {amount} {currency_type.value}",
         )
-        self.db.add(transaction)
-
-        return transaction
 
     # ==================== MINT CHECK / RECOMMENDATIONS ====================
 
@@ -295,12 +285,7 @@ class MintService:
 
     def _get_treasury(self) -> Treasury:
         """Get treasury singleton"""
-        treasury = self.db.query(Treasury).first()
-        if not treasury:
-            treasury = Treasury()
-            self.db.add(treasury)
-            self.db.flush()
-        return treasury
+        return self.treasury_service.get_treasury()
 
     def _check_mint_limit(self, amount: Decimal, currency_type: CurrencyType) -> bool:
         """Check if mint is within daily limit"""
@@ -0,0 +1,260 @@
+"""
+Price Tick Store
+Bounded, array-backed history of recent price ticks with windowed statistics
+"""
+
+import math
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+
+from ..config import cache as cache_config
+from ..models.market import PriceTick
+from .time_utils import epoch_seconds
+
+# Session.info key holding checkpoints written but not yet committed
+_PENDING_KEY = "arca_pending_tick_checkpoints"
+
+
+class PriceTickStore:
+    """
+    Ring buffer of (timestamp, price) ticks
+
+    Ticks are addressed by a monotonically increasing sequence number; the
+    newest `capacity` are kept in preallocated float64 arrays. Timestamps
+    never decrease, so a window start is found by binary search. Running
+    prefix sums give the window mean in O(1), and min/max segment trees
+    over the slots answer window extremes in O(log n).
+
+    The buffer is checkpointed to the price_ticks table and reloaded from
+    it (merged with anything recorded meanwhile) on first use.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._tree_size = 1 << max(0, math.ceil(math.log2(self.capacity)))
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._prices = np.zeros(self.capacity, dtype=np.float64)
+        self._prefix = np.zeros(self.capacity, dtype=np.float64)  # sum of prices through tick
+        self._min_tree = np.full(2 * self._tree_size, np.inf)
+        self._max_tree = np.full(2 * self._tree_size, -np.inf)
+        self._count = 0  # ticks ever appended; the next sequence number
+        self._total = 0.0
+        self._persisted = 0  # sequence number up to which ticks are checkpointed
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    # ==================== WRITES ====================
+
+    def append(self, price: float, at: Optional[datetime] = None) -> None:
+        """Record a tick (timestamps earlier than the newest tick are clamped to it)"""
+        with self._lock:
+            self._append(float(price), epoch_seconds(at or datetime.utcnow()))
+
+    def _append(self, price: float, timestamp: float) -> None:
+        if self._count:
+            timestamp = max(timestamp, self._times[(self._count - 1) % self.capacity])
+        slot = self._count % self.capacity
+        self._total += price
+        self._times[slot] = timestamp
+        self._prices[slot] = price
+        self._prefix[slot] = self._total
+        self._count += 1
+
+        node = slot + self._tree_size
+        self._min_tree[node] = self._max_tree[node] = price
+        node >>= 1
+        while node:
+            left, right = 2 * node, 2 * node + 1
+            self._min_tree[node] = min(self._min_tree[left], self._min_tree[right])
+            self._max_tree[node] = max(self._max_tree[left], self._max_tree[right])
+            node >>= 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    # ==================== QUERIES ====================
+
+    def _oldest(self) -> int:
+        return max(0, self._count - self.capacity)
+
+    def _first_after(self, timestamp: float) -> int:
+        """Sequence number of the first kept tick newer than timestamp"""
+        low, high = self._oldest(), self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._times[middle % self.capacity] > timestamp:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _extremes(self, start: int, end: int) -> Tuple[float, float]:
+        """Min and max over sequence numbers [start, end)"""
+        lowest, highest = math.inf, -math.inf
+        first, last = start % self.capacity, (end - 1) % self.capacity
+        ranges = [(first, last + 1)] if first <= last else [(first, self.capacity), (0, last + 1)]
+        for low, high in ranges:
+            low += self._tree_size
+            high += self._tree_size
+            while low < high:
+                if low & 1:
+                    lowest = min(lowest, self._min_tree[low])
+                    highest = max(highest, self._max_tree[low])
+                    low += 1
+                if high & 1:
+                    high -= 1
+                    lowest = min(lowest, self._min_tree[high])
+                    highest = max(highest, self._max_tree[high])
+                low >>= 1
+                high >>= 1
+        return float(lowest), float(highest)
+
+    def window(self, seconds: float, now: Optional[datetime] = None) -> Optional[dict]:
+        """
+        Statistics over ticks in the trailing window
+
+        Returns:
+            Dict with count, mean, min, max, last, and covered (whether the
+            buffer reaches back to the window start), or None if no ticks fall
+            inside the window
+        """
+        cutoff = epoch_seconds(now or datetime.utcnow()) - seconds
+        with self._lock:
+            start, end = self._first_after(cutoff), self._count
+            if start >= end:
+                return None
+
+            first, last = start % self.capacity, (end - 1) % self.capacity
+            total = self._prefix[last] - self._prefix[first] + self._prices[first]
+            lowest, highest = self._extremes(start, end)
+            return {
+                "count": end - start,
+                "mean": float(total / (end - start)),
+                "min": lowest,
+                "max": highest,
+                "last": float(self._prices[last]),
+                "covered": start > self._oldest(),
+            }
+
+    def last(self) -> Optional[Tuple[datetime, float]]:
+        """Newest (time, price), or None"""
+        with self._lock:
+            if not self._count:
+                return None
+            slot = (self._count - 1) % self.capacity
+            return datetime.utcfromtimestamp(self._times[slot]), float(self._prices[slot])
+
+    def _ticks(self, start: int) -> List[Tuple[float, float]]:
+        """(timestamp, price) for kept ticks from a sequence number on, oldest first"""
+        return [
+            (float(self._times[n % self.capacity]), float(self._prices[n % self.capacity]))
+            for n in range(max(start, self._oldest()), self._count)
+        ]
+
+    # ==================== CHECKPOINTS ====================
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Load checkpointed ticks once per process, keeping any recorded since start"""
+        if self._loaded:
+            return
+
+        rows = db.execute(
+            select(PriceTick.recorded_at, PriceTick.price)
+            .order_by(PriceTick.id.desc())
+            .limit(self.capacity)
+        ).all()
+
+        with self._lock:
+            if self._loaded:
+                return
+            unsaved = self._ticks(self._persisted)
+            self._reset()
+            for recorded_at, price in reversed(rows):
+                self._append(float(price), epoch_seconds(recorded_at))
+            self._persisted = self._count
+            for timestamp, price in unsaved:
+                self._append(price, timestamp)
+            self._loaded = True
+
+    def checkpoint(self, db: Session) -> int:
+        """
+        Write ticks recorded since the last checkpoint and trim the table
+
+        The ticks only count as persisted once the session commits; if it (or
+        the savepoint the checkpoint ran in) rolls back, the next checkpoint
+        writes them again.
+
+        Returns:
+            Number of ticks written
+        """
+        self.ensure_loaded(db)
+        # Ticks this session already wrote are not committed yet, but not due again either
+        pending = db.info.get(_PENDING_KEY, [])
+        written = [sequence for _, store, sequence in pending if store is self]
+        with self._lock:
+            ticks = self._ticks(max([self._persisted, *written]))
+            persisted = self._count
+
+        if ticks:
+            db.bulk_insert_mappings(
+                PriceTick,
+                [
+                    {"price": price, "recorded_at": datetime.utcfromtimestamp(timestamp)}
+                    for timestamp, price in ticks
+                ],
+            )
+            keep_from = db.execute(
+                select(PriceTick.id)
+                .order_by(PriceTick.id.desc())
+                .offset(self.capacity - 1)
+                .limit(1)
+            ).scalar()
+            if keep_from is not None:
+                db.execute(delete(PriceTick).where(PriceTick.id < keep_from))
+            db.flush()
+            db.info.setdefault(_PENDING_KEY, []).append(
+                (db.get_nested_transaction(), self, persisted)
+            )
+
+        return len(ticks)
+
+    def mark_persisted(self, sequence: int) -> None:
+        """Record that ticks before this sequence number are committed to the table"""
+        with self._lock:
+            self._persisted = min(max(self._persisted, sequence), self._count)
+
+
+price_ticks = PriceTickStore(capacity=cache_config.PRICE_TICK_CAPACITY)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed_checkpoints(session: Session) -> None:
+    """Advance the persisted mark once checkpointed ticks are committed"""
+    if session.in_nested_transaction():
+        # A savepoint was released; the outer transaction may still roll back
+        return
+    for _, store, sequence in session.info.pop(_PENDING_KEY, []):
+        store.mark_persisted(sequence)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_checkpoints(session: Session, previous_transaction) -> None:
+    """Forget checkpoints written inside the transaction or savepoint that rolled back"""
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_KEY, None)
+        return
+    pending = session.info.get(_PENDING_KEY)
+    if pending:
+        pending[:] = [entry for entry in pending if entry[0] is not previous_transaction]
@@ -0,0 +1,168 @@
+"""
+Singleton Cache
+Process-level write-through cache for the single-row Treasury and MarketIndex tables
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Type
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from ..config import cache as cache_config
+from ..models.market import MarketIndex
+from ..models.treasury import Treasury
+
+CACHED_MODELS = (Treasury, MarketIndex)
+
+# Session.info key holding snapshots flushed but not yet committed
+_PENDING_KEY = "arca_singleton_pending"
+
+
+class SingletonCache:
+    """
+    Versioned snapshots of singleton rows
+
+    Entries are published only after a successful commit, so readers never
+    see uncommitted state. Each entry carries the row's version column; the
+    ORM's version check rejects writes based on an outdated row.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[type, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model: Type) -> Optional[dict]:
+        """Get the cached column values for a model, or None"""
+        if self.ttl_seconds <= 0:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(model)
+            if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, model: Type, values: dict) -> None:
+        """Store column values, ignoring snapshots older than the cached one"""
+        with self._lock:
+            entry = self._entries.get(model)
+            if entry and entry[1]["id"] == values["id"] and entry[1]["version"] > values["version"]:
+                return
+            self._entries[model] = (time.monotonic(), values)
+
+    def invalidate(self, model: Optional[Type] = None) -> None:
+        """Drop one model's entry, or all entries"""
+        with self._lock:
+            if model is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(model, None)
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters"""
+        self.invalidate()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counters and cached versions"""
+        with self._lock:
+            versions = {
+                model.__name__: entry[1]["version"] for model, entry in self._entries.items()
+            }
+        return {"hits": self.hits, "misses": self.misses, "versions": versions}
+
+
+singleton_cache = SingletonCache(ttl_seconds=cache_config.SINGLETON_TTL_SECONDS)
+
+
+def _snapshot(obj) -> dict:
+    """Copy an instance's column values"""
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def load_singleton(db: Session, model: Type):
+    """
+    Get the session-attached singleton row for writing
+
+    Uses the cached primary key so repeated lookups in one session are served
+    from the identity map rather than re-querying. Returns None if the row
+    does not exist yet.
+    """
+    values = singleton_cache.get(model)
+    if values:
+        obj = db.get(model, values["id"])
+        if obj is not None:
+            return obj
+
+    obj = db.query(model).first()
+    if obj is not None and model not in db.info.get(_PENDING_KEY, {}):
+        singleton_cache.put(model, _snapshot(obj))
+    return obj
+
+
+def read_singleton(db: Session, model: Type):
+    """
+    Get the singleton row for reading
+
+    Returns the session's own instance if it has one (so uncommitted changes
+    are visible to the writer), otherwise a detached copy built from the
+    cache without a database round trip. Falls back to load_singleton on a
+    miss. The detached copy must not be modified or added to a session.
+    """
+    values = singleton_cache.get(model)
+    if values is None:
+        return load_singleton(db, model)
+
+    attached = db.identity_map.get(identity_key(model, values["id"]))
+    if attached is not None:
+        return attached
+    return model(**values)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_singletons(session: Session, flush_context) -> None:
+    """Remember singleton state written by this flush until the commit lands"""
+    for obj in session.new | session.dirty:
+        if isinstance(obj, CACHED_MODELS):
+            session.info.setdefault(_PENDING_KEY, {})[type(obj)] = _snapshot(obj)
+    for obj in session.deleted:
+        if isinstance(obj, CACHED_MODELS):
+            session.info.setdefault(_PENDING_KEY, {})[type(obj)] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_singletons(session: Session) -> None:
+    """Write committed singleton state through to the cache"""
+    if session.in_nested_transaction():
+        # A savepoint was released; the outer transaction may still roll back
+        return
+    for model, values in session.info.pop(_PENDING_KEY, {}).items():
+        if values is None:
+            singleton_cache.invalidate(model)
+        else:
+            singleton_cache.put(model, values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_singletons(session: Session) -> None:
+    """Drop uncommitted singleton state"""
+    pending = session.info.pop(_PENDING_KEY, {})
+    for model in pending:
+        # A failed write may mean another process moved the row on
+        singleton_cache.invalidate(model)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_savepoint_singletons(session: Session, previous_transaction) -> None:
+    """Drop pending state when a savepoint rolls back; it may hold the undone values"""
+    if previous_transaction.nested:
+        _discard_pending_singletons(session)
@@ -0,0 +1,243 @@
+"""
+Snapshot Store
+Columnar NumPy reader for market snapshots, with an optional memory-mapped disk cache
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import Float, func, select, type_coerce
+from sqlalchemy.orm import Session
+
+from ..config import charts as chart_config
+from ..models.market import CirculationStatus, MarketSnapshot
+from .time_utils import epoch_seconds
+
+# On-disk record layout, one row per snapshot
+SNAPSHOT_DTYPE = np.dtype(
+    [
+        ("id", "i8"),
+        ("timestamp", "i8"),  # seconds since the Unix epoch (UTC)
+        ("open", "f8"),
+        ("high", "f8"),
+        ("low", "f8"),
+        ("close", "f8"),
+        ("index_value", "f8"),
+        ("delayed_average", "f8"),
+        ("volume", "f8"),
+        ("frozen", "?"),
+        ("updated", "f8"),  # epoch seconds of the last in-place rewrite, 0 if never
+    ]
+)
+
+# Serializes cache file rewrites within the process
+_cache_lock = threading.Lock()
+
+
+@dataclass
+class SnapshotSeries:
+    """Contiguous arrays of snapshot data ordered by time"""
+
+    records: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Epoch seconds as int64"""
+        return self.records["timestamp"]
+
+    @property
+    def times(self) -> np.ndarray:
+        """Timestamps as datetime64, accepted directly by matplotlib"""
+        return self.records["timestamp"].astype("datetime64[s]")
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.records["open"]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.records["high"]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.records["low"]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.records["close"]
+
+    @property
+    def index_value(self) -> np.ndarray:
+        return self.records["index_value"]
+
+    @property
+    def delayed_average(self) -> np.ndarray:
+        return self.records["delayed_average"]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.records["volume"]
+
+    @property
+    def frozen(self) -> np.ndarray:
+        return self.records["frozen"]
+
+    def since(self, cutoff: datetime) -> "SnapshotSeries":
+        """Get the tail of the series at or after cutoff (a view, no copy)"""
+        start = np.searchsorted(self.timestamps, int(epoch_seconds(cutoff)), side="left")
+        return SnapshotSeries(self.records[start:])
+
+
+def _revision(updated_at: Optional[datetime]) -> float:
+    """In-place rewrite time as epoch seconds, 0 for rows never rewritten"""
+    return epoch_seconds(updated_at) if updated_at is not None else 0.0
+
+
+class SnapshotStore:
+    """
+    Reads MarketSnapshot rows as NumPy columns
+
+    Only the columns charts need are selected, so no ORM objects are built.
+    When a cache directory is configured, each interval type is kept in an
+    .npy file that is memory-mapped on read and extended with rows newer than
+    the cached ones; any deletion or in-place update (e.g. compaction)
+    triggers a full reload.
+    """
+
+    def __init__(self, db: Session, cache_dir: Optional[str] = None):
+        self.db = db
+        self.cache_dir = cache_dir if cache_dir is not None else chart_config.SNAPSHOT_CACHE_DIR
+
+    def load(self, days: int, interval_type: Optional[str] = None) -> SnapshotSeries:
+        """
+        Get snapshots from the last `days` days
+
+        Args:
+            days: Lookback window
+            interval_type: 'minute', 'hour', 'day', or None for all intervals
+        """
+        cutoff = datetime.utcnow() - timedelta(days=days)
+
+        if not self.cache_dir:
+            return SnapshotSeries(self._query(interval_type, since=cutoff))
+
+        return self._load_cached(interval_type).since(cutoff)
+
+    # ==================== QUERIES ====================
+
+    def _filtered(self, statement, interval_type: Optional[str]):
+        if interval_type is not None:
+            statement = statement.where(MarketSnapshot.interval_type == interval_type)
+        return statement
+
+    def _query(
+        self,
+        interval_type: Optional[str],
+        since: Optional[datetime] = None,
+        after_id: Optional[int] = None,
+    ) -> np.ndarray:
+        """Select snapshot columns into a structured array ordered by time"""
+        statement = select(
+            MarketSnapshot.id,
+            MarketSnapshot.snapshot_time,
+            type_coerce(MarketSnapshot.open_price, Float),
+            type_coerce(MarketSnapshot.high_price, Float),
+            type_coerce(MarketSnapshot.low_price, Float),
+            type_coerce(MarketSnapshot.close_price, Float),
+            type_coerce(MarketSnapshot.index_value, Float),
+            type_coerce(MarketSnapshot.delayed_average, Float),
+            type_coerce(MarketSnapshot.volume, Float),
+            MarketSnapshot.circulation_status == CirculationStatus.FROZEN,
+            MarketSnapshot.updated_at,
+        ).order_by(MarketSnapshot.snapshot_time, MarketSnapshot.id)
+        statement = self._filtered(statement, interval_type)
+
+        if since is not None:
+            statement = statement.where(MarketSnapshot.snapshot_time >= since)
+        if after_id is not None:
+            statement = statement.where(MarketSnapshot.id > after_id)
+
+        rows = self.db.execute(statement).all()
+
+        records = np.empty(len(rows), dtype=SNAPSHOT_DTYPE)
+        if rows:
+            columns = list(zip(*rows))
+            records["id"] = columns[0]
+            records["timestamp"] = (
+                np.array(columns[1], dtype="datetime64[us]").astype("datetime64[s]").astype("i8")
+            )
+            for field, values in zip(SNAPSHOT_DTYPE.names[2:-1], columns[2:-1]):
+                records[field] = values
+            records["updated"] = [_revision(updated_at) for updated_at in columns[-1]]
+        return records
+
+    def fingerprint(self, interval_type: Optional[str] = None):
+        """
+        (row count, max id, last rewrite); changes whenever snapshots are
+        added, removed, or updated in place
+        """
+        statement = self._filtered(
+            select(
+                func.count(MarketSnapshot.id),
+                func.max(MarketSnapshot.id),
+                func.max(MarketSnapshot.updated_at),
+            ),
+            interval_type,
+        )
+        count, max_id, updated_at = self.db.execute(statement).one()
+        return count, max_id or 0, _revision(updated_at)
+
+    # ==================== DISK CACHE ====================
+
+    def _cache_path(self, interval_type: Optional[str]) -> str:
+        return os.path.join(self.cache_dir, f"snapshots_{interval_type or 'all'}.npy")
+
+    def _load_cached(self, interval_type: Optional[str]) -> SnapshotSeries:
+        """Get the full series for an interval, refreshing the cache file if stale"""
+        path = self._cache_path(interval_type)
+        count, max_id, revision = self.fingerprint(interval_type)
+
+        with _cache_lock:
+            cached = np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+            if cached is not None and cached.dtype == SNAPSHOT_DTYPE:
+                cached_max = int(cached["id"].max()) if len(cached) else 0
+                cached_revision = float(cached["updated"].max()) if len(cached) else 0.0
+                # Rows rewritten since the file was built: only a full reload is correct
+                if cached_revision != revision:
+                    return SnapshotSeries(self._write(path, self._query(interval_type)))
+                if len(cached) == count and cached_max == max_id:
+                    return SnapshotSeries(cached)
+
+                newer = self._query(interval_type, after_id=cached_max)
+                if len(cached) + len(newer) == count:
+                    records = np.concatenate([np.asarray(cached), newer])
+                    records = records[np.argsort(records["timestamp"], kind="stable")]
+                    return SnapshotSeries(self._write(path, records))
+
+            return SnapshotSeries(self._write(path, self._query(interval_type)))
+
+    def _write(self, path: str, records: np.ndarray) -> np.ndarray:
+        """Atomically replace a cache file and return it memory-mapped"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, records)
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode="r")
+
+    def clear_cache(self) -> None:
+        """Delete all cache files"""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        with _cache_lock:
+            for name in os.listdir(self.cache_dir):
+                if name.startswith("snapshots_") and name.endswith(".npy"):
+                    os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,132 @@
+"""
+Tick Aggregator
+Running open/high/low/close/volume bars between market snapshots
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .price_ticks import price_ticks
+
+# Session.info key holding ticks recorded but not yet committed
+_PENDING_KEY = "arca_pending_ticks"
+
+INTERVALS = ("minute", "hour", "day")
+
+
+class _Bar:
+    """OHLCV for one open interval"""
+
+    __slots__ = ("open", "high", "low", "close", "volume", "ticks", "opened_at")
+
+    def __init__(self, price: float, opened_at: datetime):
+        self.open = self.high = self.low = self.close = price
+        self.volume = 0.0
+        self.ticks = 0
+        self.opened_at = opened_at
+
+    def add(self, price: float, volume: float) -> None:
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+        self.ticks += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+            "ticks": self.ticks,
+            "opened_at": self.opened_at,
+        }
+
+
+class TickAggregator:
+    """
+    One open bar per snapshot interval, updated in O(1) per tick
+
+    Each interval's bar runs from its last flush (the last snapshot of that
+    interval) to the next, so a snapshot sees every price in between. A
+    flushed bar is replaced by a flat one opening at its close.
+
+    Ticks only cover this process; snapshot OHLC still includes the open
+    and current price, so bars are never narrower than before.
+    """
+
+    def __init__(self):
+        self._bars: Dict[str, Optional[_Bar]] = dict.fromkeys(INTERVALS)
+        self._lock = threading.Lock()
+
+    def record(self, price: float, volume: float = 0.0, at: Optional[datetime] = None) -> None:
+        """Add a price (and the volume traded at it) to every open bar"""
+        price = float(price)
+        volume = float(volume)
+        with self._lock:
+            for interval_type, bar in self._bars.items():
+                if bar is None:
+                    bar = self._bars[interval_type] = _Bar(price, at or datetime.utcnow())
+                bar.add(price, volume)
+
+    def peek(self, interval_type: str) -> Optional[dict]:
+        """Get an interval's open bar without closing it"""
+        with self._lock:
+            bar = self._bars[interval_type]
+            return bar.to_dict() if bar else None
+
+    def flush(self, interval_type: str, at: Optional[datetime] = None) -> Optional[dict]:
+        """Close an interval's bar, returning it (None if no tick was ever seen)"""
+        with self._lock:
+            bar = self._bars[interval_type]
+            if bar is None:
+                return None
+            self._bars[interval_type] = _Bar(bar.close, at or datetime.utcnow())
+            return bar.to_dict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bars = dict.fromkeys(INTERVALS)
+
+
+tick_aggregator = TickAggregator()
+
+
+def record_tick(db: Session, price, volume=0, at: Optional[datetime] = None) -> None:
+    """
+    Queue a price tick to reach the aggregator when the session commits
+
+    Ticks from a rolled-back savepoint or transaction are dropped.
+    """
+    db.info.setdefault(_PENDING_KEY, []).append(
+        (db.get_nested_transaction(), float(price), float(volume), at or datetime.utcnow())
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_ticks(session: Session) -> None:
+    """Feed committed ticks to the aggregator and the tick history in order"""
+    if session.in_nested_transaction():
+        # A savepoint was released; the outer transaction may still roll back
+        return
+    for _, price, volume, at in session.info.pop(_PENDING_KEY, []):
+        tick_aggregator.record(price, volume, at)
+        price_ticks.append(price, at)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_ticks(session: Session, previous_transaction) -> None:
+    """Drop ticks recorded inside the transaction or savepoint that rolled back"""
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_KEY, None)
+        return
+    pending = session.info.get(_PENDING_KEY)
+    if pending:
+        pending[:] = [tick for tick in pending if tick[0] is not previous_transaction]
@@ -0,0 +1,12 @@
+"""
+Time Utilities
+Conversions between naive UTC datetimes and Unix epoch seconds
+"""
+
+import calendar
+from datetime import datetime
+
+
+def epoch_seconds(at: datetime) -> float:
+    """Seconds since the Unix epoch for a naive UTC datetime, including microseconds"""
+    return calendar.timegm(at.utctimetuple()) + at.microsecond / 1e6
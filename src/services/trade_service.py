@@ -9,12 +9,22 @@ from decimal import ROUND_DOWN, Decimal
 from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import and_, desc, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..config import economy
 from ..models.market import MarketIndex
-from ..models.trade import ItemCategory, MarketPrice, TradeReport, TraderStats, TradeType
+from ..models.trade import (
+    ItemCategory,
+    MarketPrice,
+    TradeReport,
+    TraderStats,
+    TradeType,
+    normalize_item_key,
+)
 from ..models.user import User, UserRole
+from .item_index import index_item_names, item_ids, item_search
+from .singleton_cache import read_singleton
 
 
 @dataclass
@@ -84,24 +94,13 @@ class TradeService:
         Returns:
             TradeReport object
         """
-        if not reporter.can_trade():
-            raise PermissionError("User cannot report trades (Consumer role)")
-
-        if carat_amount <= 0 and golden_carat_amount <= 0:
-            raise ValueError("Trade must involve currency")
-
-        if item_quantity <= 0:
-            raise ValueError("Item quantity must be positive")
+        self.validate_trade(reporter, item_quantity, carat_amount, golden_carat_amount)
 
         # Get current market price for snapshot
-        market_index = self.db.query(MarketIndex).first()
-        market_price = Decimal(market_index.carat_price_diamonds) if market_index else Decimal("1")
+        market_price = self._market_price_snapshot()
 
         # Calculate price per item
-        total_carats = carat_amount + (golden_carat_amount * 9)
-        price_per_item = (total_carats / item_quantity).quantize(
-            Decimal("0.0001"), rounding=ROUND_DOWN
-        )
+        price_per_item = self._price_per_item(item_quantity, carat_amount, golden_carat_amount)
 
         # Create trade report
         trade = TradeReport(
@@ -131,9 +130,78 @@ class TradeService:
 
         # Update market prices
         self._update_market_price(item_category, item_name, price_per_item)
+        index_item_names(self.db, item_name)
 
         return trade
 
+    def report_trades_bulk(self, trades: List[dict]) -> List[TradeReport]:
+        """
+        Report many trades in one pass
+
+        Each entry holds report_trade's keyword arguments (reporter, trade_type,
+        item_name, ...). Entries are validated up front, so either all are
+        recorded or none. Trader stat deltas and per-item price EMAs are folded
+        in memory, then written with one SELECT and one batched flush per table
+        instead of a lookup and flush per trade.
+
+        Returns:
+            TradeReport objects in input order
+        """
+        for i, entry in enumerate(trades):
+            try:
+                self.validate_trade(
+                    entry["reporter"],
+                    entry["item_quantity"],
+                    entry["carat_amount"],
+                    entry.get("golden_carat_amount", Decimal("0")),
+                )
+            except (PermissionError, ValueError) as e:
+                raise type(e)(f"Trade {i}: {e}") from e
+
+        if not trades:
+            return []
+
+        market_price = self._market_price_snapshot()
+        now = datetime.utcnow()
+
+        reports = []
+        for entry in trades:
+            golden_carat_amount = entry.get("golden_carat_amount", Decimal("0"))
+            location = entry.get("location")
+            reports.append(
+                TradeReport(
+                    reporter_id=entry["reporter"].id,
+                    counterparty_id=entry.get("counterparty_id"),
+                    counterparty_name=entry.get("counterparty_name"),
+                    trade_type=entry["trade_type"],
+                    item_category=entry.get("item_category", ItemCategory.OTHER),
+                    item_name=entry["item_name"],
+                    item_quantity=entry["item_quantity"],
+                    carat_amount=entry["carat_amount"],
+                    golden_carat_amount=golden_carat_amount,
+                    price_per_item=self._price_per_item(
+                        entry["item_quantity"], entry["carat_amount"], golden_carat_amount
+                    ),
+                    world_name=entry.get("world_name"),
+                    location_x=location[0] if location else None,
+                    location_y=location[1] if location else None,
+                    location_z=location[2] if location else None,
+                    market_price_at_trade=market_price,
+                    trade_timestamp=entry.get("trade_timestamp") or now,
+                    notes=entry.get("notes"),
+                    reported_at=now,
+                )
+            )
+
+        self.db.add_all(reports)
+        self._apply_trader_stats_bulk(reports)
+        self._apply_market_prices_bulk(reports, now)
+        self.db.flush()
+
+        index_item_names(self.db, *(report.item_name for report in reports))
+
+        return reports
+
     def verify_trade(self, trade_id: int, banker: User) -> Optional[TradeReport]:
         """Verify a trade (banker only)"""
         if not banker.is_banker:
@@ -312,8 +380,49 @@ class TradeService:
     # ==================== MARKET PRICES ====================
 
     def get_item_price(self, item_name: str) -> Optional[MarketPrice]:
-        """Get current market price for an item"""
-        return self.db.query(MarketPrice).filter(MarketPrice.item_name.ilike(item_name)).first()
+        """Get current market price for an item (case-insensitive exact match)"""
+        key = normalize_item_key(item_name)
+
+        cached_id = item_ids.get(key)
+        if cached_id is not None:
+            market_price = self.db.get(MarketPrice, cached_id)
+            if market_price is not None and market_price.item_key == key:
+                return market_price
+            item_ids.invalidate(key)
+
+        market_price = self.db.query(MarketPrice).filter(MarketPrice.item_key == key).first()
+        if market_price is not None:
+            item_ids.put(key, market_price.id)
+        return market_price
+
+    def search_items(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Fuzzy-search known item names (typos, partial names, word order)
+
+        Returns:
+            Dicts with item_name, score, and current_price (None if the item
+            has only been seen in trade reports)
+        """
+        item_search.ensure_fresh(self.db)
+        matches = item_search.search(query, limit)
+        if not matches:
+            return []
+
+        keys = [normalize_item_key(name) for name, _ in matches]
+        prices = dict(
+            self.db.query(MarketPrice.item_key, MarketPrice.current_price).filter(
+                MarketPrice.item_key.in_(keys)
+            )
+        )
+
+        return [
+            {
+                "item_name": name,
+                "score": score,
+                "current_price": float(prices[key]) if key in prices else None,
+            }
+            for (name, score), key in zip(matches, keys)
+        ]
 
     def get_category_prices(self, category: ItemCategory) -> List[MarketPrice]:
         """Get all prices for a category"""
@@ -338,6 +447,38 @@ class TradeService:
 
     # ==================== INTERNAL HELPERS ====================
 
+    @staticmethod
+    def validate_trade(
+        reporter: User,
+        item_quantity: int,
+        carat_amount: Decimal,
+        golden_carat_amount: Decimal = Decimal("0"),
+    ) -> None:
+        """Raise PermissionError/ValueError if a trade cannot be reported"""
+        if not reporter.can_trade():
+            raise PermissionError("User cannot report trades (Consumer role)")
+
+        if not (Decimal(carat_amount).is_finite() and Decimal(golden_carat_amount).is_finite()):
+            raise ValueError("Trade amounts must be finite")
+
+        if carat_amount <= 0 and golden_carat_amount <= 0:
+            raise ValueError("Trade must involve currency")
+
+        if item_quantity <= 0:
+            raise ValueError("Item quantity must be positive")
+
+    @staticmethod
+    def _price_per_item(
+        item_quantity: int, carat_amount: Decimal, golden_carat_amount: Decimal
+    ) -> Decimal:
+        total_carats = carat_amount + (golden_carat_amount * 9)
+        return (total_carats / item_quantity).quantize(Decimal("0.0001"), rounding=ROUND_DOWN)
+
+    def _market_price_snapshot(self) -> Decimal:
+        """Current carat price recorded on each trade"""
+        market_index = read_singleton(self.db, MarketIndex)
+        return Decimal(market_index.carat_price_diamonds) if market_index else Decimal("1")
+
     def _update_trader_stats(self, user: User, trade: TradeReport) -> None:
         """Update trader statistics after a new trade"""
         stats = self.db.query(TraderStats).filter(TraderStats.user_id == user.id).first()
@@ -372,29 +513,109 @@ class TradeService:
         if not stats.first_trade_at:
             stats.first_trade_at = trade.reported_at
 
+    def _apply_trader_stats_bulk(self, trades: List[TradeReport]) -> None:
+        """Fold a batch of trades into TraderStats with one lookup"""
+        user_ids = {trade.reporter_id for trade in trades}
+        stats_by_user = {
+            stats.user_id: stats
+            for stats in self.db.query(TraderStats).filter(TraderStats.user_id.in_(user_ids))
+        }
+
+        for trade in trades:
+            stats = stats_by_user.get(trade.reporter_id)
+            if stats is None:
+                stats = TraderStats(
+                    user_id=trade.reporter_id,
+                    total_trades=0,
+                    buy_count=0,
+                    sell_count=0,
+                    total_volume_carats=Decimal("0"),
+                    first_trade_at=trade.reported_at,
+                )
+                self.db.add(stats)
+                stats_by_user[trade.reporter_id] = stats
+
+            stats.total_trades += 1
+            if trade.trade_type == TradeType.BUY:
+                stats.buy_count += 1
+            elif trade.trade_type == TradeType.SELL:
+                stats.sell_count += 1
+            stats.total_volume_carats = (
+                Decimal(stats.total_volume_carats) + trade.total_value_carats
+            )
+            stats.last_trade_at = trade.reported_at
+            if not stats.first_trade_at:
+                stats.first_trade_at = trade.reported_at
+
+        for stats in stats_by_user.values():
+            if stats.total_trades:
+                stats.average_trade_size = (
+                    Decimal(stats.total_volume_carats) / Decimal(stats.total_trades)
+                ).quantize(Decimal("0.01"))
+
+    def _apply_market_prices_bulk(self, trades: List[TradeReport], now: datetime) -> None:
+        """Fold a batch of trades into per-item price EMAs with one lookup"""
+        keys = {normalize_item_key(trade.item_name) for trade in trades}
+        prices: Dict[str, MarketPrice] = {
+            market_price.item_key: market_price
+            for market_price in self.db.query(MarketPrice).filter(MarketPrice.item_key.in_(keys))
+        }
+
+        for trade in trades:
+            key = normalize_item_key(trade.item_name)
+            market_price = prices.get(key)
+
+            if market_price is None:
+                prices[key] = self._insert_market_price(
+                    trade.item_category, trade.item_name, trade.price_per_item, now
+                )
+            else:
+                self._fold_market_price(market_price, trade.price_per_item, now)
+
     def _update_market_price(self, category: ItemCategory, item_name: str, price: Decimal) -> None:
         """Update market price for an item"""
-        market_price = (
-            self.db.query(MarketPrice).filter(MarketPrice.item_name.ilike(item_name)).first()
-        )
+        market_price = self.get_item_price(item_name)
 
         if not market_price:
-            market_price = MarketPrice(
-                item_category=category,
-                item_name=item_name,
-                current_price=price,
-                trade_count_24h=1,
-                volume_24h=price,
-                last_trade_at=datetime.utcnow(),
-            )
-            self.db.add(market_price)
+            self._insert_market_price(category, item_name, price, datetime.utcnow())
         else:
-            # Update with exponential moving average
-            alpha = Decimal("0.3")  # Weight for new price
-            old_price = Decimal(market_price.current_price)
-            market_price.current_price = (alpha * price + (1 - alpha) * old_price).quantize(
-                Decimal("0.0001"), rounding=ROUND_DOWN
-            )
-            market_price.trade_count_24h += 1
-            market_price.volume_24h = Decimal(market_price.volume_24h) + price
-            market_price.last_trade_at = datetime.utcnow()
+            self._fold_market_price(market_price, price, datetime.utcnow())
+
+    def _insert_market_price(
+        self, category: ItemCategory, item_name: str, price: Decimal, at: datetime
+    ) -> MarketPrice:
+        """
+        Create the price row for an item's first trade
+
+        item_key is unique, so if another writer created the row since the
+        lookup, the savepoint rolls back and the trade is folded into theirs.
+        """
+        key = normalize_item_key(item_name)
+        market_price = MarketPrice(
+            item_category=category,
+            item_name=item_name,
+            item_key=key,
+            current_price=price,
+            trade_count_24h=1,
+            volume_24h=price,
+            last_trade_at=at,
+        )
+        try:
+            with self.db.begin_nested():
+                self.db.add(market_price)
+        except IntegrityError:
+            market_price = self.db.query(MarketPrice).filter(MarketPrice.item_key == key).one()
+            self._fold_market_price(market_price, price, at)
+        return market_price
+
+    @staticmethod
+    def _fold_market_price(market_price: MarketPrice, price: Decimal, at: datetime) -> None:
+        """Fold one trade into an item's price with an exponential moving average"""
+        alpha = Decimal("0.3")  # Weight for new price
+        old_price = Decimal(market_price.current_price)
+        market_price.current_price = (alpha * price + (1 - alpha) * old_price).quantize(
+            Decimal("0.0001"), rounding=ROUND_DOWN
+        )
+        market_price.trade_count_24h += 1
+        market_price.volume_24h = Decimal(market_price.volume_24h) + price
+        market_price.last_trade_at = at
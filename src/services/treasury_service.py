@@ -3,18 +3,40 @@ Treasury Service
 Manages the central treasury, transactions, and book value calculations
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from decimal import ROUND_DOWN, Decimal
 from typing import List, Optional, Tuple
 
-from sqlalchemy import desc, func
+from sqlalchemy import case, desc, func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..config import economy
 from ..models.currency import CurrencyType
-from ..models.treasury import TransactionType, Treasury, TreasurySnapshot, TreasuryTransaction
+from ..models.treasury import (
+    TransactionType,
+    Treasury,
+    TreasuryDailyRollup,
+    TreasuryRollupShard,
+    TreasurySnapshot,
+    TreasuryTransaction,
+)
 from ..models.user import User
 from .currency_service import CurrencyService
+from .fee_shards import fee_shards
+from .singleton_cache import load_singleton, read_singleton
+from .tick_aggregator import record_tick
+from .volume_service import VolumeService
+
+# Running totals kept per (day, transaction type) by the rollups and their shards
+ROLLUP_MEASURES = (
+    "inflow_diamonds",
+    "outflow_diamonds",
+    "inflow_carats",
+    "outflow_carats",
+    "fee_total",
+    "transaction_count",
+)
 
 
 class TreasuryService:
@@ -25,12 +47,13 @@ class TreasuryService:
     def __init__(self, db: Session):
         self.db = db
         self.currency_service = CurrencyService(db)
+        self.volume_service = VolumeService(db)
 
     # ==================== TREASURY STATE ====================
 
     def get_treasury(self) -> Treasury:
         """Get or create the treasury singleton"""
-        treasury = self.db.query(Treasury).first()
+        treasury = load_singleton(self.db, Treasury)
         if not treasury:
             treasury = Treasury(
                 total_diamonds=Decimal("0"),
@@ -46,7 +69,7 @@ class TreasuryService:
 
     def get_treasury_status(self) -> dict:
         """Get comprehensive treasury status"""
-        treasury = self.get_treasury()
+        treasury = read_singleton(self.db, Treasury) or self.get_treasury()
 
         return {
             "total_diamonds": Decimal(treasury.total_diamonds),
@@ -57,10 +80,14 @@ class TreasuryService:
             "book_value": treasury.book_value,
             "reserve_ratio": treasury.reserve_ratio,
             "total_books": treasury.total_books_in_circulation,
-            "accumulated_fees": Decimal(treasury.accumulated_fees_carats),
+            "accumulated_fees": self.get_accumulated_fees(treasury),
             "last_updated": treasury.last_updated,
         }
 
+    def get_accumulated_fees(self, treasury: Treasury) -> Decimal:
+        """Fees folded into the treasury plus those still held by the fee shards"""
+        return Decimal(treasury.accumulated_fees_carats) + fee_shards.pending(self.db)
+
     def recalculate_book_value(self) -> Decimal:
         """Recalculate and return current book value"""
         treasury = self.get_treasury()
@@ -205,9 +232,14 @@ class TreasuryService:
         user: Optional[User] = None,
         notes: Optional[str] = None,
     ) -> TreasuryTransaction:
-        """Record fee collection"""
-        treasury = self.get_treasury()
-        treasury.accumulated_fees_carats = Decimal(treasury.accumulated_fees_carats) + fee_amount
+        """
+        Record fee collection
+
+        The fee, like the transaction's rollup and volume counts, goes to this
+        session's shard rather than a shared row, so concurrent fee-bearing
+        operations do not serialize on one row; see fold_fees.
+        """
+        fee_shards.accrue(self.db, fee_amount)
 
         return self._record_transaction(
             transaction_type=fee_type,
@@ -218,6 +250,21 @@ class TreasuryService:
             is_automated=True,
         )
 
+    def fold_fees(self) -> Decimal:
+        """
+        Move fees held by the fee shards into the treasury, and pending rollup
+        shards into the daily rollups
+
+        Returns:
+            Carats folded
+        """
+        folded = fee_shards.drain(self.db)
+        if folded:
+            treasury = self.get_treasury()
+            treasury.accumulated_fees_carats = Decimal(treasury.accumulated_fees_carats) + folded
+        self.fold_daily_rollups()
+        return folded
+
     # ==================== TRANSACTION HISTORY ====================
 
     def get_transaction_history(
@@ -246,37 +293,31 @@ class TreasuryService:
         )
 
     def get_inflow_outflow(self, days: int = 30) -> dict:
-        """Get treasury inflow/outflow summary"""
+        """
+        Get treasury inflow/outflow summary
+
+        Whole days are read from the daily rollups and their unfolded shards;
+        only the partial first day of the window is aggregated from the ledger.
+        """
         start_date = datetime.utcnow() - timedelta(days=days)
+        first_full_day = start_date.date() + timedelta(days=1)
 
-        transactions = (
-            self.db.query(TreasuryTransaction)
-            .filter(TreasuryTransaction.created_at >= start_date)
-            .all()
+        partial = self._ledger_sums().filter(
+            TreasuryTransaction.created_at >= start_date,
+            TreasuryTransaction.created_at < datetime.combine(first_full_day, time.min),
+        )
+        rolled, pending = (
+            self.db.query(*(func.sum(getattr(model, name)) for name in ROLLUP_MEASURES)).filter(
+                model.day >= first_full_day
+            )
+            for model in (TreasuryDailyRollup, TreasuryRollupShard)
         )
 
-        inflow_diamonds = Decimal("0")
-        outflow_diamonds = Decimal("0")
-        inflow_carats = Decimal("0")
-        outflow_carats = Decimal("0")
-        total_fees = Decimal("0")
-
-        for tx in transactions:
-            diamond_amt = Decimal(tx.diamond_amount)
-            carat_amt = Decimal(tx.carat_amount)
-            fee_amt = Decimal(tx.fee_amount)
-
-            if diamond_amt > 0:
-                inflow_diamonds += diamond_amt
-            else:
-                outflow_diamonds += abs(diamond_amt)
-
-            if carat_amt > 0:
-                inflow_carats += carat_amt
-            else:
-                outflow_carats += abs(carat_amt)
-
-            total_fees += fee_amt
+        totals = [
+            sum(self._to_decimal(value) for value in values)
+            for values in zip(partial.one(), rolled.one(), pending.one())
+        ]
+        inflow_diamonds, outflow_diamonds, inflow_carats, outflow_carats, total_fees, count = totals
 
         return {
             "period_days": days,
@@ -287,9 +328,160 @@ class TreasuryService:
             "outflow_carats": outflow_carats,
             "net_carats": inflow_carats - outflow_carats,
             "total_fees_collected": total_fees,
-            "transaction_count": len(transactions),
+            "transaction_count": int(count),
+        }
+
+    # ==================== DAILY ROLLUPS ====================
+
+    def rebuild_daily_rollups(self) -> int:
+        """
+        Recompute every daily rollup from the full ledger
+
+        Returns:
+            Number of (day, transaction type) rollup rows written
+        """
+        day = func.date(TreasuryTransaction.created_at)
+        rows = (
+            self._ledger_sums()
+            .add_columns(day, TreasuryTransaction.transaction_type)
+            .group_by(day, TreasuryTransaction.transaction_type)
+            .all()
+        )
+
+        self.db.query(TreasuryDailyRollup).delete(synchronize_session=False)
+        self.db.query(TreasuryRollupShard).delete(synchronize_session=False)
+        self.db.bulk_insert_mappings(
+            TreasuryDailyRollup,
+            [
+                {
+                    "day": date.fromisoformat(str(row[6])),
+                    "transaction_type": row[7],
+                    "inflow_diamonds": self._to_decimal(row[0]),
+                    "outflow_diamonds": self._to_decimal(row[1]),
+                    "inflow_carats": self._to_decimal(row[2]),
+                    "outflow_carats": self._to_decimal(row[3]),
+                    "fee_total": self._to_decimal(row[4]),
+                    "transaction_count": row[5],
+                }
+                for row in rows
+            ],
+        )
+        self.db.flush()
+
+        return len(rows)
+
+    def _update_daily_rollup(
+        self,
+        transaction_type: TransactionType,
+        diamond_amount: Decimal,
+        carat_amount: Decimal,
+        fee_amount: Decimal,
+        at: datetime,
+    ) -> None:
+        """
+        Add one transaction to this session's rollup shard for its day
+
+        Ledgers that predate the rollups are backfilled by init_db(), never here.
+        """
+        diamond_amount = Decimal(diamond_amount)
+        carat_amount = Decimal(carat_amount)
+        deltas = {
+            "inflow_diamonds": max(diamond_amount, Decimal("0")),
+            "outflow_diamonds": abs(min(diamond_amount, Decimal("0"))),
+            "inflow_carats": max(carat_amount, Decimal("0")),
+            "outflow_carats": abs(min(carat_amount, Decimal("0"))),
+            "fee_total": Decimal(fee_amount),
+            "transaction_count": 1,
+        }
+        key = {
+            "shard": fee_shards.session_shard(self.db),
+            "day": at.date(),
+            "transaction_type": transaction_type,
         }
 
+        if self._add_to_rollup(TreasuryRollupShard, key, deltas):
+            return
+        try:
+            with self.db.begin_nested():
+                self.db.add(TreasuryRollupShard(**key, **deltas))
+        except IntegrityError:
+            # Another writer on the same shard created the row first
+            self._add_to_rollup(TreasuryRollupShard, key, deltas)
+
+    def fold_daily_rollups(self) -> int:
+        """
+        Move pending rollup shard totals into the daily rollups
+
+        Like the fee shards, each shard row is reduced by the amounts read, so
+        transactions recorded meanwhile stay pending. Emptied rows of past days
+        are deleted.
+
+        Returns:
+            Number of shard rows folded
+        """
+        columns = [getattr(TreasuryRollupShard, name) for name in ROLLUP_MEASURES]
+        rows = (
+            self.db.query(
+                TreasuryRollupShard.shard,
+                TreasuryRollupShard.day,
+                TreasuryRollupShard.transaction_type,
+                *columns,
+            )
+            .filter(TreasuryRollupShard.transaction_count != 0)
+            .all()
+        )
+
+        for shard, day, transaction_type, *values in rows:
+            deltas = dict(zip(ROLLUP_MEASURES, values))
+            key = {"day": day, "transaction_type": transaction_type}
+            if not self._add_to_rollup(TreasuryDailyRollup, key, deltas):
+                self.db.add(TreasuryDailyRollup(**key, **deltas))
+                self.db.flush()
+            self._add_to_rollup(
+                TreasuryRollupShard,
+                {**key, "shard": shard},
+                {name: -value for name, value in deltas.items()},
+            )
+
+        self.db.query(TreasuryRollupShard).filter(
+            TreasuryRollupShard.day < datetime.utcnow().date(),
+            TreasuryRollupShard.transaction_count == 0,
+        ).delete(synchronize_session=False)
+
+        return len(rows)
+
+    def _add_to_rollup(self, model, key: dict, deltas: dict) -> bool:
+        """Add deltas to the rollup row with this key; False if the row does not exist"""
+        columns = {name: getattr(model, name) for name in deltas}
+        result = self.db.execute(
+            update(model)
+            .where(*(getattr(model, name) == value for name, value in key.items()))
+            .values({column: column + deltas[name] for name, column in columns.items()})
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    def _ledger_sums(self):
+        """Query of inflow/outflow/fee sums and count over ledger rows"""
+        diamonds = TreasuryTransaction.diamond_amount
+        carats = TreasuryTransaction.carat_amount
+
+        return self.db.query(
+            func.sum(case((diamonds > 0, diamonds), else_=0)),
+            func.sum(case((diamonds <= 0, -diamonds), else_=0)),
+            func.sum(case((carats > 0, carats), else_=0)),
+            func.sum(case((carats <= 0, -carats), else_=0)),
+            func.sum(TreasuryTransaction.fee_amount),
+            func.count(TreasuryTransaction.id),
+        )
+
+    @staticmethod
+    def _to_decimal(value) -> Decimal:
+        """Normalize a SQL aggregate (None, float or Decimal) to a 4dp Decimal"""
+        if value is None:
+            return Decimal("0")
+        return Decimal(str(value)).quantize(Decimal("0.0001"))
+
     # ==================== SNAPSHOTS ====================
 
     def create_snapshot(self) -> TreasurySnapshot:
@@ -304,7 +496,7 @@ class TreasuryService:
             book_value=treasury.book_value,
             reserve_ratio=treasury.reserve_ratio,
             total_circulation=treasury.total_circulation_in_carats,
-            fees_collected=treasury.accumulated_fees_carats,
+            fees_collected=self.get_accumulated_fees(treasury),
         )
         self.db.add(snapshot)
         return snapshot
@@ -336,8 +528,9 @@ class TreasuryService:
         notes: Optional[str] = None,
         is_automated: bool = False,
     ) -> TreasuryTransaction:
-        """Record a transaction in the ledger"""
+        """Record a transaction in the ledger and update its running aggregates"""
         treasury = self.get_treasury()
+        now = datetime.utcnow()
 
         transaction = TreasuryTransaction(
             transaction_type=transaction_type,
@@ -353,6 +546,11 @@ class TreasuryService:
             book_value_after=treasury.book_value,
             notes=notes,
             is_automated=is_automated,
+            created_at=now,
         )
         self.db.add(transaction)
+        volume = VolumeService.transaction_volume(carat_amount, golden_carat_amount)
+        self.volume_service.record(volume, at=now)
+        record_tick(self.db, transaction.book_value_after, volume, at=now)
+        self._update_daily_rollup(transaction_type, diamond_amount, carat_amount, fee_amount, now)
         return transaction
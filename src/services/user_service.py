@@ -4,7 +4,7 @@ Handles user management, linking, and permissions
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from sqlalchemy.orm import Session
 
@@ -30,6 +30,13 @@ class UserService:
         """Get user by Minecraft UUID"""
         return self.db.query(User).filter(User.minecraft_uuid == mc_uuid).first()
 
+    def get_by_minecraft_uuids(self, mc_uuids: List[str]) -> Dict[str, User]:
+        """Get users for many Minecraft UUIDs in one query, keyed by UUID"""
+        if not mc_uuids:
+            return {}
+        users = self.db.query(User).filter(User.minecraft_uuid.in_(set(mc_uuids))).all()
+        return {user.minecraft_uuid: user for user in users}
+
     def get_by_minecraft_username(self, mc_username: str) -> Optional[User]:
         """Get user by Minecraft username (case-insensitive)"""
         return self.db.query(User).filter(User.minecraft_username.ilike(mc_username)).first()
@@ -0,0 +1,139 @@
+"""
+Volume Service
+Rolling 24h transaction volume kept in per-minute ring-buffer buckets
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+
+from ..config import economy
+from ..models.market import VolumeBucket
+from ..models.treasury import TreasuryTransaction
+from .fee_shards import fee_shards
+from .time_utils import epoch_seconds
+
+
+class VolumeService:
+    """
+    Incremental 24h volume counters
+
+    Every ledger write adds to the bucket for its minute with a single UPDATE.
+    A bucket still holding an older minute is reset in the same statement,
+    so reading the window is a sum over at most 1440 rows per shard regardless
+    of how many transactions happened.
+
+    Each fee shard has its own ring of slots (shard * 1440 + minute % 1440)
+    and a transaction writes to its session's shard, so concurrent writers in
+    the same minute rarely update the same bucket row.
+    """
+
+    WINDOW_MINUTES = 24 * 60
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def transaction_volume(carat_amount: Decimal, golden_carat_amount: Decimal) -> Decimal:
+        """Volume of one transaction in carats"""
+        return abs(Decimal(carat_amount)) + abs(Decimal(golden_carat_amount)) * Decimal(
+            economy.GOLDEN_CARAT_MULTIPLIER
+        )
+
+    @staticmethod
+    def _minute(at: datetime) -> int:
+        return int(epoch_seconds(at)) // 60
+
+    def record(self, volume: Decimal, at: Optional[datetime] = None) -> None:
+        """Add one transaction to this session's bucket for its minute"""
+        minute = self._minute(at or datetime.utcnow())
+        shard = fee_shards.session_shard(self.db)
+        slot = shard * self.WINDOW_MINUTES + minute % self.WINDOW_MINUTES
+
+        same_minute = VolumeBucket.minute == minute
+        result = self.db.execute(
+            update(VolumeBucket)
+            .where(VolumeBucket.slot == slot)
+            .values(
+                volume=case((same_minute, VolumeBucket.volume + volume), else_=volume),
+                transaction_count=case(
+                    (same_minute, VolumeBucket.transaction_count + 1), else_=1
+                ),
+                minute=minute,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        if result.rowcount == 0:
+            # Buckets (or this shard's ring) not created yet: seed them from the ledger
+            self.rebuild()
+            self.record(volume, at)
+
+    def get_window_totals(self, now: Optional[datetime] = None) -> Tuple[Decimal, int]:
+        """Get (volume, transaction count) for the trailing 24h"""
+        current = self._minute(now or datetime.utcnow())
+
+        volume, count = (
+            self.db.query(
+                func.coalesce(func.sum(VolumeBucket.volume), 0),
+                func.coalesce(func.sum(VolumeBucket.transaction_count), 0),
+            )
+            .filter(
+                VolumeBucket.minute > current - self.WINDOW_MINUTES,
+                VolumeBucket.minute <= current,
+            )
+            .one()
+        )
+        return Decimal(str(volume)), int(count)
+
+    def is_initialized(self) -> bool:
+        """Whether the bucket rows exist"""
+        return self.db.query(VolumeBucket.slot).first() is not None
+
+    def rebuild(self, now: Optional[datetime] = None) -> int:
+        """
+        Recreate all buckets from the last 24h of the ledger
+
+        Ledger volume goes to the first shard's ring; the other rings start empty.
+
+        Returns:
+            Number of ledger transactions folded into the buckets
+        """
+        now = now or datetime.utcnow()
+        current = self._minute(now)
+        cutoff = now - timedelta(minutes=self.WINDOW_MINUTES)
+
+        rows = (
+            self.db.query(
+                TreasuryTransaction.created_at,
+                TreasuryTransaction.carat_amount,
+                TreasuryTransaction.golden_carat_amount,
+            )
+            .filter(TreasuryTransaction.created_at >= cutoff)
+            .all()
+        )
+
+        # Empty slots point at a minute outside any window
+        buckets = {
+            slot: {"slot": slot, "minute": -1, "volume": Decimal("0"), "transaction_count": 0}
+            for slot in range(self.WINDOW_MINUTES * fee_shards.shard_count)
+        }
+        folded = 0
+        for created_at, carat_amount, golden_carat_amount in rows:
+            minute = self._minute(created_at)
+            if not current - self.WINDOW_MINUTES < minute <= current:
+                continue
+            folded += 1
+            bucket = buckets[minute % self.WINDOW_MINUTES]
+            bucket["minute"] = minute
+            bucket["volume"] += self.transaction_volume(carat_amount, golden_carat_amount)
+            bucket["transaction_count"] += 1
+
+        self.db.query(VolumeBucket).delete(synchronize_session=False)
+        self.db.bulk_insert_mappings(VolumeBucket, list(buckets.values()))
+        self.db.flush()
+
+        return folded
@@ -0,0 +1,92 @@
+"""
+Wealth Ranking
+In-process snapshot of ranked users' total values for leaderboard rank lookups
+"""
+
+import bisect
+import threading
+import time
+from decimal import Decimal
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..config import cache as cache_config
+
+# Session.info key marking a session that changed a balance
+_CHANGED_KEY = "arca_balances_changed"
+
+
+class WealthRanking:
+    """
+    Sorted total values of every ranked user
+
+    Turns a rank lookup into one bisection instead of grouping every
+    balance row per call. The snapshot is reloaded once it is older than
+    refresh_seconds, and dropped as soon as this process commits a balance
+    change, so only other processes' writes can lag.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._totals: Optional[List[Decimal]] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def count_richer(
+        self, total: Decimal, load: Callable[[], Iterable[Decimal]]
+    ) -> Tuple[int, int]:
+        """
+        Count ranked users with a strictly higher total, and all ranked users
+
+        Args:
+            total: Total value to place
+            load: Returns every ranked user's total; called when the snapshot is stale
+        """
+        with self._lock:
+            totals = self._totals
+            generation = self._generation
+            if totals is not None and time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                totals = None
+
+        if totals is None:
+            totals = sorted(Decimal(str(value)) for value in load())
+            with self._lock:
+                # A commit meanwhile may have changed totals this load missed
+                if self._generation == generation:
+                    self._totals = totals
+                    self._loaded_at = time.monotonic()
+
+        return len(totals) - bisect.bisect_right(totals, Decimal(str(total))), len(totals)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._totals = None
+            self._generation += 1
+
+
+wealth_ranking = WealthRanking(refresh_seconds=cache_config.WEALTH_RANK_REFRESH_SECONDS)
+
+
+def mark_balances_changed(db: Session) -> None:
+    """Drop the ranking snapshot once db's transaction commits"""
+    db.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_balances(session: Session) -> None:
+    """Drop the ranking snapshot once balance changes are committed"""
+    if session.in_nested_transaction():
+        # A savepoint was released; the outer transaction is still open
+        return
+    if session.info.pop(_CHANGED_KEY, None):
+        wealth_ranking.clear()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_balances(session: Session, previous_transaction) -> None:
+    """Nothing to invalidate once the whole transaction rolled back"""
+    if not previous_transaction.nested:
+        session.info.pop(_CHANGED_KEY, None)
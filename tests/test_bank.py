@@ -2,6 +2,8 @@
 Arca Bank Test Suite
 """
 
+import asyncio
+import threading
 from datetime import datetime
 from decimal import Decimal
 
@@ -10,7 +12,16 @@ import pytest
 from src.api.bank_api import ArcaBank
 from src.models.base import Base, engine, get_db, init_db
 from src.models.currency import CurrencyType
+from src.models.treasury import TransactionType
 from src.models.user import User, UserRole
+from src.services.chart_cache import chart_cache
+from src.services.delayed_average import delayed_averages
+from src.services.fee_shards import fee_shards
+from src.services.item_index import item_ids, item_search
+from src.services.price_ticks import price_ticks
+from src.services.singleton_cache import singleton_cache
+from src.services.tick_aggregator import tick_aggregator
+from src.services.wealth_ranking import wealth_ranking
 
 
 @pytest.fixture(autouse=True)
@@ -19,9 +30,27 @@ def setup_database():
     # Create all tables
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    singleton_cache.clear()
+    chart_cache.clear()
+    item_ids.clear()
+    item_search.clear()
+    tick_aggregator.clear()
+    price_ticks.clear()
+    delayed_averages.clear()
+    fee_shards.clear()
+    wealth_ranking.clear()
     yield
     # Cleanup after test
     Base.metadata.drop_all(bind=engine)
+    singleton_cache.clear()
+    chart_cache.clear()
+    item_ids.clear()
+    item_search.clear()
+    tick_aggregator.clear()
+    price_ticks.clear()
+    delayed_averages.clear()
+    fee_shards.clear()
+    wealth_ranking.clear()
 
 
 @pytest.fixture
@@ -207,6 +236,2496 @@ class TestTransferOperations:
         assert not result.success
         assert "Insufficient" in result.message
 
+    def _run_concurrently(self, workers):
+        """Start workers together; return (successes, insufficient, unexpected errors)"""
+        barrier = threading.Barrier(len(workers))
+        outcomes = []
+
+        def run(worker):
+            barrier.wait()
+            for attempt in worker:
+                try:
+                    attempt()
+                    outcomes.append("ok")
+                except ValueError:
+                    outcomes.append("insufficient")
+                except Exception as e:
+                    outcomes.append(repr(e))
+
+        threads = [threading.Thread(target=run, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        errors = [outcome for outcome in outcomes if outcome not in ("ok", "insufficient")]
+        return outcomes.count("ok"), outcomes.count("insufficient"), errors
+
+    def _transfer(self, sender_id, recipient_id, amount):
+        from src.services.currency_service import CurrencyService
+        from src.services.user_service import UserService
+
+        def attempt():
+            with get_db() as db:
+                user_service = UserService(db)
+                CurrencyService(db).transfer(
+                    user_service.get_by_discord_id(sender_id),
+                    user_service.get_by_discord_id(recipient_id),
+                    CurrencyType.CARAT,
+                    Decimal(amount),
+                    apply_fee=False,
+                )
+
+        return attempt
+
+    def _balances(self, *discord_ids):
+        from src.services.currency_service import CurrencyService
+        from src.services.user_service import UserService
+
+        with get_db() as db:
+            service = CurrencyService(db)
+            return [
+                service.get_user_balances(UserService(db).get_by_discord_id(discord_id))["carats"]
+                for discord_id in discord_ids
+            ]
+
+    def _fund(self, bank, amounts):
+        from src.services.currency_service import CurrencyService
+        from src.services.user_service import UserService
+
+        for discord_id in amounts:
+            bank.register_user(discord_id, discord_id.title())
+        with get_db() as db:
+            service = CurrencyService(db)
+            for discord_id, amount in amounts.items():
+                service.add_balance(
+                    UserService(db).get_by_discord_id(discord_id), CurrencyType.CARAT, amount
+                )
+
+    def test_concurrent_transfers_cannot_double_spend(self, bank):
+        """Test that racing debits from one sender never overdraw it"""
+        self._fund(bank, {"sender": Decimal("100"), "alice": Decimal("0"), "bob": Decimal("0")})
+
+        workers = [
+            [self._transfer("sender", ("alice", "bob")[n % 2], "5")] * 10 for n in range(8)
+        ]
+        succeeded, insufficient, errors = self._run_concurrently(workers)
+
+        assert errors == []
+        assert (succeeded, insufficient) == (20, 60)
+        sender, alice, bob = self._balances("sender", "alice", "bob")
+        assert sender == 0
+        assert alice + bob == Decimal("100")
+
+    def test_opposing_transfers_conserve_balances(self, bank):
+        """Test that transfers in both directions neither deadlock nor lose updates"""
+        self._fund(bank, {"alice": Decimal("20"), "bob": Decimal("20")})
+
+        workers = [
+            [self._transfer(*(("alice", "bob") if n % 2 else ("bob", "alice")), "1")] * 25
+            for n in range(8)
+        ]
+        succeeded, insufficient, errors = self._run_concurrently(workers)
+
+        alice, bob = self._balances("alice", "bob")
+        assert errors == []
+        assert succeeded + insufficient == 200
+        assert alice >= 0 and bob >= 0
+        assert alice + bob == Decimal("40")
+
+
+class TestLeaderboard:
+    """Test SQL-side leaderboard ranking"""
+
+    def _fund(self, discord_id, carats="0", golden="0", role=None):
+        from src.services.currency_service import CurrencyService
+        from src.services.user_service import UserService
+
+        with get_db() as db:
+            user = UserService(db).get_by_discord_id(discord_id)
+            if role:
+                user.role = role
+            currency_service = CurrencyService(db)
+            currency_service.add_balance(user, CurrencyType.CARAT, Decimal(carats))
+            currency_service.add_balance(user, CurrencyType.GOLDEN_CARAT, Decimal(golden))
+
+    def test_leaderboard_orders_by_total_value(self, bank):
+        """Test ranking by carats + golden carats * 9, excluding consumers and empty balances"""
+        for discord_id in ("a", "b", "c", "d", "e"):
+            bank.register_user(discord_id, discord_id.upper())
+
+        self._fund("a", carats="100")
+        self._fund("b", golden="20")  # 180 carats
+        self._fund("c", carats="50", golden="10")  # 140 carats
+        self._fund("d", carats="1000", role=UserRole.CONSUMER)
+
+        result = bank.get_leaderboard(limit=10)
+
+        assert result.success
+        assert [u["discord_id"] for u in result.data["users"]] == ["b", "c", "a"]
+        assert result.data["users"][0]["total_value"] == 180
+        assert result.data["users"][0]["rank"] == 1
+
+    def test_my_rank(self, bank):
+        """Test rank lookup, including ties and unranked users"""
+        for discord_id in ("a", "b", "c", "d"):
+            bank.register_user(discord_id, discord_id.upper())
+
+        self._fund("a", carats="300")
+        self._fund("b", carats="200")
+        self._fund("c", carats="200")
+
+        rank_c = bank.get_my_rank("c")
+        assert rank_c.data["ranked"]
+        assert rank_c.data["rank"] == 2
+        assert rank_c.data["total_ranked"] == 3
+
+        assert bank.get_my_rank("a").data["rank"] == 1
+        assert not bank.get_my_rank("d").data["ranked"]
+        assert not bank.get_my_rank("missing").success
+
+    def test_ties_ranked_alike_everywhere(self, bank):
+        """Test that the leaderboard and rank lookups agree on tied balances"""
+        from src.services.currency_service import CurrencyService
+
+        for discord_id in ("a", "b", "c", "d"):
+            bank.register_user(discord_id, discord_id.upper())
+        self._fund("a", carats="90")
+        self._fund("b", golden="10")  # 90 carats
+        self._fund("c", carats="50")
+        self._fund("d", carats="90")
+
+        board = bank.get_leaderboard(limit=10).data["users"]
+        assert [(u["discord_id"], u["rank"]) for u in board] == [
+            ("a", 1),
+            ("b", 1),
+            ("d", 1),
+            ("c", 4),
+        ]
+        for user in board:
+            assert bank.get_my_rank(user["discord_id"]).data["rank"] == user["rank"]
+
+        # A page starting inside the tie keeps the shared rank
+        with get_db() as db:
+            page = CurrencyService(db).get_leaderboard(limit=2, offset=1)
+        assert [(u["discord_id"], u["rank"]) for u in page] == [("b", 1), ("d", 1)]
+
+    def test_rank_follows_committed_balance_changes(self, bank):
+        """Test that the cached ranking is dropped when this process changes a balance"""
+        for discord_id in ("a", "b"):
+            bank.register_user(discord_id, discord_id.upper())
+        self._fund("a", carats="100")
+        self._fund("b", carats="50")
+        assert bank.get_my_rank("b").data["rank"] == 2
+
+        self._fund("b", carats="100")
+        assert bank.get_my_rank("b").data["rank"] == 1
+        assert bank.get_my_rank("a").data["rank"] == 2
+
+
+class TestVolumeBuckets:
+    """Test rolling 24h volume counters"""
+
+    def test_refresh_matches_ledger(self, bank):
+        """Test that bucketed 24h volume equals a full ledger scan"""
+        from src.models.treasury import TreasuryTransaction
+        from src.services.market_service import MarketService
+        from src.services.treasury_service import TreasuryService
+        from src.services.volume_service import VolumeService
+
+        bank.register_user("sender", "Sender")
+        bank.register_user("recipient", "Recipient")
+        with get_db() as db:
+            from src.services.currency_service import CurrencyService
+            from src.services.user_service import UserService
+
+            sender = UserService(db).get_by_discord_id("sender")
+            CurrencyService(db).add_balance(sender, CurrencyType.CARAT, Decimal("100"))
+            TreasuryService(db).collect_fee(Decimal("2"), TransactionType.EXCHANGE_FEE, sender)
+
+        bank.transfer("sender", "recipient", 50, "carat")
+
+        with get_db() as db:
+            index = MarketService(db).refresh_market_index()
+            transactions = db.query(TreasuryTransaction).all()
+            expected = sum(
+                VolumeService.transaction_volume(tx.carat_amount, tx.golden_carat_amount)
+                for tx in transactions
+            )
+
+            assert index.transaction_count_24h == len(transactions) == 2
+            assert Decimal(index.volume_24h) == expected
+
+    def test_buckets_expire_after_window(self):
+        """Test that a slot reused a day later drops the old minute"""
+        from datetime import timedelta
+
+        from src.services.volume_service import VolumeService
+
+        start = datetime(2026, 1, 1, 12, 0)
+        with get_db() as db:
+            volumes = VolumeService(db)
+            volumes.record(Decimal("10"), at=start)
+            volumes.record(Decimal("5"), at=start + timedelta(seconds=30))
+            assert volumes.get_window_totals(now=start) == (Decimal("15"), 2)
+
+            next_day = start + timedelta(days=1)
+            volumes.record(Decimal("7"), at=next_day)
+            assert volumes.get_window_totals(now=next_day) == (Decimal("7"), 1)
+
+    def test_rebuild_from_existing_ledger(self):
+        """Test that buckets are seeded from ledger rows written before they existed"""
+        from datetime import timedelta
+
+        from src.models.treasury import TreasuryTransaction
+        from src.services.volume_service import VolumeService
+
+        now = datetime.utcnow()
+        with get_db() as db:
+            for minutes_ago, carats in ((5, "10"), (60, "20"), (2 * 24 * 60, "999")):
+                db.add(
+                    TreasuryTransaction(
+                        transaction_type=TransactionType.DEPOSIT,
+                        carat_amount=Decimal(carats),
+                        treasury_diamonds_after=Decimal("0"),
+                        treasury_carats_after=Decimal("0"),
+                        book_value_after=Decimal("1"),
+                        created_at=now - timedelta(minutes=minutes_ago),
+                    )
+                )
+
+        with get_db() as db:
+            volumes = VolumeService(db)
+            assert volumes.rebuild(now=now) == 2
+            assert volumes.get_window_totals(now=now) == (Decimal("30"), 2)
+
+
+class TestDailyRollups:
+    """Test pre-rolled daily treasury aggregates"""
+
+    def _add_ledger_row(self, db, created_at, diamonds="0", carats="0", fee="0"):
+        from src.models.treasury import TreasuryTransaction
+
+        db.add(
+            TreasuryTransaction(
+                transaction_type=TransactionType.DEPOSIT,
+                diamond_amount=Decimal(diamonds),
+                carat_amount=Decimal(carats),
+                fee_amount=Decimal(fee),
+                treasury_diamonds_after=Decimal("0"),
+                treasury_carats_after=Decimal("0"),
+                book_value_after=Decimal("1"),
+                created_at=created_at,
+            )
+        )
+
+    def test_inflow_outflow_uses_rollups_and_partial_day(self):
+        """Test that rebuilt rollups plus the partial first day match the raw ledger"""
+        from datetime import timedelta
+
+        from src.services.treasury_service import TreasuryService
+
+        now = datetime.utcnow()
+        with get_db() as db:
+            self._add_ledger_row(db, now - timedelta(days=40), diamonds="1000")  # outside window
+            self._add_ledger_row(db, now - timedelta(days=30, minutes=-5), diamonds="7")
+            self._add_ledger_row(db, now - timedelta(days=3), diamonds="-4", carats="-12", fee="1")
+            self._add_ledger_row(db, now - timedelta(hours=1), carats="20", fee="0.5")
+
+        with get_db() as db:
+            service = TreasuryService(db)
+            assert service.rebuild_daily_rollups() == 4
+
+            summary = service.get_inflow_outflow(days=30)
+
+        assert summary["inflow_diamonds"] == Decimal("7")
+        assert summary["outflow_diamonds"] == Decimal("4")
+        assert summary["inflow_carats"] == Decimal("20")
+        assert summary["outflow_carats"] == Decimal("12")
+        assert summary["total_fees_collected"] == Decimal("1.5")
+        assert summary["transaction_count"] == 3
+
+    def test_rollups_maintained_on_insert(self, bank):
+        """Test that recorded transactions reach the rollups through their shards"""
+        from src.models.treasury import TreasuryDailyRollup, TreasuryRollupShard
+        from src.services.treasury_service import TreasuryService
+
+        with get_db() as db:
+            service = TreasuryService(db)
+            service.collect_fee(Decimal("2"), TransactionType.FEE_COLLECTION)
+            service.collect_fee(Decimal("3"), TransactionType.FEE_COLLECTION)
+
+        with get_db() as db:
+            assert db.query(TreasuryDailyRollup).count() == 0
+            shard = db.query(TreasuryRollupShard).one()
+            assert shard.transaction_count == 2
+            assert Decimal(shard.fee_total) == Decimal("5")
+
+            # Pending shards are already reported
+            summary = TreasuryService(db).get_inflow_outflow(days=7)
+            assert summary["total_fees_collected"] == Decimal("5")
+            assert summary["inflow_carats"] == Decimal("5")
+
+        with get_db() as db:
+            TreasuryService(db).fold_fees()
+        with get_db() as db:
+            rollup = db.query(TreasuryDailyRollup).one()
+            assert rollup.transaction_count == 2
+            assert Decimal(rollup.fee_total) == Decimal("5")
+            assert db.query(TreasuryRollupShard).one().transaction_count == 0
+
+            summary = TreasuryService(db).get_inflow_outflow(days=7)
+            assert summary["total_fees_collected"] == Decimal("5")
+            assert summary["transaction_count"] == 2
+
+    def test_first_deposit_counted_once(self, bank):
+        """Test that the first transaction on a fresh database reaches the rollups once"""
+        from src.services.treasury_service import TreasuryService
+        from src.services.user_service import UserService
+
+        bank.register_user("12345", "TestUser")
+        with get_db() as db:
+            user = UserService(db).get_by_discord_id("12345")
+            TreasuryService(db).deposit_diamonds(user, Decimal("10"), Decimal("90"))
+
+        with get_db() as db:
+            summary = TreasuryService(db).get_inflow_outflow(days=1)
+
+        assert summary["inflow_diamonds"] == Decimal("10")
+        assert summary["inflow_carats"] == Decimal("90")
+        assert summary["transaction_count"] == 1
+
+    def test_upgrade_schema_backfills_rollups(self):
+        """Test that startup fills empty rollups from an existing ledger, exactly once"""
+        from datetime import timedelta
+
+        from src.models.base import engine
+        from src.models.migrations import upgrade_schema
+        from src.models.treasury import TreasuryDailyRollup
+        from src.services.treasury_service import TreasuryService
+
+        now = datetime.utcnow()
+        with get_db() as db:
+            self._add_ledger_row(db, now - timedelta(days=3), diamonds="-4", carats="-12", fee="1")
+            self._add_ledger_row(db, now - timedelta(days=3), diamonds="6")
+            self._add_ledger_row(db, now - timedelta(hours=1), carats="20", fee="0.5")
+
+        assert upgrade_schema(engine) == ["treasury_daily_rollups"]
+        assert upgrade_schema(engine) == []
+
+        with get_db() as db:
+            assert db.query(TreasuryDailyRollup).count() == 2
+            summary = TreasuryService(db).get_inflow_outflow(days=7)
+
+        assert summary["inflow_diamonds"] == Decimal("6")
+        assert summary["outflow_diamonds"] == Decimal("4")
+        assert summary["inflow_carats"] == Decimal("20")
+        assert summary["outflow_carats"] == Decimal("12")
+        assert summary["total_fees_collected"] == Decimal("1.5")
+        assert summary["transaction_count"] == 3
+
+
+class TestSnapshotStore:
+    """Test the columnar snapshot reader and chart rendering on top of it"""
+
+    def _add_snapshots(self, count, start=None, interval_type="hour"):
+        from datetime import timedelta
+
+        from src.models.market import CirculationStatus, MarketSnapshot
+
+        start = start or datetime.utcnow() - timedelta(hours=count)
+        with get_db() as db:
+            for i in range(count):
+                price = Decimal("1") + Decimal(i) / 100
+                db.add(
+                    MarketSnapshot(
+                        index_value=price * 100,
+                        delayed_average=price * 100,
+                        carat_price=price,
+                        open_price=price - Decimal("0.005"),
+                        high_price=price + Decimal("0.01"),
+                        low_price=price - Decimal("0.01"),
+                        close_price=price,
+                        volume=Decimal(i),
+                        total_circulation=Decimal("1000"),
+                        circulation_status=(
+                            CirculationStatus.FROZEN if i in (2, 3) else CirculationStatus.HEALTHY
+                        ),
+                        book_value=price,
+                        reserve_ratio=Decimal("0.2"),
+                        interval_type=interval_type,
+                        snapshot_time=start + timedelta(hours=i),
+                    )
+                )
+
+    def test_load_returns_numpy_columns(self):
+        """Test that snapshots come back as ordered float64/int64 arrays"""
+        from src.services.snapshot_store import SnapshotStore
+
+        self._add_snapshots(10)
+        self._add_snapshots(3, interval_type="day")
+
+        with get_db() as db:
+            series = SnapshotStore(db, cache_dir="").load(days=7, interval_type="hour")
+
+        assert len(series) == 10
+        assert series.close.dtype.name == "float64"
+        assert series.timestamps.dtype.name == "int64"
+        assert (series.timestamps[1:] > series.timestamps[:-1]).all()
+        assert series.close[-1] == pytest.approx(1.09)
+        assert series.frozen.tolist()[:5] == [False, False, True, True, False]
+
+    def test_disk_cache_extends_and_invalidates(self, tmp_path):
+        """Test that the memmap cache picks up new rows and reloads after deletes"""
+        from src.models.market import MarketSnapshot
+        from src.services.snapshot_store import SnapshotStore
+
+        self._add_snapshots(5)
+
+        with get_db() as db:
+            store = SnapshotStore(db, cache_dir=str(tmp_path))
+            assert len(store.load(days=7, interval_type="hour")) == 5
+            assert (tmp_path / "snapshots_hour.npy").exists()
+
+        self._add_snapshots(2, start=datetime.utcnow())
+        with get_db() as db:
+            assert len(SnapshotStore(db, cache_dir=str(tmp_path)).load(7, "hour")) == 7
+
+        with get_db() as db:
+            db.query(MarketSnapshot).filter(MarketSnapshot.id == 1).delete()
+        with get_db() as db:
+            series = SnapshotStore(db, cache_dir=str(tmp_path)).load(7, "hour")
+            assert len(series) == 6
+            assert 1 not in series.records["id"]
+
+    def test_candlestick_charts_render(self, bank):
+        """Test that candlestick and advanced charts produce PNG images"""
+        self._add_snapshots(30)
+
+        for chart in (
+            bank.get_market_chart(days=7, chart_type="candlestick"),
+            bank.get_advanced_chart(days=7),
+            bank.get_multi_timeframe_chart(),
+        ):
+            assert isinstance(chart, bytes)
+            assert chart.startswith(b"\x89PNG")
+
+
+class TestSnapshotBackfill:
+    """Test rebuilding missed market snapshots from the ledger"""
+
+    def _add_ledger_row(self, db, created_at, diamonds, carats, book_value, volume="0"):
+        from src.models.treasury import TreasuryTransaction
+
+        db.add(
+            TreasuryTransaction(
+                transaction_type=TransactionType.DEPOSIT,
+                carat_amount=Decimal(volume),
+                treasury_diamonds_after=Decimal(diamonds),
+                treasury_carats_after=Decimal(carats),
+                book_value_after=Decimal(book_value),
+                created_at=created_at,
+            )
+        )
+
+    def test_fills_gaps_from_ledger_state(self):
+        """Test that only empty buckets are filled, with the state at each bucket start"""
+        from datetime import timedelta
+
+        from src.models.market import MarketSnapshot
+        from src.services.market_service import MarketService
+
+        now = datetime(2026, 3, 1, 12, 30)
+        with get_db() as db:
+            self._add_ledger_row(db, now - timedelta(hours=5, minutes=50), 2000, 2000, "1", "10")
+            self._add_ledger_row(db, now - timedelta(hours=3, minutes=40), 3000, 2000, "1.5", "5")
+            self._add_ledger_row(db, now - timedelta(hours=3, minutes=35), 2400, 2000, "1.2", "5")
+
+        with get_db() as db:
+            service = MarketService(db)
+            service.create_snapshot("hour").snapshot_time = datetime(2026, 3, 1, 10, 5)
+
+        with get_db() as db:
+            inserted = MarketService(db).backfill_snapshots(["hour", "day"], now=now)
+            assert inserted == {"hour": 4, "day": 0}
+
+            snapshots = (
+                db.query(MarketSnapshot)
+                .filter(MarketSnapshot.interval_type == "hour")
+                .order_by(MarketSnapshot.snapshot_time)
+                .all()
+            )
+            times = [s.snapshot_time.hour for s in snapshots]
+            assert times == [7, 8, 9, 10, 11]  # 12:00 bucket is still open
+
+            by_hour = {s.snapshot_time.hour: s for s in snapshots}
+            assert Decimal(by_hour[7].close_price) == Decimal("1")
+            assert Decimal(by_hour[7].total_circulation) == Decimal("2000")
+            assert Decimal(by_hour[9].close_price) == Decimal("1.2")
+            assert Decimal(by_hour[9].high_price) == Decimal("1.5")
+            assert Decimal(by_hour[9].volume) == Decimal("20")
+            assert by_hour[9].transaction_count == 3
+            assert Decimal(by_hour[9].index_value) == Decimal("120")
+            assert Decimal(by_hour[8].delayed_average) == Decimal("100")
+            assert Decimal(by_hour[9].delayed_average) == Decimal("106.6666")
+
+        with get_db() as db:
+            assert MarketService(db).backfill_snapshots(["hour"], now=now) == {"hour": 0}
+
+    def test_bank_backfill_requires_head_banker(self, bank):
+        """Test the on-demand backfill entry point"""
+        bank.register_user("1", "Player")
+        assert not bank.backfill_snapshots("1").success
+
+        with get_db() as db:
+            db.query(User).filter(User.discord_id == "1").update({"role": UserRole.HEAD_BANKER})
+
+        result = bank.backfill_snapshots("1")
+        assert result.success
+        assert set(result.data["inserted"]) == {"minute", "hour", "day"}
+
+
+class TestSnapshotCompaction:
+    """Test downsampling old snapshots and retention"""
+
+    def _add_snapshot(self, db, interval_type, at, open_, high, low, close):
+        from src.models.market import CirculationStatus, MarketSnapshot
+
+        db.add(
+            MarketSnapshot(
+                index_value=Decimal(close) * 100,
+                delayed_average=Decimal("100"),
+                carat_price=Decimal(close),
+                open_price=Decimal(open_),
+                high_price=Decimal(high),
+                low_price=Decimal(low),
+                close_price=Decimal(close),
+                total_circulation=Decimal("5000"),
+                circulation_status=CirculationStatus.HEALTHY,
+                book_value=Decimal(close),
+                reserve_ratio=Decimal("0.2"),
+                interval_type=interval_type,
+                snapshot_time=at,
+            )
+        )
+
+    def test_rolls_up_ohlc_and_enforces_retention(self):
+        """Test that expired minutes become true OHLC hours and days, then are deleted"""
+        from src.models.market import MarketSnapshot
+        from src.services.market_service import MarketService
+
+        with get_db() as db:
+            for at, candle in [
+                (datetime(2026, 3, 12, 22, 20), ("1", "1.2", "0.9", "1.1")),
+                (datetime(2026, 3, 12, 22, 40), ("1.1", "1.5", "1.0", "1.3")),
+                (datetime(2026, 3, 12, 23, 0), ("1.3", "1.3", "1.2", "1.25")),
+                (datetime(2026, 3, 12, 23, 30), ("1.25", "1.25", "0.8", "1")),
+                (datetime(2026, 3, 12, 23, 59), ("1", "1.1", "1", "1.05")),
+                (datetime(2026, 3, 13, 0, 0), ("1.05", "1.05", "1.05", "1.05")),  # kept
+            ]:
+                self._add_snapshot(db, "minute", at, *candle)
+            self._add_snapshot(db, "hour", datetime(2026, 3, 12, 23), "1.2", "1.3", "1.2", "1.25")
+            self._add_snapshot(db, "hour", datetime(2025, 12, 1, 5), "2", "2", "2", "2")
+            self._add_snapshot(db, "day", datetime(2025, 3, 1), "3", "3", "3", "3")
+
+        with get_db() as db:
+            report = MarketService(db).compact_snapshots(now=datetime(2026, 3, 20, 0, 30))
+
+        assert report["rolled_up"] == {"hour": 2, "day": 2}
+        assert report["deleted"] == {"minute": 5, "hour": 1, "day": 1}
+        assert report["reclaimed"] == 7
+        assert report["duration_ms"] >= 0
+
+        def candles(db, interval_type):
+            return {
+                s.snapshot_time: tuple(
+                    float(v) for v in (s.open_price, s.high_price, s.low_price, s.close_price)
+                )
+                for s in db.query(MarketSnapshot).filter(
+                    MarketSnapshot.interval_type == interval_type
+                )
+            }
+
+        with get_db() as db:
+            assert candles(db, "hour") == {
+                datetime(2026, 3, 12, 22): (1.0, 1.5, 0.9, 1.3),
+                datetime(2026, 3, 12, 23): (1.3, 1.3, 0.8, 1.05),
+            }
+            assert candles(db, "day") == {
+                datetime(2025, 12, 1): (2.0, 2.0, 2.0, 2.0),
+                datetime(2026, 3, 12): (1.0, 1.5, 0.8, 1.05),
+            }
+            assert list(candles(db, "minute")) == [datetime(2026, 3, 13, 0, 0)]
+
+    def test_off_boundary_rows_share_floor_buckets(self):
+        """Test that rows stamped just after a boundary roll into that boundary's bucket"""
+        from datetime import timedelta
+
+        from src.models.market import MarketSnapshot
+        from src.services.market_service import MarketService
+
+        late = timedelta(milliseconds=300)
+        eleven, noon = datetime(2026, 3, 12, 11), datetime(2026, 3, 12, 12)
+        with get_db() as db:
+            # Live hour rows, written a moment after their boundaries
+            self._add_snapshot(db, "hour", eleven + late, "5", "5", "5", "5")
+            self._add_snapshot(db, "hour", noon + late, "6", "6", "6", "6")
+            self._add_snapshot(db, "minute", eleven + late, "1", "1.4", "1", "1.2")
+            last = eleven + timedelta(minutes=59, seconds=59.7)
+            self._add_snapshot(db, "minute", last, "1.2", "1.2", "0.7", "0.9")
+            self._add_snapshot(db, "minute", noon + late, "0.9", "1.6", "0.9", "1.5")
+
+        with get_db() as db:
+            report = MarketService(db).compact_snapshots(now=datetime(2026, 3, 20, 0, 30))
+        assert report["rolled_up"]["hour"] == 2
+
+        with get_db() as db:
+            hours = {
+                s.snapshot_time: tuple(
+                    float(v) for v in (s.open_price, s.high_price, s.low_price, s.close_price)
+                )
+                for s in db.query(MarketSnapshot).filter(MarketSnapshot.interval_type == "hour")
+            }
+
+        # Rewritten in place: no spurious 10:00 row and no 12:00 duplicate
+        assert hours == {
+            eleven + late: (1.0, 1.4, 0.7, 0.9),
+            noon + late: (0.9, 1.6, 0.9, 1.5),
+        }
+
+    def test_rewritten_rows_invalidate_caches(self, tmp_path):
+        """Test that an hour candle rewritten by compaction is not served from caches"""
+        from datetime import timedelta
+
+        from src.services.market_service import MarketService
+        from src.services.snapshot_store import SnapshotStore
+
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=10)
+        with get_db() as db:
+            self._add_snapshot(db, "minute", hour + timedelta(minutes=30), "1", "9", "1", "1.2")
+            self._add_snapshot(db, "hour", hour, "1.2", "1.3", "1.2", "1.25")
+
+        with get_db() as db:
+            store = SnapshotStore(db, cache_dir=str(tmp_path))
+            before = store.fingerprint("hour")
+            assert store.load(days=30, interval_type="hour").high.tolist() == [1.3]
+
+        with get_db() as db:
+            report = MarketService(db).compact_snapshots()
+        assert report["rolled_up"]["hour"] == 1
+
+        with get_db() as db:
+            store = SnapshotStore(db, cache_dir=str(tmp_path))
+            # Same row count and ids, so only the rewrite marks the change
+            assert store.fingerprint("hour")[:2] == before[:2]
+            assert store.fingerprint("hour") != before
+            assert store.load(days=30, interval_type="hour").high.tolist() == [9.0]
+
+
+class TestTickAggregator:
+    """Test intra-interval OHLC tracking"""
+
+    def test_bars_flush_per_interval(self):
+        """Test running OHLCV and that each interval's bar is closed independently"""
+        from src.services.tick_aggregator import TickAggregator
+
+        ticks = TickAggregator()
+        assert ticks.flush("minute") is None
+        for price, volume in ((1.0, 5), (1.4, 2), (0.7, 1), (1.1, 0)):
+            ticks.record(price, volume)
+
+        minute = ticks.flush("minute")
+        assert (minute["open"], minute["high"], minute["low"], minute["close"]) == (
+            1.0,
+            1.4,
+            0.7,
+            1.1,
+        )
+        assert minute["volume"] == 8 and minute["ticks"] == 4
+
+        ticks.record(1.2)
+        assert ticks.flush("minute")["open"] == 1.1  # next bar opens at the last close
+        assert ticks.peek("hour")["high"] == 1.4  # still open
+        assert ticks.peek("hour")["ticks"] == 5
+
+    def test_snapshot_uses_committed_ticks(self):
+        """Test that snapshots include intra-interval extremes, minus rolled-back ticks"""
+        from src.services.market_service import MarketService
+        from src.services.tick_aggregator import record_tick
+        from src.services.treasury_service import TreasuryService
+
+        with get_db() as db:
+            TreasuryService(db).collect_fee(Decimal("2"), TransactionType.FEE_COLLECTION)
+            record_tick(db, "1.8")
+            try:
+                with db.begin_nested():
+                    record_tick(db, "9.0")
+                    raise RuntimeError("rolled back")
+            except RuntimeError:
+                pass
+            record_tick(db, "0.6")
+        assert tick_aggregator.peek("minute")["ticks"] == 3
+
+        with get_db() as db:
+            TreasuryService(db).collect_fee(Decimal("1"), TransactionType.FEE_COLLECTION)
+            record_tick(db, "50")
+            db.rollback()
+
+        with get_db() as db:
+            snapshot = MarketService(db).create_snapshot("minute")
+            assert Decimal(snapshot.high_price) == Decimal("1.8")
+            assert Decimal(snapshot.low_price) == Decimal("0.6")
+
+        assert tick_aggregator.peek("minute")["ticks"] == 0
+        assert tick_aggregator.peek("hour")["ticks"] == 3
+
+    def test_released_savepoint_keeps_ticks_pending(self):
+        """Test that ticks wait for the outer commit when a savepoint is released"""
+        from src.services.tick_aggregator import record_tick
+
+        with pytest.raises(RuntimeError):
+            with get_db() as db:
+                record_tick(db, "2.5")
+                with db.begin_nested():
+                    record_tick(db, "3.5")
+                assert tick_aggregator.peek("minute") is None
+                raise RuntimeError("abort")
+
+        assert tick_aggregator.peek("minute") is None
+
+
+class TestPriceTicks:
+    """Test the ring-buffer price tick store"""
+
+    def test_windowed_stats_match_brute_force(self):
+        """Test mean/min/max/last over trailing windows across ring wraparound"""
+        import random
+        from datetime import timedelta
+
+        from src.services.price_ticks import PriceTickStore
+
+        store = PriceTickStore(capacity=50)
+        start = datetime(2026, 1, 1)
+        rng = random.Random(7)
+        ticks = [(start + timedelta(seconds=10 * i), rng.uniform(0.5, 2.0)) for i in range(130)]
+        for at, price in ticks:
+            store.append(price, at)
+
+        assert len(store) == 50
+        now = ticks[-1][0]
+        for seconds in (5, 35, 200, 499, 5000):
+            kept = ticks[-50:]
+            inside = [price for at, price in kept if at > now - timedelta(seconds=seconds)]
+            stats = store.window(seconds, now=now)
+            assert stats["count"] == len(inside)
+            assert stats["mean"] == pytest.approx(sum(inside) / len(inside))
+            assert stats["min"] == min(inside) and stats["max"] == max(inside)
+            assert stats["last"] == ticks[-1][1]
+            assert stats["covered"] == (seconds < 490)
+
+        assert store.window(60, now=now + timedelta(hours=1)) is None
+        assert store.last() == ticks[-1]
+
+    def test_checkpoint_and_reload(self):
+        """Test that committed ticks are checkpointed, trimmed, and merged on reload"""
+        from src.models.market import PriceTick
+        from src.services.price_ticks import PriceTickStore
+        from src.services.tick_aggregator import record_tick
+
+        with get_db() as db:
+            for price in ("1.0", "1.5", "0.5", "1.2"):
+                record_tick(db, price)
+        assert len(price_ticks) == 4
+
+        with get_db() as db:
+            assert price_ticks.checkpoint(db) == 4
+            assert price_ticks.checkpoint(db) == 0
+
+        # A smaller store loads the newest rows, then trims the table to its size
+        small = PriceTickStore(capacity=3)
+        small.append(2.0)
+        small.append(2.5)
+        with get_db() as db:
+            assert small.checkpoint(db) == 2
+            assert db.query(PriceTick).count() == 3
+
+        restarted = PriceTickStore(capacity=10)
+        restarted.append(3.0)  # recorded before the first load
+        with get_db() as db:
+            restarted.ensure_loaded(db)
+        assert [price for _, price in restarted._ticks(0)] == [1.2, 2.0, 2.5, 3.0]
+        assert restarted.window(3600)["max"] == 3.0
+
+    def test_rolled_back_checkpoint_is_rewritten(self):
+        """Test that ticks from a checkpoint that never committed are written by the next one"""
+        from src.models.market import PriceTick
+        from src.services.price_ticks import PriceTickStore
+
+        store = PriceTickStore(capacity=10)
+        store.append(1.0)
+        store.append(2.0)
+
+        with pytest.raises(RuntimeError):
+            with get_db() as db:
+                assert store.checkpoint(db) == 2
+                raise RuntimeError("abort")
+
+        with get_db() as db:
+            try:
+                with db.begin_nested():
+                    assert store.checkpoint(db) == 2
+                    raise RuntimeError("rolled back")
+            except RuntimeError:
+                pass
+            # The savepoint's ticks are due again within the same transaction
+            assert store.checkpoint(db) == 2
+
+        with get_db() as db:
+            assert store.checkpoint(db) == 0
+            assert [price for (price,) in db.query(PriceTick.price)] == [1.0, 2.0]
+
+    def test_market_status_range(self, bank):
+        """Test 24h high/low in the market status"""
+        from src.services.tick_aggregator import record_tick
+
+        assert bank.get_market_status().data["high_24h"] is None
+        with get_db() as db:
+            record_tick(db, "1.25")
+            record_tick(db, "0.75")
+
+        data = bank.get_market_status().data
+        assert (data["high_24h"], data["low_24h"]) == (1.25, 0.75)
+
+
+class TestDelayedAverages:
+    """Test sliding-window delayed averages"""
+
+    def test_windows_match_brute_force(self):
+        """Test plain and time-weighted means against direct computation"""
+        import random
+        from datetime import timedelta
+
+        from src.services.delayed_average import DelayedAverages
+
+        averages = DelayedAverages([1, 24])
+        start = datetime(2026, 1, 1)
+        rng = random.Random(3)
+        points, at = [], start
+        for _ in range(400):
+            at += timedelta(minutes=rng.choice([1, 1, 2, 10]))
+            points.append((at, Decimal(str(round(rng.uniform(90, 110), 4)))))
+            averages.add(*points[-1])
+        assert not averages.add(start, 100)  # older than the newest point
+
+        for offset in (0, 30, 300):
+            now = at + timedelta(minutes=offset)
+            for hours in (1, 24):
+                cutoff = now - timedelta(hours=hours)
+                inside = [value for time, value in points if time > cutoff]
+                expected = sum(inside) / len(inside) if inside else None
+                assert averages.average(hours, now=now) == expected
+
+                # Step function: each value holds until the next point (or now)
+                area = 0.0
+                for (time, value), following in zip(points, points[1:] + [(now, None)]):
+                    begin, end = max(time, cutoff), min(following[0], now)
+                    if end > begin:
+                        area += float(value) * (end - begin).total_seconds()
+                covered = (now - max(cutoff, points[0][0])).total_seconds()
+                weighted = averages.average(hours, now=now, time_weighted=True)
+                assert float(weighted) == pytest.approx(area / covered)
+
+    def test_market_service_syncs_incrementally(self):
+        """Test that only new snapshots are read and out-of-order rows force a reload"""
+        from datetime import timedelta
+
+        from src.models.market import CirculationStatus, MarketSnapshot
+        from src.services.market_service import MarketService
+
+        def add_snapshot(db, at, value):
+            db.add(
+                MarketSnapshot(
+                    index_value=Decimal(value),
+                    delayed_average=Decimal(value),
+                    carat_price=Decimal("1"),
+                    open_price=Decimal("1"),
+                    high_price=Decimal("1"),
+                    low_price=Decimal("1"),
+                    close_price=Decimal("1"),
+                    total_circulation=Decimal("5000"),
+                    circulation_status=CirculationStatus.HEALTHY,
+                    book_value=Decimal("1"),
+                    reserve_ratio=Decimal("0.2"),
+                    interval_type="minute",
+                    snapshot_time=at,
+                )
+            )
+
+        now = datetime.utcnow()
+        with get_db() as db:
+            add_snapshot(db, now - timedelta(hours=30), "500")  # outside 24h
+            add_snapshot(db, now - timedelta(hours=2), "100")
+            add_snapshot(db, now - timedelta(minutes=30), "110")
+
+        with get_db() as db:
+            service = MarketService(db)
+            assert service.calculate_delayed_average(24) == Decimal("105")
+            assert service.calculate_delayed_average(1) == Decimal("110")
+            assert service.calculate_delayed_average(48) == Decimal("236.6666")  # scanned
+
+        with get_db() as db:
+            add_snapshot(db, now - timedelta(minutes=5), "120")
+        with get_db() as db:
+            assert delayed_averages.sync(db) == 1
+            assert MarketService(db).calculate_delayed_average(24) == Decimal("110")
+
+        with get_db() as db:
+            add_snapshot(db, now - timedelta(hours=3), "90")  # backfilled behind the newest
+        with get_db() as db:
+            assert MarketService(db).calculate_delayed_average(24) == Decimal("105")
+
+        status = ArcaBank().get_market_status().data
+        assert status["delayed_averages"] == {"1h": 115.0, "24h": 105.0, "168h": 184.0}
+
+
+class TestMarketChanges:
+    """Test multi-horizon index changes"""
+
+    def test_all_horizons_in_one_query(self):
+        """Test 1h..YTD changes from a single SELECT against the right snapshots"""
+        from datetime import timedelta
+
+        from sqlalchemy import event
+
+        from src.models.market import CirculationStatus, MarketSnapshot
+        from src.services.market_service import MarketService
+
+        now = datetime(2026, 3, 15, 12, 0)
+        with get_db() as db:
+            for at, value in [
+                (datetime(2025, 12, 31, 23, 0), "80"),  # last before the year starts
+                (datetime(2026, 1, 5), "90"),
+                (now - timedelta(days=8), "100"),
+                (now - timedelta(hours=30), "125"),
+                (now - timedelta(minutes=90), "250"),
+            ]:
+                db.add(
+                    MarketSnapshot(
+                        index_value=Decimal(value),
+                        delayed_average=Decimal(value),
+                        carat_price=Decimal("1"),
+                        open_price=Decimal("1"),
+                        high_price=Decimal("1"),
+                        low_price=Decimal("1"),
+                        close_price=Decimal("1"),
+                        total_circulation=Decimal("5000"),
+                        circulation_status=CirculationStatus.HEALTHY,
+                        book_value=Decimal("1"),
+                        reserve_ratio=Decimal("0.2"),
+                        interval_type="hour",
+                        snapshot_time=at,
+                    )
+                )
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with get_db() as db:
+            event.listen(engine, "before_cursor_execute", count)
+            try:
+                changes = MarketService(db).calculate_changes(
+                    current_value=Decimal("200"), now=now
+                )
+            finally:
+                event.remove(engine, "before_cursor_execute", count)
+
+        assert len(statements) == 1
+        assert changes == {
+            "1h": Decimal("-20"),
+            "24h": Decimal("60"),
+            "7d": Decimal("100"),
+            "30d": Decimal("122.22"),
+            "ytd": Decimal("150"),
+        }
+
+    def test_refresh_exposes_new_horizons(self, bank):
+        """Test that refreshed 30d/YTD changes reach the status and the Java API"""
+        from src.integration.java_interface import JavaModInterface
+        from src.services.market_service import MarketService
+        from src.services.treasury_service import TreasuryService
+
+        with get_db() as db:
+            TreasuryService(db).get_treasury()
+            MarketService(db).refresh_market_index()
+
+        status = bank.get_market_status().data
+        assert status["change_30d"] == 0 and status["change_ytd"] == 0
+
+        market = JavaModInterface().get_market_price()
+        assert {"change_1h", "change_7d", "change_30d", "change_ytd"} <= set(market)
+
+    def test_upgrade_schema_adds_change_columns(self):
+        """Test that older market_index tables gain the new change columns"""
+        from sqlalchemy import create_engine, text
+
+        from src.models.migrations import upgrade_schema
+
+        old_engine = create_engine("sqlite://")
+        with old_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE market_index (id INTEGER PRIMARY KEY)"))
+
+        assert upgrade_schema(old_engine) == [
+            "market_index.version",
+            "market_index.change_30d",
+            "market_index.change_ytd",
+        ]
+
+
+class TestQueryPlans:
+    """Test that hot service queries are answered through indexes"""
+
+    def _seed(self, db, size=2000):
+        """Bulk-load enough rows that the planner has a real choice"""
+        from datetime import timedelta
+
+        from sqlalchemy import text
+
+        from src.models.currency import CurrencyBalance
+        from src.models.market import CirculationStatus, MarketSnapshot
+        from src.models.trade import ItemCategory, MarketPrice, TradeReport, TradeType
+        from src.models.treasury import TreasuryTransaction
+
+        now = datetime.utcnow()
+        db.bulk_insert_mappings(
+            User,
+            [{"discord_id": str(n), "discord_username": f"user{n}"} for n in range(1, 201)],
+        )
+        db.bulk_insert_mappings(
+            CurrencyBalance,
+            [
+                {"user_id": n, "currency_type": currency, "balance": Decimal("10")}
+                for n in range(1, 201)
+                for currency in CurrencyType
+            ],
+        )
+        db.bulk_insert_mappings(
+            TradeReport,
+            [
+                {
+                    "reporter_id": n % 200 + 1,
+                    "trade_type": TradeType.BUY,
+                    "item_name": f"Item {n % 50}",
+                    "carat_amount": Decimal("5"),
+                    "trade_timestamp": now - timedelta(minutes=n),
+                    "reported_at": now - timedelta(minutes=n),
+                }
+                for n in range(size)
+            ],
+        )
+        db.bulk_insert_mappings(
+            TreasuryTransaction,
+            [
+                {
+                    "transaction_type": (
+                        TransactionType.MINT if n % 2 else TransactionType.DEPOSIT
+                    ),
+                    "carat_amount": Decimal("1"),
+                    "treasury_diamonds_after": Decimal("100"),
+                    "treasury_carats_after": Decimal("1000"),
+                    "book_value_after": Decimal("0.1"),
+                    "created_at": now - timedelta(minutes=n),
+                }
+                for n in range(size)
+            ],
+        )
+        db.bulk_insert_mappings(
+            MarketSnapshot,
+            [
+                {
+                    "index_value": Decimal("100"),
+                    "delayed_average": Decimal("100"),
+                    "carat_price": Decimal("1"),
+                    "open_price": Decimal("1"),
+                    "high_price": Decimal("1"),
+                    "low_price": Decimal("1"),
+                    "close_price": Decimal("1"),
+                    "total_circulation": Decimal("5000"),
+                    "circulation_status": CirculationStatus.HEALTHY,
+                    "book_value": Decimal("1"),
+                    "reserve_ratio": Decimal("0.2"),
+                    "interval_type": ("minute", "hour", "day")[n % 3],
+                    "snapshot_time": now - timedelta(minutes=n),
+                }
+                for n in range(size)
+            ],
+        )
+        db.bulk_insert_mappings(
+            MarketPrice,
+            [
+                {
+                    "item_category": ItemCategory.OTHER,
+                    "item_name": f"Item {n}",
+                    "item_key": f"item {n}",
+                    "current_price": Decimal("5"),
+                    "volume_24h": Decimal(n),
+                    "last_trade_at": now - timedelta(hours=n % 72),
+                }
+                for n in range(size)
+            ],
+        )
+        db.execute(text("ANALYZE"))
+
+    def test_hot_queries_avoid_full_scans(self):
+        """Test that no service query scans a large table on a seeded database"""
+        from src.models.query_audit import QueryPlanAudit
+        from src.services.currency_service import CurrencyService
+        from src.services.market_service import MarketService
+        from src.services.mint_service import MintService
+        from src.services.trade_service import TradeService
+
+        with get_db() as db:
+            self._seed(db)
+
+        with get_db() as db:
+            user = db.query(User).filter(User.discord_id == "42").first()
+            # Single-row tables are read whole by design
+            with QueryPlanAudit(engine, allowed_tables={"treasury", "market_index"}) as audit:
+                market = MarketService(db)
+                for interval_type in ("minute", "hour", "day"):
+                    market.get_snapshots(interval_type=interval_type, days=1)
+                market.calculate_changes(current_value=Decimal("100"))
+                mint = MintService(db)
+                mint._check_mint_limit(Decimal("1"), CurrencyType.CARAT)
+                mint.get_mint_history(days=1)
+                trades = TradeService(db)
+                trades.get_user_trades(user, days=1)
+                trades.get_trending_items()
+                CurrencyService(db).get_or_create_balance(user, CurrencyType.CARAT)
+
+        assert audit.statements >= 9
+        assert audit.full_scans == []
+
+    def test_audit_reports_full_scans(self):
+        """Test that an unindexed filter is reported"""
+        from src.models.query_audit import QueryPlanAudit
+        from src.models.trade import TradeReport
+
+        with get_db() as db:
+            with QueryPlanAudit(engine) as audit:
+                db.query(TradeReport).filter(TradeReport.item_name == "Diamond").all()
+
+        assert [table for table, _ in audit.full_scans] == ["trade_reports"]
+
+    def test_upgrade_schema_adds_composite_indexes(self):
+        """Test that older tables gain the composite indexes"""
+        from sqlalchemy import create_engine, inspect, text
+
+        from src.models.migrations import upgrade_schema
+
+        old_engine = create_engine("sqlite://")
+        with old_engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE TABLE trade_reports "
+                    "(id INTEGER PRIMARY KEY, reporter_id INTEGER, reported_at DATETIME)"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE TABLE currency_balances "
+                    "(id INTEGER PRIMARY KEY, user_id INTEGER, currency_type VARCHAR(12))"
+                )
+            )
+
+        assert upgrade_schema(old_engine) == [
+            "ix_trade_reports_reporter_reported",
+            "ix_currency_balances_user_currency",
+        ]
+        columns = {
+            index["name"]: index["column_names"]
+            for index in inspect(old_engine).get_indexes("trade_reports")
+        }
+        assert columns["ix_trade_reports_reporter_reported"] == ["reporter_id", "reported_at"]
+        assert upgrade_schema(old_engine) == []
+
+
+class TestFeeShards:
+    """Test sharded fee accumulation and folding into the treasury"""
+
+    def _fund(self, bank, discord_id, amount):
+        from src.services.currency_service import CurrencyService
+        from src.services.user_service import UserService
+
+        bank.register_user(discord_id, discord_id.title())
+        with get_db() as db:
+            CurrencyService(db).add_balance(
+                UserService(db).get_by_discord_id(discord_id), CurrencyType.CARAT, Decimal(amount)
+            )
+
+    def test_fees_skip_treasury_row_until_folded(self, bank):
+        """Test that fees are reported at once but only written to the treasury by a fold"""
+        from src.models.treasury import Treasury, TreasuryFeeShard
+        from src.services.treasury_service import TreasuryService
+
+        self._fund(bank, "sender", "1000")
+        bank.register_user("recipient", "Recipient")
+        bank.get_treasury_status()
+        version = singleton_cache.get_stats()["versions"]["Treasury"]
+
+        for _ in range(4):
+            assert bank.transfer("sender", "recipient", 100, "carat").success
+
+        # 1.5% of 100, four times
+        assert singleton_cache.get_stats()["versions"]["Treasury"] == version
+        assert bank.get_treasury_status().data["accumulated_fees"] == 6
+
+        with get_db() as db:
+            assert TreasuryService(db).fold_fees() == Decimal("6")
+        with get_db() as db:
+            assert db.query(Treasury).first().accumulated_fees_carats == Decimal("6")
+            assert all(shard.pending_carats == 0 for shard in db.query(TreasuryFeeShard))
+            assert TreasuryService(db).fold_fees() == 0
+
+        assert bank.get_treasury_status().data["accumulated_fees"] == 6
+
+    def test_rolled_back_fee_is_not_pending(self, bank):
+        """Test that a fee from a failed transaction never reaches the shards"""
+        from src.services.treasury_service import TreasuryService
+
+        bank.get_treasury_status()
+        with pytest.raises(RuntimeError):
+            with get_db() as db:
+                TreasuryService(db).collect_fee(Decimal("5"), TransactionType.FEE_COLLECTION)
+                raise RuntimeError("abort")
+
+        with get_db() as db:
+            TreasuryService(db).collect_fee(Decimal("2"), TransactionType.FEE_COLLECTION)
+
+        assert bank.get_treasury_status().data["accumulated_fees"] == 2
+
+    def test_concurrent_fees_do_not_conflict(self, bank):
+        """Test that racing fee-bearing transfers neither fail nor lose fees"""
+        from src.services.treasury_service import TreasuryService
+
+        self._fund(bank, "sender", "10000")
+        bank.register_user("recipient", "Recipient")
+        bank.get_treasury_status()
+
+        barrier = threading.Barrier(8)
+        results = []
+
+        def worker():
+            barrier.wait()
+            for _ in range(10):
+                results.append(bank.transfer("sender", "recipient", 100, "carat"))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert [result.error for result in results if not result.success] == []
+        assert bank.get_treasury_status().data["accumulated_fees"] == 120
+
+        with get_db() as db:
+            TreasuryService(db).fold_fees()
+        assert bank.get_treasury_status().data["accumulated_fees"] == 120
+
+    def _rows(self):
+        """Every row in the database, keyed by (table, primary key)"""
+        with get_db() as db:
+            return {
+                (table.name, tuple(row._mapping[c.name] for c in table.primary_key)): tuple(row)
+                for table in Base.metadata.sorted_tables
+                for row in db.execute(table.select())
+            }
+
+    def _changed(self, before, after):
+        return {key for key in after.keys() | before.keys() if before.get(key) != after.get(key)}
+
+    def test_fee_sessions_touch_disjoint_rows(self, monkeypatch):
+        """Test that fee-bearing transactions on different shards update no common row"""
+        import types
+
+        from src.services import fee_shards as fee_shards_module
+        from src.services.treasury_service import TreasuryService
+
+        picks = iter([0, 1, 2])
+        monkeypatch.setattr(
+            fee_shards_module, "random", types.SimpleNamespace(randrange=lambda n: next(picks))
+        )
+
+        # Create the treasury, rollups and volume buckets first
+        with get_db() as db:
+            TreasuryService(db).collect_fee(Decimal("1"), TransactionType.FEE_COLLECTION)
+
+        touched = []
+        for amount in ("2", "3"):
+            before = self._rows()
+            with get_db() as db:
+                TreasuryService(db).collect_fee(Decimal(amount), TransactionType.FEE_COLLECTION)
+            touched.append(self._changed(before, self._rows()))
+
+        first, second = touched
+        assert {table for table, _ in first} == {
+            "treasury_transactions",
+            "treasury_fee_shards",
+            "treasury_rollup_shards",
+            "volume_buckets",
+        }
+        assert first & second == set()
+
+        with get_db() as db:
+            summary = TreasuryService(db).get_inflow_outflow(days=1)
+            assert summary["total_fees_collected"] == Decimal("6")
+            assert summary["transaction_count"] == 3
+
+
+class TestGroupCommit:
+    """Test batched commits of write operations"""
+
+    def test_concurrent_transfers_share_commits(self):
+        """Test that concurrent bank writes are committed in batches with their own results"""
+        from src.models.group_commit import get_group_commit_writer, stop_group_commit_writer
+        from src.services.currency_service import CurrencyService
+        from src.services.user_service import UserService
+
+        bank = ArcaBank(group_commit=True)
+        writer = get_group_commit_writer()
+        try:
+            assert bank.register_user("sender", "Sender").success
+            assert bank.register_user("recipient", "Recipient").success
+            with get_db() as db:
+                CurrencyService(db).add_balance(
+                    UserService(db).get_by_discord_id("sender"), CurrencyType.CARAT, Decimal("500")
+                )
+            batches = writer.batches
+
+            barrier = threading.Barrier(8)
+            results = []
+
+            def worker():
+                barrier.wait()
+                for _ in range(10):
+                    results.append(bank.transfer("sender", "recipient", 10, "carat"))
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            stop_group_commit_writer()
+
+        # 500 carats cover 50 of the 80 transfers; the rest fail on their own
+        assert sum(result.success for result in results) == 50
+        assert {result.message for result in results if not result.success} == {
+            "Insufficient carat balance"
+        }
+        assert writer.batches - batches < 80
+        assert bank.get_balance("sender").data["carats"] == 0
+        assert bank.get_treasury_status().data["accumulated_fees"] == 7.5
+
+    def test_failed_operation_is_isolated(self):
+        """Test that an operation that raises is rolled back without its batch"""
+        from src.models.group_commit import GroupCommitWriter
+
+        def register(discord_id, fail=False):
+            with get_db() as db:
+                db.add(User(discord_id=discord_id, discord_username=discord_id))
+                db.flush()
+                if fail:
+                    raise ValueError("rejected")
+            return discord_id
+
+        writer = GroupCommitWriter(max_batch=3, max_wait_ms=5000)
+        try:
+            futures = [
+                writer.submit(register, "first"),
+                writer.submit(register, "second", fail=True),
+                writer.submit(register, "third"),
+            ]
+            assert futures[0].result(timeout=10) == "first"
+            with pytest.raises(ValueError):
+                futures[1].result(timeout=10)
+            assert futures[2].result(timeout=10) == "third"
+        finally:
+            writer.stop()
+
+        assert writer.batches == 1
+        with get_db() as db:
+            assert sorted(user.discord_id for user in db.query(User)) == ["first", "third"]
+
+    def test_commit_failure_fails_whole_batch(self):
+        """Test that every operation in a batch whose commit fails gets the error"""
+        from sqlalchemy import event
+
+        from src.models.group_commit import GroupCommitWriter
+
+        def register(discord_id, break_commit=False):
+            with get_db() as db:
+                db.add(User(discord_id=discord_id, discord_username=discord_id))
+                if break_commit:
+
+                    def fail(session):
+                        raise RuntimeError("disk full")
+
+                    event.listen(db, "before_commit", fail)
+
+        writer = GroupCommitWriter(max_batch=2, max_wait_ms=5000)
+        try:
+            futures = [writer.submit(register, "first"), writer.submit(register, "second", True)]
+            for future in futures:
+                with pytest.raises(RuntimeError, match="disk full"):
+                    future.result(timeout=10)
+        finally:
+            writer.stop()
+
+        with get_db() as db:
+            assert db.query(User).count() == 0
+
+    def test_begin_failure_fails_every_submitter(self, monkeypatch):
+        """Test that a batch whose transaction cannot open resolves all its futures"""
+        from sqlalchemy.exc import OperationalError
+
+        from src.models.group_commit import GroupCommitWriter
+
+        def locked(session):
+            raise OperationalError("BEGIN IMMEDIATE", {}, Exception("database is locked"))
+
+        monkeypatch.setattr(GroupCommitWriter, "_begin", staticmethod(locked))
+
+        writer = GroupCommitWriter(max_batch=3, max_wait_ms=5000)
+        try:
+            futures = [writer.submit(lambda n=n: n) for n in range(3)]
+            for future in futures:
+                with pytest.raises(OperationalError, match="database is locked"):
+                    future.result(timeout=10)
+        finally:
+            writer.stop()
+
+        assert writer.get_stats()["batches"] == 0
+        assert writer.get_stats()["operations"] == 0
+        assert writer.get_stats()["failed_batches"] == 1
+
+    def test_caller_wait_is_bounded(self):
+        """Test that a bank write fails after the timeout instead of blocking forever"""
+        from src.models.group_commit import get_group_commit_writer, stop_group_commit_writer
+
+        bank = ArcaBank(group_commit=True)
+        writer = get_group_commit_writer()
+        timeout = writer.timeout
+        release = threading.Event()
+        writer.timeout = 0.2
+        try:
+            blocker = writer.submit(release.wait, 10)
+            result = bank.register_user("12345", "TestUser")
+        finally:
+            release.set()
+            writer.timeout = timeout
+            blocker.result(timeout=10)
+            stop_group_commit_writer()
+
+        assert not result.success
+        assert result.error == "Timed out waiting for the group-commit writer"
+        with get_db() as db:
+            assert db.query(User).count() == 0
+
+
+class TestSqliteProfile:
+    """Test SQLite connection pragmas and pooling"""
+
+    def _pragmas(self, engine):
+        with engine.connect() as conn:
+            return {
+                name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size")
+            }
+
+    def test_tuned_profile_applies_pragmas(self, tmp_path):
+        """Test that every pooled connection gets WAL, NORMAL sync and a busy timeout"""
+        from src.config import database
+        from src.models.base import create_db_engine
+
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}", sqlite_profile="tuned")
+        try:
+            assert self._pragmas(engine) == {
+                "journal_mode": "wal",
+                "synchronous": 1,
+                "busy_timeout": database.SQLITE_BUSY_TIMEOUT_MS,
+                "cache_size": -database.SQLITE_CACHE_SIZE_KB,
+            }
+            # A connection opened after the pool is reset is tuned as well
+            engine.dispose()
+            assert self._pragmas(engine)["synchronous"] == 1
+            assert engine.pool._pre_ping == database.POOL_PRE_PING
+        finally:
+            engine.dispose()
+
+    def test_default_profile_keeps_sqlite_settings(self, tmp_path):
+        """Test that the default profile leaves the journal and sync mode alone"""
+        from src.models.base import create_db_engine
+
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'plain.db'}", sqlite_profile="default")
+        try:
+            pragmas = self._pragmas(engine)
+            assert pragmas["journal_mode"] == "delete"
+            assert pragmas["synchronous"] == 2
+        finally:
+            engine.dispose()
+
+    def test_unknown_profile_is_rejected(self):
+        """Test that a misspelled profile fails loudly"""
+        from src.models.base import create_db_engine
+
+        with pytest.raises(ValueError):
+            create_db_engine("sqlite://", sqlite_profile="fast")
+
+    def test_readers_not_blocked_by_open_write(self, tmp_path):
+        """Test that WAL lets a reader see committed data while a write is in progress"""
+        from sqlalchemy import text
+
+        from src.models.base import create_db_engine
+
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'wal.db'}", sqlite_profile="tuned")
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE TABLE t (v INTEGER)"))
+                conn.execute(text("INSERT INTO t VALUES (1)"))
+
+            with engine.connect() as writer, engine.connect() as reader:
+                writer.exec_driver_sql("BEGIN EXCLUSIVE")
+                writer.execute(text("UPDATE t SET v = 2"))
+                reader.exec_driver_sql("PRAGMA busy_timeout=0")
+                assert reader.execute(text("SELECT v FROM t")).scalar() == 1
+                writer.commit()
+        finally:
+            engine.dispose()
+
+
+class TestReadRouting:
+    """Test read-only sessions and read-your-writes routing"""
+
+    def test_read_session_rejects_writes(self):
+        """Test that read sessions use their own query_only pool"""
+        from sqlalchemy import text
+        from sqlalchemy.exc import OperationalError
+
+        from src.models.base import get_read_db, read_engine
+
+        assert read_engine is not engine
+        with get_read_db() as db:
+            assert db.get_bind() is read_engine
+            with pytest.raises(OperationalError):
+                db.execute(text("DELETE FROM users"))
+
+    def test_read_session_sees_commits(self, bank):
+        """Test that a read right after a write returns the written data"""
+        from src.services.currency_service import CurrencyService
+
+        bank.register_user("12345", "TestUser")
+        with get_db() as db:
+            user = db.query(User).filter_by(discord_id="12345").one()
+            CurrencyService(db).add_balance(user, CurrencyType.CARAT, Decimal("42"))
+
+        result = bank.get_user_info("12345")
+        assert result.success
+        assert result.data["carats"] == 42
+        assert bank.get_balance("12345").data["carats"] == 42
+
+    def test_new_user_reads_zero_balances(self, bank):
+        """Test that reading a user without balance rows neither fails nor creates them"""
+        from src.models.currency import CurrencyBalance
+
+        bank.register_user("12345", "TestUser")
+
+        result = bank.get_user_info("12345")
+        assert result.success
+        assert result.data["carats"] == 0
+        assert result.data["golden_carats"] == 0
+        with get_db() as db:
+            assert db.query(CurrencyBalance).count() == 0
+
+    def test_replica_reads_pinned_to_primary_after_write(self, monkeypatch):
+        """Test that reads go to the primary only within the window after a commit"""
+        from src.config import database
+        from src.models import base
+        from src.models.base import get_read_db, read_engine
+
+        monkeypatch.setattr(database, "READ_DATABASE_URL", "sqlite:///replica.db")
+        monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 5.0)
+        monkeypatch.setattr(base, "_last_write", float("-inf"))
+
+        with get_read_db() as db:
+            assert db.get_bind() is read_engine
+
+        # A session that only reads does not count as a write
+        with get_db() as db:
+            db.query(User).count()
+        with get_read_db() as db:
+            assert db.get_bind() is read_engine
+
+        with get_db() as db:
+            db.add(User(discord_id="12345", discord_username="TestUser"))
+        with get_read_db() as db:
+            assert db.get_bind() is engine
+
+        monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 0.0)
+        with get_read_db() as db:
+            assert db.get_bind() is read_engine
+
+    def test_rolled_back_write_does_not_pin_reads(self, monkeypatch):
+        """Test that a failed write leaves reads on the replica"""
+        from src.config import database
+        from src.models import base
+        from src.models.base import get_read_db, read_engine
+
+        monkeypatch.setattr(database, "READ_DATABASE_URL", "sqlite:///replica.db")
+        monkeypatch.setattr(base, "_last_write", float("-inf"))
+
+        with pytest.raises(RuntimeError):
+            with get_db() as db:
+                db.add(User(discord_id="12345", discord_username="TestUser"))
+                db.flush()
+                raise RuntimeError("abort")
+
+        with get_read_db() as db:
+            assert db.get_bind() is read_engine
+
+
+class TestChartCache:
+    """Test the rendered chart PNG cache"""
+
+    def test_repeat_chart_served_until_new_snapshot(self, bank):
+        """Test that charts are cached per data version and parameters"""
+        from datetime import timedelta
+
+        TestSnapshotStore()._add_snapshots(10)
+
+        first = bank.get_market_chart(days=7)
+        assert bank.get_market_chart(days=7) is first
+        assert bank.get_market_chart(days=1) is not first
+        assert chart_cache.get_stats()["hits"] == 1
+
+        TestSnapshotStore()._add_snapshots(1, start=datetime.utcnow() - timedelta(minutes=1))
+        assert bank.get_market_chart(days=7) is not first
+
+    def test_lru_eviction_and_disk_persistence(self, tmp_path):
+        """Test byte-bounded eviction and reloading entries from disk"""
+        from src.services.chart_cache import ChartCache
+
+        cache = ChartCache(max_bytes=10, cache_dir=str(tmp_path))
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.get("a")
+        cache.put("c", b"123")
+
+        assert cache.get("b") is None
+        assert cache.get_stats()["bytes"] == 8
+        assert len(list(tmp_path.glob("chart_*.png"))) == 2
+
+        restarted = ChartCache(max_bytes=10, cache_dir=str(tmp_path))
+        assert restarted.get("c") == b"123"
+        assert restarted.get_or_render("c", lambda: b"unused") == b"123"
+
+    def test_disk_pruned_to_limit(self, tmp_path):
+        """Test that files from other runs are pruned oldest first, with stale temp files"""
+        import os
+        import time
+
+        from src.services.chart_cache import ChartCache
+
+        old = time.time() - 3600
+        for i in range(4):
+            path = tmp_path / f"chart_{i}.png"
+            path.write_bytes(b"1234")
+            os.utime(path, (old + i, old + i))
+        (tmp_path / "chart_x.png.1.2.tmp").write_bytes(b"partial")
+        os.utime(tmp_path / "chart_x.png.1.2.tmp", (old, old))
+        (tmp_path / "chart_y.png.1.3.tmp").write_bytes(b"writing")  # in progress
+
+        def names():
+            return sorted(path.name for path in tmp_path.iterdir())
+
+        # Startup: 16 bytes of charts against a 10 byte limit
+        cache = ChartCache(max_bytes=10, cache_dir=str(tmp_path))
+        assert names() == ["chart_2.png", "chart_3.png", "chart_y.png.1.3.tmp"]
+
+        # A write from this process pushes out the oldest remaining file
+        cache.put("a", b"12345")
+        assert len(names()) == 3
+        assert "chart_2.png" not in names() and "chart_3.png" in names()
+        assert sum(path.stat().st_size for path in tmp_path.glob("chart_*.png")) <= 10
+
+    def test_concurrent_misses_render_once(self):
+        """Test that threads missing the same key share one render"""
+        import time
+
+        from src.services.chart_cache import ChartCache
+
+        cache = ChartCache(max_bytes=1024)
+        renders = []
+
+        def render():
+            renders.append(1)
+            time.sleep(0.05)
+            return b"png"
+
+        threads = [
+            threading.Thread(target=cache.get_or_render, args=("key", render)) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(renders) == 1
+
+
+class TestIndicators:
+    """Test the vectorized technical indicators"""
+
+    PRICES = [1.0, 1.02, 1.01, 1.05, 1.04, 1.08, 1.07, 1.03, 1.06, 1.1] * 6
+
+    def test_moving_averages_match_reference(self):
+        """Test SMA and Bollinger Bands against direct window computations"""
+        import statistics
+
+        from src.services import indicators
+
+        sma = indicators.sma(self.PRICES, 20)
+        middle, upper, lower = indicators.bollinger_bands(self.PRICES, 20)
+
+        assert all(v != v for v in sma[:19])  # NaN warm-up
+        for i in range(19, len(self.PRICES)):
+            window = self.PRICES[i - 19 : i + 1]
+            std = statistics.pstdev(window)
+            assert sma[i] == pytest.approx(sum(window) / 20)
+            assert upper[i] == pytest.approx(middle[i] + 2 * std)
+            assert lower[i] == pytest.approx(middle[i] - 2 * std)
+
+    def test_recursive_indicators_match_reference(self):
+        """Test EMA and Wilder RSI against step-by-step recurrences"""
+        from src.services import indicators
+
+        prices = self.PRICES * 20  # long enough to span several EWM blocks
+
+        alpha = 2 / 27
+        expected = sum(prices[:26]) / 26
+        ema = indicators.ema(prices, 26)
+        for i in range(26, len(prices)):
+            expected = alpha * prices[i] + (1 - alpha) * expected
+        assert ema[-1] == pytest.approx(expected)
+
+        changes = [b - a for a, b in zip(prices, prices[1:])]
+        avg_gain = sum(max(c, 0) for c in changes[:14]) / 14
+        avg_loss = sum(max(-c, 0) for c in changes[:14]) / 14
+        for change in changes[14:]:
+            avg_gain = (avg_gain * 13 + max(change, 0)) / 14
+            avg_loss = (avg_loss * 13 + max(-change, 0)) / 14
+        rsi = indicators.rsi(prices, 14)
+        assert rsi[-1] == pytest.approx(100 - 100 / (1 + avg_gain / avg_loss))
+        assert rsi[13] != rsi[13] and rsi[14] == rsi[14]
+
+        assert indicators.rsi([1.0, 2.0, 3.0], 2)[-1] == 100.0
+        assert list(indicators.vwap([1.0, 2.0, 4.0], [0.0, 1.0, 3.0])) == [1.0, 2.0, 3.5]
+
+    def test_bank_exposes_indicator_series(self, bank):
+        """Test that get_market_indicators returns JSON-friendly series"""
+        TestSnapshotStore()._add_snapshots(40)
+
+        result = bank.get_market_indicators(days=7)
+
+        assert result.success
+        assert result.data["points"] == 40
+        series = result.data["series"]
+        assert len(series["rsi_14"]) == 40
+        assert series["sma_21"][19] is None
+        expected_sma = sum(1.33 + i / 100 for i in range(7)) / 7
+        assert result.data["latest"]["sma_7"] == pytest.approx(expected_sma)
+        assert result.data["latest"]["macd_signal"] is not None
+
+
+class TestAsyncBank:
+    """Test the async executor bridge"""
+
+    def test_async_calls_match_sync_results(self, bank):
+        """Test that awaited calls return the same results as direct calls"""
+        from src.api.async_bank import AsyncArcaBank
+
+        async_bank = AsyncArcaBank(bank)
+
+        async def run():
+            await async_bank.register_user("12345", "TestUser")
+            return await asyncio.gather(
+                async_bank.get_balance("12345"),
+                async_bank.get_market_status(),
+                async_bank.get_treasury_status(),
+            )
+
+        try:
+            balance, market, treasury = asyncio.run(run())
+        finally:
+            async_bank.shutdown()
+
+        assert balance.success and balance.data["carats"] == 0
+        assert market.success
+        assert treasury.success
+
+        stats = async_bank.get_stats()["default"]
+        assert stats["calls"]["get_balance"]["calls"] == 1
+        assert stats["in_flight"] == 0
+
+    def test_reject_backpressure(self):
+        """Test that a saturated pool rejects calls in reject mode"""
+        from src.api.async_bank import BlockingExecutor, ExecutorBusyError
+
+        pool = BlockingExecutor(max_workers=1, max_queue_depth=1, backpressure="reject")
+        release = threading.Event()
+
+        async def run():
+            slow = asyncio.ensure_future(pool.run("slow", release.wait, 5))
+            await asyncio.sleep(0.05)
+            with pytest.raises(ExecutorBusyError):
+                await pool.run("fast", lambda: None)
+            release.set()
+            return await slow
+
+        try:
+            assert asyncio.run(run()) is True
+        finally:
+            pool.shutdown()
+
+        assert pool.get_stats()["calls"]["fast"]["rejected"] == 1
+
+
+class TestSingletonCache:
+    """Test the Treasury/MarketIndex write-through cache"""
+
+    def test_status_reads_skip_database_when_cached(self, bank):
+        """Test that repeated status reads are served without SQL"""
+        from sqlalchemy import event
+
+        bank.get_treasury_status()
+        bank.get_market_status()
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            assert bank.get_treasury_status().success
+            assert bank.get_market_status().success
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert statements == []
+
+    def test_commit_writes_through_new_version(self, bank):
+        """Test that a committed treasury update is visible with a bumped version"""
+        from src.services.treasury_service import TreasuryService
+
+        bank.get_treasury_status()
+        version = singleton_cache.get_stats()["versions"]["Treasury"]
+
+        with get_db() as db:
+            TreasuryService(db).get_treasury().total_diamonds = Decimal("500")
+
+        assert singleton_cache.get_stats()["versions"]["Treasury"] == version + 1
+        assert bank.get_treasury_status().data["total_diamonds"] == 500
+
+    def test_rollback_does_not_publish(self, bank):
+        """Test that rolled back changes never reach the cache"""
+        from src.services.treasury_service import TreasuryService
+
+        bank.get_treasury_status()
+
+        with pytest.raises(RuntimeError):
+            with get_db() as db:
+                TreasuryService(db).get_treasury().total_diamonds = Decimal("500")
+                db.flush()
+                raise RuntimeError("abort")
+
+        assert bank.get_treasury_status().data["total_diamonds"] == 0
+
+    def test_released_savepoint_does_not_publish(self, bank):
+        """Test that a savepoint released inside a rolled-back transaction publishes nothing"""
+        from src.services.treasury_service import TreasuryService
+
+        bank.get_treasury_status()
+
+        with pytest.raises(RuntimeError):
+            with get_db() as db:
+                TreasuryService(db).get_treasury().total_diamonds = Decimal("500")
+                db.flush()
+                with db.begin_nested():
+                    pass
+                raise RuntimeError("abort")
+
+        assert bank.get_treasury_status().data["total_diamonds"] == 0
+
+    def test_concurrent_update_is_rejected(self, bank):
+        """Test that a write based on an outdated row version fails"""
+        from sqlalchemy.orm.exc import StaleDataError
+
+        from src.models.base import SessionLocal
+        from src.models.treasury import Treasury
+
+        bank.get_treasury_status()
+
+        first, second = SessionLocal(), SessionLocal()
+        try:
+            stale = second.query(Treasury).first()
+            fresh = first.query(Treasury).first()
+            fresh.total_diamonds = Decimal("10")
+            first.commit()
+
+            stale.total_diamonds = Decimal("20")
+            with pytest.raises(StaleDataError):
+                second.commit()
+        finally:
+            first.close()
+            second.close()
+
+    def test_upgrade_schema_adds_version_column(self):
+        """Test that older databases gain the version column"""
+        from sqlalchemy import create_engine, inspect, text
+
+        from src.models.migrations import upgrade_schema
+
+        old_engine = create_engine("sqlite://")
+        with old_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE treasury (id INTEGER PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO treasury (id) VALUES (1)"))
+
+        assert upgrade_schema(old_engine) == ["treasury.version"]
+        assert upgrade_schema(old_engine) == []
+
+        columns = {c["name"] for c in inspect(old_engine).get_columns("treasury")}
+        assert "version" in columns
+
+
+class TestBulkTradeReports:
+    """Test batched trade ingestion"""
+
+    UUIDS = ["00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"]
+
+    def _trades(self):
+        return [
+            {
+                "minecraft_uuid": self.UUIDS[i % 2],
+                "trade_type": "BUY" if i % 3 else "SELL",
+                "item_name": "Diamond Sword" if i % 2 else "diamond sword",
+                "item_quantity": 1 + i % 4,
+                "carat_amount": 10.0 + i,
+            }
+            for i in range(12)
+        ]
+
+    def _state(self):
+        from src.models.trade import MarketPrice, TraderStats
+
+        with get_db() as db:
+            stats = [
+                (t.user_id, t.total_trades, t.buy_count, t.sell_count, t.total_volume_carats)
+                for t in db.query(TraderStats).order_by(TraderStats.user_id)
+            ]
+            prices = [
+                (p.item_name.lower(), p.current_price, p.trade_count_24h, p.volume_24h)
+                for p in db.query(MarketPrice)
+            ]
+        return stats, prices
+
+    def _register(self):
+        from src.integration.java_interface import JavaModInterface
+
+        interface = JavaModInterface()
+        for i, uuid in enumerate(self.UUIDS):
+            interface.register_player(uuid, f"Player{i}")
+        return interface
+
+    def test_bulk_matches_sequential_reports(self, bank):
+        """Test that one batch yields the same stats and prices as single reports"""
+        self._register()
+        for trade in self._trades():
+            assert bank.report_trade_by_uuid(**trade).success
+        sequential = self._state()
+
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        singleton_cache.clear()
+
+        interface = self._register()
+        result = interface.report_trades_bulk(self._trades())
+
+        assert result["success"]
+        assert len(result["accepted"]) == 12
+        assert self._state() == sequential
+
+    def test_invalid_entries_rejected_individually(self, bank):
+        """Test that bad entries are reported by index while the rest are stored"""
+        from sqlalchemy import event
+
+        interface = self._register()
+        trades = self._trades()
+        trades[1]["minecraft_uuid"] = "unknown"
+        trades[2]["trade_type"] = "STEAL"
+        trades[3]["item_quantity"] = 0
+        # Count the singleton loads too, as on a cold process
+        singleton_cache.clear()
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            result = interface.report_trades_bulk(trades)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert [r["index"] for r in result["rejected"]] == [1, 2, 3]
+        assert [a["index"] for a in result["accepted"]] == [0] + list(range(4, 12))
+        # Lookups are per batch, not per trade
+        assert sum(statement.startswith("SELECT") for statement in statements) == 4
+
+        stats, prices = self._state()
+        assert sum(s[1] for s in stats) == 9
+        assert prices[0][2] == 9
+
+    def test_malformed_entries_rejected_individually(self, bank):
+        """Test that missing fields and unparseable numbers reject only their entry"""
+        interface = self._register()
+        trades = self._trades()[:6]
+        del trades[1]["item_name"]
+        trades[2]["carat_amount"] = "lots"
+        trades[3]["item_quantity"] = "three"
+        trades[4]["carat_amount"] = "Infinity"
+        trades[5] = "not a trade"
+
+        result = interface.report_trades_bulk(trades)
+
+        assert result["success"]
+        assert [a["index"] for a in result["accepted"]] == [0]
+        assert result["rejected"] == [
+            {"index": 1, "error": "Missing field: item_name"},
+            {"index": 2, "error": "Invalid quantity or amount"},
+            {"index": 3, "error": "Invalid quantity or amount"},
+            {"index": 4, "error": "Trade amounts must be finite"},
+            {"index": 5, "error": "Trade entry must be an object"},
+        ]
+
+
+class TestItemKeys:
+    """Test normalized item-key lookups"""
+
+    def test_lookup_by_normalized_key(self, bank):
+        """Test that price checks match regardless of case, spacing, and underscores"""
+        bank.register_user("12345", "Trader")
+        bank.report_trade("12345", "SELL", "Diamond Sword", 1, 20.0)
+        bank.report_trade("12345", "SELL", "diamond_sword", 1, 30.0)
+
+        result = bank.get_item_price("  DIAMOND   sword ")
+
+        assert result.success
+        assert result.data["trade_count_24h"] == 2
+        assert len(item_ids) == 1
+
+    def test_stale_cached_id_falls_back_to_query(self, bank):
+        """Test that a cached id pointing at another row is not trusted"""
+        from src.models.trade import MarketPrice
+
+        bank.register_user("12345", "Trader")
+        bank.report_trade("12345", "SELL", "Elytra", 1, 100.0)
+        bank.report_trade("12345", "SELL", "Totem", 1, 40.0)
+
+        with get_db() as db:
+            totem_id = db.query(MarketPrice.id).filter(MarketPrice.item_key == "totem").scalar()
+        item_ids.put("elytra", totem_id)
+
+        assert bank.get_item_price("Elytra").data["item_name"] == "Elytra"
+
+    def test_concurrently_created_price_row_is_reused(self, bank, monkeypatch):
+        """Test that a first trade losing the insert race folds into the winner's row"""
+        from src.models.trade import MarketPrice
+        from src.services.trade_service import TradeService
+
+        bank.register_user("12345", "Trader")
+        bank.report_trade("12345", "SELL", "Elytra", 1, 100.0)
+
+        # As if another writer inserted the row between this trade's lookup and insert
+        monkeypatch.setattr(TradeService, "get_item_price", lambda self, item_name: None)
+        result = bank.report_trade("12345", "SELL", "elytra", 1, 50.0)
+        assert result.success
+
+        with get_db() as db:
+            market_price = db.query(MarketPrice).one()
+            assert market_price.trade_count_24h == 2
+            assert Decimal(market_price.current_price) == Decimal("85")
+            assert Decimal(market_price.volume_24h) == Decimal("150")
+
+    def test_upgrade_backfills_and_merges_keys(self):
+        """Test that the migration fills item_key and merges case variants"""
+        from sqlalchemy import create_engine, inspect, text
+
+        from src.models.migrations import upgrade_schema
+
+        old_engine = create_engine("sqlite://")
+        with old_engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE TABLE market_prices (id INTEGER PRIMARY KEY, item_name VARCHAR, "
+                    "trade_count_24h INTEGER, volume_24h NUMERIC)"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO market_prices VALUES "
+                    "(1, 'Oak Log', 2, 4), (2, 'oak log', 3, 6), (3, 'Elytra', 1, 90)"
+                )
+            )
+
+        applied = upgrade_schema(old_engine)
+
+        assert applied == ["market_prices.item_key", "ix_market_prices_item_key"]
+        with old_engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT id, item_key, trade_count_24h FROM market_prices ORDER BY id")
+            ).all()
+        assert [tuple(row) for row in rows] == [(1, "oak log", 5), (3, "elytra", 1)]
+        indexes = inspect(old_engine).get_indexes("market_prices")
+        assert indexes[0]["unique"]
+
+
+class TestItemSearch:
+    """Test the fuzzy item search index"""
+
+    def test_typos_prefixes_and_word_order(self):
+        """Test that partial and misspelled queries find the right items"""
+        from src.services.item_index import ItemSearchIndex
+
+        index = ItemSearchIndex(refresh_seconds=300)
+        for name in ("Diamond Sword", "Diamond Pickaxe", "Netherite Sword", "Oak Log", "Elytra"):
+            index.add(name)
+        index.add("diamond_sword")  # same key, not duplicated
+
+        assert len(index) == 5
+        assert index.search("diamond sword")[0] == ("Diamond Sword", 3.0)
+        assert [name for name, _ in index.search("diam")] == ["Diamond Sword", "Diamond Pickaxe"]
+        assert index.search("diamnd swrd")[0][0] == "Diamond Sword"
+        assert index.search("sword diamond")[0][0] == "Diamond Sword"
+        assert [name for name, _ in index.search("sw", limit=5)][:2] == [
+            "Diamond Sword",
+            "Netherite Sword",
+        ]
+        assert index.search("zzzz") == []
+
+    def test_bank_search_and_not_found_suggestions(self, bank):
+        """Test search over stored items, incremental adds, and price-check hints"""
+        bank.register_user("12345", "Trader")
+        bank.report_trade("12345", "SELL", "Enchanted Golden Apple", 1, 80.0)
+
+        # Built from the database on first use
+        result = bank.search_items("golden aple")
+        assert result.success
+        assert result.data["results"][0]["item_name"] == "Enchanted Golden Apple"
+        assert result.data["results"][0]["current_price"] == 80.0
+
+        # Later trades are added without a rebuild
+        bank.report_trade("12345", "SELL", "Golden Carrot", 64, 32.0)
+        names = [match["item_name"] for match in bank.search_items("golden").data["results"]]
+        assert "Golden Carrot" in names
+
+        missing = bank.get_item_price("Enchanted Goldn Aple")
+        assert not missing.data["found"]
+        assert missing.data["suggestions"][0] == "Enchanted Golden Apple"
+
+    def test_adds_publish_a_new_state(self):
+        """Test that adding names leaves the state a running search holds untouched"""
+        from src.services.item_index import ItemSearchIndex
+
+        index = ItemSearchIndex(refresh_seconds=300)
+        index.add("Diamond Sword")
+        before = index._state
+
+        index.add("Diamond Pickaxe", "Diamond Sword")
+        assert before.keys == ["diamond sword"]
+        assert before.postings["dia"] == [0]
+        assert [name for name, _ in index.search("diam")] == ["Diamond Sword", "Diamond Pickaxe"]
+
+        index.add("diamond sword")  # nothing new: no new state
+        assert len(index) == 2
+
+    def test_only_committed_trades_become_searchable(self, bank):
+        """Test that names are indexed after commit and rolled-back trades never are"""
+        from src.models.trade import TradeType
+        from src.services.trade_service import TradeService
+        from src.services.user_service import UserService
+
+        bank.register_user("12345", "Trader")
+        bank.search_items("anything")  # load the index
+
+        with pytest.raises(RuntimeError):
+            with get_db() as db:
+                trader = UserService(db).get_by_discord_id("12345")
+                service = TradeService(db)
+                service.report_trade(trader, TradeType.SELL, "Totem of Undying", 1, Decimal("40"))
+                with db.begin_nested():
+                    service.report_trade(trader, TradeType.SELL, "Nautilus Shell", 1, Decimal("9"))
+                assert item_search.search("nautilus") == []  # savepoint released, not committed
+                raise RuntimeError("rolled back")
+
+        assert item_search.search("totem") == []
+        assert item_search.search("nautilus") == []
+
+        with get_db() as db:
+            trader = UserService(db).get_by_discord_id("12345")
+            service = TradeService(db)
+            try:
+                with db.begin_nested():
+                    service.report_trade(trader, TradeType.SELL, "Heart of the Sea", 1, Decimal(5))
+                    raise RuntimeError("savepoint rolled back")
+            except RuntimeError:
+                pass
+            service.report_trade(trader, TradeType.SELL, "Totem of Undying", 1, Decimal("40"))
+
+        assert item_search.search("totem")[0][0] == "Totem of Undying"
+        assert item_search.search("heart of the sea") == []
+
+
+class TestScheduler:
+    """Test the heap-based job scheduler"""
+
+    class Clock:
+        def __init__(self, now: float):
+            self.now = now
+
+        def __call__(self) -> float:
+            return self.now
+
+    def test_aligned_runs_and_metrics(self):
+        """Test that jobs fire on interval boundaries without drift"""
+        from src.api.scheduler import JobScheduler
+
+        clock = self.Clock(1_000_030.0)
+        scheduler = JobScheduler(clock=clock)
+        runs = []
+        scheduler.add_job("tick", lambda: runs.append(clock.now), 60, uses_db=False, jitter=0)
+
+        assert scheduler.get_job("tick").slot == 1_000_080.0  # next multiple of 60
+        assert scheduler.run_pending() == 0
+
+        clock.now = 1_000_085.0  # five seconds late
+        assert scheduler.run_pending() == 1
+        stats = scheduler.get_job("tick").stats
+        assert stats.runs == 1 and stats.last_lag == 5.0
+        assert scheduler.get_job("tick").slot == 1_000_140.0  # stays on the grid
+        assert scheduler.get_job_stats()["tick"]["runs"] == 1
+
+    def test_catch_up_policies(self):
+        """Test latest/all/skip handling of missed runs"""
+        from src.api.scheduler import JobScheduler
+
+        clock = self.Clock(600.0)
+        scheduler = JobScheduler(clock=clock)
+        counts = {"latest": 0, "all": 0, "skip": 0}
+        slots = []
+        for policy in counts:
+            scheduler.add_job(
+                policy,
+                lambda *slot, policy=policy: counts.__setitem__(policy, counts[policy] + 1),
+                60,
+                uses_db=False,
+                jitter=0,
+                catch_up=policy,
+                takes_slot=policy == "all",
+            )
+        scheduler.add_job(
+            "slots", slots.append, 60, uses_db=False, jitter=0, catch_up="all", takes_slot=True
+        )
+
+        clock.now = 900.0  # slots 660..900 all due
+        scheduler.run_pending()
+
+        assert counts == {"latest": 1, "all": 5, "skip": 0}
+        assert slots == [datetime.utcfromtimestamp(t) for t in (660, 720, 780, 840, 900)]
+        assert scheduler.get_job("latest").stats.skipped == 4
+        assert scheduler.get_job("skip").stats.skipped == 5
+        assert all(scheduler.get_job(name).slot == 960.0 for name in counts)
+
+    def test_replay_requires_slot_time(self, monkeypatch):
+        """Test that only jobs taking their slot time can replay missed runs"""
+        from src.api.scheduler import JobScheduler
+        from src.config import scheduler as scheduler_config
+
+        scheduler = JobScheduler(clock=self.Clock(600.0))
+        with pytest.raises(ValueError):
+            scheduler.add_job("plain", lambda: None, 60, uses_db=False, catch_up="all")
+
+        # A configured default of 'all' does not apply to jobs without a slot
+        monkeypatch.setattr(scheduler_config, "CATCH_UP", "all")
+        assert scheduler.add_job("plain", lambda: None, 60, uses_db=False).catch_up == "latest"
+
+    def test_replayed_snapshots_stamped_with_their_slots(self, monkeypatch):
+        """Test that each replayed minute snapshot carries its own slot time"""
+        from datetime import timedelta
+
+        from src.api.scheduler import MarketScheduler
+        from src.config import scheduler as scheduler_config
+        from src.models.market import MarketSnapshot
+        from src.services.market_service import MarketService
+        from src.services.time_utils import epoch_seconds
+
+        monkeypatch.setattr(scheduler_config, "CATCH_UP", "all")
+        monkeypatch.setattr(scheduler_config, "BACKFILL_SNAPSHOTS", False)
+
+        start = datetime(2026, 3, 1, 10, 0)
+        with get_db() as db:
+            MarketService(db).create_snapshot("minute", at=start)
+
+        # Down for ten minutes: slots 10:01 through 10:10 were missed
+        scheduler = MarketScheduler(clock=self.Clock(epoch_seconds(start) + 10 * 60 + 30))
+        scheduler.register_jobs()
+        scheduler.run_pending()
+
+        with get_db() as db:
+            times = [
+                row.snapshot_time
+                for row in db.query(MarketSnapshot)
+                .filter(MarketSnapshot.interval_type == "minute")
+                .order_by(MarketSnapshot.snapshot_time)
+            ]
+
+        assert times == [start + timedelta(minutes=i) for i in range(11)]
+
+    def test_last_run_and_failures(self):
+        """Test restart catch-up from a recorded last run, and job isolation"""
+        from src.api.scheduler import JobScheduler
+
+        clock = self.Clock(10 * 3600 + 30.0)
+        scheduler = JobScheduler(clock=clock)
+        scheduler.add_job("hourly", lambda db: None, 3600, jitter=0, last_run=7 * 3600)
+        assert scheduler.get_job("hourly").slot == 8 * 3600  # first missed boundary
+
+        def fail(db):
+            raise RuntimeError("boom")
+
+        scheduler.add_job("broken", fail, 60, jitter=0, run_immediately=True)
+        assert scheduler.run_pending() == 2
+
+        assert scheduler.get_job("hourly").stats.runs == 1
+        assert scheduler.get_job("hourly").stats.skipped == 2
+        assert scheduler.get_job("broken").stats.failures == 1
+        assert scheduler.get_job("broken").stats.last_error == "boom"
+        assert scheduler.get_job("broken").slot == 10 * 3600 + 60  # rejoined the grid
+
+    def test_market_jobs_in_asyncio_mode(self):
+        """Test that the market scheduler runs its startup refresh on an event loop"""
+        from src.api.scheduler import MarketScheduler
+
+        scheduler = MarketScheduler()
+        refreshed = threading.Event()
+        scheduler.add_callback("on_refresh", lambda data: refreshed.set())
+
+        async def run():
+            scheduler.start(mode="asyncio")
+            assert scheduler.is_running
+            for _ in range(100):
+                if refreshed.is_set():
+                    break
+                await asyncio.sleep(0.02)
+            scheduler.stop()
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+
+        assert refreshed.is_set()
+        status = scheduler.get_status()
+        assert status["mode"] == "asyncio"
+        assert status["jobs"]["market_refresh"]["runs"] == 1
+        assert not scheduler.is_running
+
+
+class TestRestApi:
+    """Test the FastAPI integration"""
+
+    def test_concurrent_requests_use_db_pool(self):
+        """Test that endpoints run on the DB pool and serve concurrent clients"""
+        httpx = pytest.importorskip("httpx")
+        pytest.importorskip("fastapi")
+        from src.integration.java_interface import create_fastapi_app
+
+        app = create_fastapi_app(db_pool_size=2)
+        uuid = "550e8400-e29b-41d4-a716-446655440000"
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await client.post(
+                    "/api/register", json={"minecraft_uuid": uuid, "minecraft_username": "MC"}
+                )
+                return await asyncio.gather(
+                    *(client.get(f"/api/balance/{uuid}") for _ in range(5)),
+                    client.get("/api/market"),
+                )
+
+        try:
+            responses = asyncio.run(run())
+        finally:
+            app.state.db_executor.shutdown()
+
+        assert all(r.status_code == 200 for r in responses)
+        assert responses[0].json()["carats"] == 0
+
+        stats = app.state.db_executor.get_stats()
+        assert stats["workers"] == 2
+        assert stats["calls"]["get_balance_by_uuid"]["calls"] == 5
+
+    def test_bulk_trade_report_endpoint(self):
+        """Test batch ingestion over HTTP, including the batch size limit"""
+        httpx = pytest.importorskip("httpx")
+        pytest.importorskip("fastapi")
+        from src.config import api as api_config
+        from src.integration.java_interface import create_fastapi_app
+
+        app = create_fastapi_app(db_pool_size=1)
+        uuid = "550e8400-e29b-41d4-a716-446655440000"
+        trade = {
+            "minecraft_uuid": uuid,
+            "trade_type": "SELL",
+            "item_name": "Elytra",
+            "item_quantity": 1,
+            "carat_amount": 50.0,
+        }
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await client.post(
+                    "/api/register", json={"minecraft_uuid": uuid, "minecraft_username": "MC"}
+                )
+                ok = await client.post("/api/trade/report/bulk", json={"trades": [trade] * 3})
+                too_big = await client.post(
+                    "/api/trade/report/bulk",
+                    json={"trades": [trade] * (api_config.MAX_TRADE_BATCH + 1)},
+                )
+                return ok, too_big
+
+        try:
+            ok, too_big = asyncio.run(run())
+        finally:
+            app.state.db_executor.shutdown()
+
+        assert ok.status_code == 200
+        assert len(ok.json()["accepted"]) == 3
+        assert too_big.status_code == 413
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])